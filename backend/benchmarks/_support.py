@@ -0,0 +1,61 @@
+# backend/benchmarks/_support.py
+"""Helpers for loading service modules and seeding the in-memory database"""
+
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+# Service directories each ship their own "models" module, so a module is
+# imported with its service directory first on sys.path and the shared names
+# evicted from the module cache.
+_SERVICE_LOCAL_MODULES = ("models", "task_service", "subtask_service", "notification_service",
+                          "scheduler_service", "comment_service", "email_service", "app")
+
+
+def load_service_module(service, module):
+    """Import module from backend/<service>"""
+    service_dir = os.path.join(BACKEND_DIR, service)
+    for name in _SERVICE_LOCAL_MODULES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, service_dir)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(service_dir)
+
+
+@contextmanager
+def stub_http(*modules):
+    """Replace the outbound requests.post calls (module-level or on a Session) of service modules with an instant 200 response"""
+    response = Mock(status_code=200, text="ok")
+    response.json.return_value = {}
+    patchers = [patch.object(module.requests, "post", return_value=response) for module in modules]
+    patchers += [patch.object(module.requests.Session, "post", return_value=response) for module in modules]
+    for patcher in patchers:
+        patcher.start()
+    try:
+        yield
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+def measure(database, func, *args, **kwargs):
+    """Run func once and return (result, wall seconds, stats snapshot)"""
+    database.stats.reset()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, database.stats.snapshot()
+
+
+def report(label, elapsed, stats):
+    calls = ", ".join(f"{op}={count}" for op, count in sorted(stats["calls"].items()))
+    print(f"{label:<40} {elapsed * 1000:>10.1f} ms  {stats['roundTrips']:>6} round trips  "
+          f"{stats['bytesReceived'] / 1024:>9.1f} KiB down  {stats['bytesSent'] / 1024:>8.1f} KiB up  ({calls})")
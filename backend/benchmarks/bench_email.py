@@ -0,0 +1,115 @@
+# backend/benchmarks/bench_email.py
+"""
+Compare sending email with a new SMTP connection per message against the
+email service's SMTPConnectionPool, using a local SMTP stand-in that adds a
+fixed delay to the greeting and to AUTH to model the TLS and login round trips
+of a real provider.
+
+Run with: python benchmarks/bench_email.py --messages 200 --handshake-ms 50
+"""
+import argparse
+import smtplib
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+from _support import load_service_module
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        time.sleep(self.server.handshake)
+        self.server.connections += 1
+        self.reply("220 bench ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250-bench")
+                self.reply("250 AUTH PLAIN")
+            elif command.startswith("AUTH"):
+                time.sleep(self.server.handshake)
+                self.reply("235 Authenticated")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.messages += 1
+                self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.handshake = handshake
+        self.connections = 0
+        self.messages = 0
+
+
+def message(i):
+    msg = MIMEText(f"<p>Reminder {i}</p>", "html")
+    msg["From"] = "Task Management System <noreply@example.com>"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = f"Deadline Reminder {i}"
+    return msg
+
+
+def send_unpooled(host, port, msg):
+    with smtplib.SMTP(host, port) as server:
+        server.login("bench", "secret")
+        server.send_message(msg)
+
+
+def run(label, server, send, count, concurrency):
+    server.connections = server.messages = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, (message(i) for i in range(count))))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:>9.1f} ms  {count / elapsed:>8.1f} msg/s  "
+          f"{server.connections:>5} connections  {server.messages:>5} delivered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    smtp_pool = load_service_module("email-service", "smtp_pool")
+    server = StandInSMTPServer(args.handshake_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    print(f"{args.messages} messages, {args.concurrency} senders, "
+          f"{args.handshake_ms:.0f} ms greeting and {args.handshake_ms:.0f} ms AUTH delay\n")
+
+    try:
+        run("connection per message", server, lambda msg: send_unpooled(host, port, msg),
+            args.messages, args.concurrency)
+        pool = smtp_pool.SMTPConnectionPool(host, port, "bench", "secret", size=args.concurrency, starttls=False)
+        run("SMTPConnectionPool", server, pool.send_message, args.messages, args.concurrency)
+        pool.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# backend/benchmarks/bench_responses.py
+"""
+Measure serialization time and bytes on the wire of GET /tasks with the
+stdlib JSON encoder, the orjson provider and compressed responses, and the
+cost of converting records through Task objects versus projecting them.
+
+Run with: python benchmarks/bench_responses.py --tasks 10000
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from flask.json.provider import DefaultJSONProvider
+
+from _support import load_service_module
+
+from shared import current_timestamp, use_database
+from shared.http import FastJSONProvider, brotli, orjson
+from shared.memory_db import MemoryDatabase
+
+DAY = 24 * 60 * 60
+NOTES = ("Follow up with the client on the revised scope, update the estimate sheet and "
+         "attach the signed change request before the weekly review. ")
+
+
+def build_dataset(task_count):
+    """Build a tasks tree with realistic notes and attachments"""
+    now = current_timestamp()
+    tasks = {}
+    for t in range(task_count):
+        task_id = f"task{t:05d}"
+        tasks[task_id] = {
+            "taskId": task_id, "title": f"Quarterly report section {t}", "creatorId": f"user{t % 50}",
+            "ownerId": f"user{(t + 1) % 50}", "collaborators": [f"user{(t + i) % 50}" for i in range(3)],
+            "projectId": f"project{t % 20}", "deadline": now + (t % 30) * DAY, "status": "ongoing",
+            "notes": NOTES * (1 + t % 4), "attachments": [f"https://files.example.com/{task_id}/brief.pdf"],
+            "priority": t % 10, "createdAt": now - DAY, "updatedAt": now - DAY, "start_date": now - DAY,
+            "active": True, "scheduled": False, "schedule": "daily",
+        }
+    return {"tasks": tasks}
+
+
+def time_request(client, headers, repeat):
+    """Return (median milliseconds, response bytes) of GET /tasks"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/tasks", headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(timings) * 1000, len(response.data)
+
+
+def measure_conversion(label, convert, records, repeat):
+    """Print median milliseconds and peak traced memory of converting every record"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(records)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = convert(records)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    print(f"{label:<24} {statistics.median(timings) * 1000:>9.1f} ms  {peak / 1024:>9.1f} KiB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database = MemoryDatabase()
+    database.load(build_dataset(args.tasks))
+    use_database(database)
+
+    app = load_service_module("task-service", "app").app
+    Task = sys.modules["models"].Task
+    client = app.test_client()
+    print(f"GET /tasks with {args.tasks} tasks, median of {args.repeat} requests "
+          f"(orjson {'on' if orjson else 'not installed'}, brotli {'on' if brotli else 'not installed'})\n")
+
+    runs = [("stdlib json, identity", DefaultJSONProvider, {}),
+            ("orjson, identity", FastJSONProvider, {}),
+            ("orjson, gzip", FastJSONProvider, {"Accept-Encoding": "gzip"})]
+    if brotli is not None:
+        runs.append(("orjson, br", FastJSONProvider, {"Accept-Encoding": "br"}))
+
+    for label, provider, headers in runs:
+        app.json = provider(app)
+        elapsed, size = time_request(client, headers, args.repeat)
+        print(f"{label:<24} {elapsed:>9.1f} ms  {size / 1024:>9.1f} KiB")
+
+    records = list(database.reference("tasks").get().values())
+    print(f"\nConverting {len(records)} task records to wire dicts\n")
+    measure_conversion("from_dict + to_dict", lambda rows: [Task.from_dict(row).to_dict() for row in rows],
+                       records, args.repeat)
+    measure_conversion("Task.project", lambda rows: [Task.project(row) for row in rows], records, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
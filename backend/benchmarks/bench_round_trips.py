@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_round_trips.py
+"""
+Count database round trips and wall-clock time of hot code paths against
+the in-memory Realtime Database with injected per-call latency.
+
+Run with: python benchmarks/bench_round_trips.py --tasks 2000 --latency-ms 30
+"""
+import argparse
+
+from _support import load_service_module, measure, report, stub_http
+
+from shared import current_timestamp, use_database
+from shared.memory_db import MemoryDatabase
+
+DAY = 24 * 60 * 60
+
+
+def build_dataset(task_count, subtasks_per_task, user_count):
+    """Build a tree with tasks spread over the next 30 days"""
+    now = current_timestamp()
+    users, preferences, tasks, subtasks = {}, {}, {}, {}
+    tasks_by_project, tasks_by_user, subtasks_by_task = {}, {}, {}
+
+    for u in range(user_count):
+        uid = f"user{u}"
+        users[uid] = {"uid": uid, "name": f"User {u}", "email": f"{uid}@example.com",
+                      "role": "staff", "department": "Engineering"}
+        preferences[uid] = {"userId": uid, "enabled": True, "taskDeadlineReminders": True,
+                            "taskUpdateReminders": True, "channel": "both", "reminderTimes": [1, 3, 7]}
+
+    for t in range(task_count):
+        task_id = f"task{t}"
+        owner = f"user{t % user_count}"
+        tasks[task_id] = {
+            "taskId": task_id, "title": f"Task {t}", "creatorId": owner, "ownerId": owner,
+            "collaborators": [owner, f"user{(t + 1) % user_count}", f"user{(t + 2) % user_count}"],
+            "projectId": f"project{t % 20}", "deadline": now + (t % 30) * DAY + 600,
+            "status": "ongoing", "notes": "Benchmark task " * 4, "priority": 5,
+            "createdAt": now - DAY, "updatedAt": now - DAY, "start_date": now - DAY,
+            "active": True, "scheduled": False, "schedule": "daily",
+        }
+        tasks_by_project.setdefault(tasks[task_id]["projectId"], {})[task_id] = True
+        for uid in tasks[task_id]["collaborators"]:
+            tasks_by_user.setdefault(uid, {})[task_id] = True
+        for s in range(subtasks_per_task):
+            subtask_id = f"{task_id}-sub{s}"
+            subtasks[subtask_id] = {
+                "subTaskId": subtask_id, "taskId": task_id, "title": f"Subtask {t}.{s}",
+                "creatorId": owner, "ownerId": owner, "collaborators": [owner],
+                "deadline": now + ((t + s) % 30) * DAY + 600, "status": "ongoing",
+                "createdAt": now - DAY, "updatedAt": now - DAY, "start_date": now - DAY,
+                "active": True, "scheduled": False, "schedule": "daily",
+            }
+            subtasks_by_task.setdefault(task_id, {})[subtask_id] = True
+
+    return {"users": users, "notificationPreferences": preferences, "tasks": tasks, "subtasks": subtasks,
+            "tasksByProject": tasks_by_project, "tasksByUser": tasks_by_user, "subtasksByTask": subtasks_by_task}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--subtasks-per-task", type=int, default=2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    database = MemoryDatabase(latency=args.latency_ms / 1000)
+    database.load(build_dataset(args.tasks, args.subtasks_per_task, args.users))
+    use_database(database)
+
+    print(f"{args.tasks} tasks, {args.tasks * args.subtasks_per_task} subtasks, "
+          f"{args.users} users, {args.latency_ms:.0f} ms per round trip\n")
+
+    task_service = load_service_module("task-service", "task_service")
+    with stub_http(task_service):
+        service = task_service.TaskService()
+        req = task_service.UpdateTaskRequest(task_id="task0", status="completed")
+        _, elapsed, stats = measure(database, service.update_task, req)
+        report("TaskService.update_task (status change)", elapsed, stats)
+
+        _, elapsed, stats = measure(database, service.get_all_tasks)
+        report("TaskService.get_all_tasks", elapsed, stats)
+
+        _, elapsed, stats = measure(database, service.get_task_changes, current_timestamp() - 60)
+        report("TaskService.get_task_changes", elapsed, stats)
+
+        _, elapsed, stats = measure(database, service.get_tasks_by_project, "project1")
+        report("TaskService.get_tasks_by_project", elapsed, stats)
+
+        _, elapsed, stats = measure(database, service.get_tasks_by_user, "user1")
+        report("TaskService.get_tasks_by_user", elapsed, stats)
+
+    scheduler_service = load_service_module("notification-service", "scheduler_service")
+    with stub_http(scheduler_service):
+        scheduler = scheduler_service.SchedulerService("http://email-service:6005")
+        _, elapsed, stats = measure(database, scheduler.check_task_deadlines)
+        report("SchedulerService.check_task_deadlines", elapsed, stats)
+        _, elapsed, stats = measure(database, scheduler.check_task_deadlines)
+        report("check_task_deadlines (incremental)", elapsed, stats)
+
+
+if __name__ == "__main__":
+    main()
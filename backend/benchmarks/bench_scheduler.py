@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_scheduler.py
+"""
+Measure the CPU time of the deadline scheduler's in-memory decision pass
+(SchedulerService.collect_reminders) with the NumPy pre-filter and with the
+per-item Python loop.
+
+Run with: python benchmarks/bench_scheduler.py --items 100000
+"""
+import argparse
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from _support import load_service_module
+
+from shared import current_timestamp, use_database
+from shared.memory_db import MemoryDatabase
+
+DAY = 24 * 60 * 60
+
+
+def build_dataset(item_count, user_count, seed=1):
+    """Tasks and subtasks with deadlines spread over the next 60 days"""
+    rng = random.Random(seed)
+    now = current_timestamp()
+    users = [f"user{u}" for u in range(user_count)]
+
+    def item(i):
+        return {"title": f"Item {i}", "ownerId": rng.choice(users), "collaborators": rng.sample(users, 3),
+                "deadline": now + rng.randint(-5 * DAY, 60 * DAY),
+                "status": rng.choice(["ongoing", "ongoing", "under_review", "completed"])}
+
+    task_count = item_count // 2
+    tasks = {f"task{i}": item(i) for i in range(task_count)}
+    subtasks = {f"subtask{i}": {**item(i), "taskId": f"task{i % task_count}"} for i in range(item_count - task_count)}
+    preferences = {
+        user_id: {"enabled": True, "taskDeadlineReminders": True, "channel": "both",
+                  "reminderTimes": rng.sample([1, 3, 7, 14], 2)}
+        for user_id in users
+    }
+    return tasks, subtasks, preferences, now
+
+
+def time_pass(service, dataset, repeat):
+    """Return (median CPU milliseconds, reminders found)"""
+    tasks, subtasks, preferences, now = dataset
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        reminders = service.collect_reminders(tasks, subtasks, preferences, now=now)
+        timings.append(time.process_time() - start)
+    return statistics.median(timings) * 1000, len(reminders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    use_database(MemoryDatabase())
+    scheduler_service = load_service_module("notification-service", "scheduler_service")
+    service = scheduler_service.SchedulerService("http://email-service:6005")
+    dataset = build_dataset(args.items, args.users)
+    print(f"collect_reminders over {args.items} tasks and subtasks, {args.users} users, "
+          f"median CPU time of {args.repeat} runs\n")
+
+    runs = [("python loop", None)]
+    if scheduler_service.np is not None:
+        runs.append(("numpy pre-filter", scheduler_service.np))
+    for label, np in runs:
+        with patch.object(scheduler_service, "np", np):
+            elapsed, found = time_pass(service, dataset, args.repeat)
+        print(f"{label:<24} {elapsed:>9.1f} ms  {found:>7} reminders")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# backend/benchmarks/bench_templates.py
+"""
+Measure the email service's render cost per email and per fan-out of one
+event to many recipients, with the render cache disabled (every recipient
+renders the body) and enabled (the body is rendered once per event).
+
+Run with: python benchmarks/bench_templates.py --recipients 100
+"""
+import argparse
+import statistics
+import time
+from unittest.mock import patch
+
+from _support import load_service_module
+
+COMMENT = ("Design Review", "Looks good, but please double-check the rollout plan before Friday. " * 3,
+           "Jane Doe", True, "Q3 Launch", 1700000000)
+
+
+def time_per_call(func, count, repeat):
+    """Median microseconds per call over repeat runs of count calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(count):
+            func(i)
+        timings.append((time.perf_counter() - start) / count)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=100)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    email_service = load_service_module("email-service", "email_service")
+    models = load_service_module("email-service", "models")
+    with patch.dict("os.environ", {"EMAIL_RENDER_CACHE_SIZE": "0"}):
+        uncached = email_service.EmailService()
+    cached = email_service.EmailService()
+
+    def distinct_comments(service):
+        # A different comment each call, so nothing is served from the cache
+        return lambda i: service.render_comment_notification_email(f"Task {i}", *COMMENT[1:])
+
+    def reminder(service):
+        return lambda i: service.render_task_reminder(models.EmailRequest(
+            f"user{i}@example.com", "Quarterly report", 1700000000, 2.0, "Numbers from finance", False, None))
+
+    print(f"Render cost, median of {args.repeat} runs\n")
+    per_email = time_per_call(distinct_comments(uncached), args.emails, args.repeat)
+    print(f"{'comment email (distinct events)':<44} {per_email:>9.1f} us/email")
+
+    for label, service in (("render per recipient", uncached), ("render once per event", cached)):
+        fan_out = time_per_call(
+            lambda event: [service.render_comment_notification_email(f"Task {event}", *COMMENT[1:])
+                           for _ in range(args.recipients)],
+            max(1, args.emails // args.recipients), args.repeat)
+        print(f"{f'comment fan-out to {args.recipients}, {label}':<44} {fan_out:>9.1f} us/fan-out")
+
+    for label, service in (("render per recipient", uncached), ("render once per event", cached)):
+        print(f"{f'reminder to {args.recipients} users, {label}':<44} "
+              f"{time_per_call(reminder(service), args.recipients, args.repeat) * args.recipients:>9.1f} us/fan-out")
+
+
+if __name__ == "__main__":
+    main()
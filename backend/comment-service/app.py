@@ -7,12 +7,13 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import init_firebase, validate_epoch_timestamp
+from shared import init_firebase, validate_epoch_timestamp, cache_stats, init_responses
 from comment_service import CommentService
 from models import CreateCommentRequest, UpdateCommentRequest, ArchiveCommentRequest
 
 app = Flask(__name__)
 CORS(app)
+init_responses(app)
 
 # Initialize Firebase
 init_firebase()
@@ -125,7 +126,7 @@ def get_comments(parent_id):
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(status="healthy", service="comment-service"), 200
+    return jsonify(status="healthy", service="comment-service", cache=cache_stats()), 200
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=6006, debug=True)
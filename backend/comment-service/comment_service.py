@@ -7,7 +7,7 @@ import requests
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import get_db_reference, current_timestamp
+from shared import get_db_reference, get_cache, watch_for_changes, current_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +19,33 @@ class CommentService:
         self.subtasks_ref = get_db_reference("subtasks")
         self.users_ref = get_db_reference("users")
         self.notification_prefs_ref = get_db_reference("notificationPreferences")
+        self.user_cache = get_cache("users")
+        self.prefs_cache = get_cache("notificationPreferences")
+        self.task_title_cache = get_cache("taskTitles")
+        watch_for_changes("users", self.users_ref)
+        watch_for_changes("notificationPreferences", self.notification_prefs_ref)
+        watch_for_changes("taskTitles", self.tasks_ref)
         self.notification_service_url = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:6004")
+
+    def get_user(self, user_id):
+        """Get a user record, served from the process-wide cache when fresh"""
+        return self.user_cache.get_or_load(user_id, lambda: self.users_ref.child(user_id).get())
+
+    def get_notification_preferences(self, user_id):
+        """Get a user's notification preferences, served from the process-wide cache when fresh"""
+        return self.prefs_cache.get_or_load(user_id, lambda: self.notification_prefs_ref.child(user_id).get())
+
+    def get_task_title(self, task_id):
+        """Get a task's title (None if the task does not exist), served from the process-wide cache when fresh"""
+        def load():
+            task_data = self.tasks_ref.child(task_id).get()
+            return task_data.get('title') if task_data else None
+        return self.task_title_cache.get_or_load(task_id, load)
     
+    def save_comment_threads(self, parent_ref, comment_threads):
+        """Write a task's or subtask's comment threads, bumping updatedAt so delta polls pick them up"""
+        parent_ref.update({'comment_thread': comment_threads, 'updatedAt': current_timestamp()})
+
     def create_comment(self, comment_data):
         """
         Create a new comment thread or append to existing thread
@@ -83,7 +108,7 @@ class CommentService:
         comment_threads.append(new_thread)
         
         # Update parent with new comment thread
-        parent_ref.update({'comment_thread': comment_threads})
+        self.save_comment_threads(parent_ref, comment_threads)
 
         # Send notifications after successfully creating comment
         self.send_comment_notifications(
@@ -168,7 +193,7 @@ class CommentService:
         comment_threads[thread_index] = thread
 
         # Update parent with modified comment threads
-        parent_ref.update({'comment_thread': comment_threads})
+        self.save_comment_threads(parent_ref, comment_threads)
 
         # Send notifications after successfully adding reply
         # Combine existing mentions with new mentions for notification
@@ -239,7 +264,7 @@ class CommentService:
         comment_threads[thread_index] = thread
         
         # Update parent with modified comment threads
-        parent_ref.update({'comment_thread': comment_threads})
+        self.save_comment_threads(parent_ref, comment_threads)
         
         return thread, None
 
@@ -296,12 +321,10 @@ class CommentService:
             if comment_type == 'subtask':
                 task_id = parent_data.get('taskId')
                 if task_id:
-                    task_data = self.tasks_ref.child(task_id).get()
-                    if task_data:
-                        parent_task_title = task_data.get('title')
+                    parent_task_title = self.get_task_title(task_id)
 
             # Get commenter name (try 'name' first, then 'displayName', then email, then default)
-            commenter_data = self.users_ref.child(commenter_id).get()
+            commenter_data = self.get_user(commenter_id)
             if commenter_data:
                 commenter_name = (
                     commenter_data.get('name') or
@@ -335,7 +358,7 @@ class CommentService:
                     continue  # Don't notify the commenter
 
                 # Get user's notification preferences
-                prefs = self.notification_prefs_ref.child(user_id).get()
+                prefs = self.get_notification_preferences(user_id)
                 if not prefs:
                     continue
 
@@ -349,7 +372,7 @@ class CommentService:
                         continue
 
                 # Get user email and channel preference
-                user_data = self.users_ref.child(user_id).get()
+                user_data = self.get_user(user_id)
                 if user_data:
                     recipients_to_notify[user_id] = {
                         'channel': prefs.get('channel', 'both'),
@@ -363,12 +386,12 @@ class CommentService:
 
                 if user_id not in recipients_to_notify:
                     # Get user's notification preferences
-                    prefs = self.notification_prefs_ref.child(user_id).get()
+                    prefs = self.get_notification_preferences(user_id)
                     if not prefs or not prefs.get('enabled', False):
                         continue
 
                     # Get user email and channel preference
-                    user_data = self.users_ref.child(user_id).get()
+                    user_data = self.get_user(user_id)
                     if user_data:
                         recipients_to_notify[user_id] = {
                             'channel': prefs.get('channel', 'both'),
@@ -25,6 +25,7 @@ firebase_admin_patcher.start()
 from comment_service import CommentService
 from models import CreateCommentRequest, UpdateCommentRequest, ArchiveCommentRequest
 from app import app
+from shared import clear_caches
 
 
 @pytest.fixture(autouse=True)
@@ -36,6 +37,13 @@ def mock_firebase():
                 yield
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty read-through caches."""
+    clear_caches()
+    yield
+
+
 @pytest.fixture
 def client():
     """Create test client"""
@@ -285,6 +293,8 @@ class TestCommentService:
         assert thread['comments'][0] == ['u1', 'Test comment', 1700000000]
         assert thread['mention'] == ['u2']
         mock_task_ref.update.assert_called_once()
+        # Bumps updatedAt so /tasks/changes returns the task with its new thread
+        assert set(mock_task_ref.update.call_args[0][0]) == {'comment_thread', 'updatedAt'}
     
     def test_create_comment_parent_not_found(self, mock_db):
         """Test creating comment with non-existent parent"""
@@ -466,6 +476,7 @@ class TestCommentService:
         assert error is None
         assert thread['active'] == False
         mock_task_ref.update.assert_called_once()
+        assert 'updatedAt' in mock_task_ref.update.call_args[0][0]
     
     def test_archive_comment_thread_invalid_index(self, mock_db, sample_task_data):
         """Test archiving with invalid thread index"""
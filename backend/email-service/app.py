@@ -10,19 +10,28 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Import only the utility function we need, not firebase config
 from shared.utils import current_timestamp
+from shared.http import init_responses
+from shared.serving import on_worker_start, start_worker_jobs
 
 from email_service import EmailService
+from email_queue import EmailQueue, EmailSenderPool
 from models import EmailRequest
 
 app = Flask(__name__)
 CORS(app)
+init_responses(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize service
-email_service = EmailService()
+# Initialize service; routes queue messages and the sender pool delivers them
+email_queue = EmailQueue()
+email_service = EmailService(outbox=email_queue)
+email_senders = EmailSenderPool(email_queue, email_service.deliver_email)
+on_worker_start(app, email_senders.start)
+
+BATCH_MAX_JOBS = int(os.getenv("EMAIL_BATCH_MAX_JOBS", "1000"))
 
 @app.route("/email/send-task-reminder", methods=["POST"])
 def send_task_reminder():
@@ -52,11 +61,11 @@ def send_task_reminder():
     
     if success:
         return jsonify(
-            message="Email sent successfully",
-            sentAt=current_timestamp()
-        ), 200
+            message="Email queued for delivery",
+            queuedAt=current_timestamp()
+        ), 202
     else:
-        return jsonify(error="Failed to send email"), 500
+        return jsonify(error="Failed to queue email"), 500
 
 @app.route("/email/send-task-update", methods=["POST"])
 def send_task_update():
@@ -92,11 +101,11 @@ def send_task_update():
 
     if success:
         return jsonify(
-            message="Task update email sent successfully",
-            sentAt=current_timestamp()
-        ), 200
+            message="Task update email queued for delivery",
+            queuedAt=current_timestamp()
+        ), 202
     else:
-        return jsonify(error="Failed to send task update email"), 500
+        return jsonify(error="Failed to queue task update email"), 500
 
 @app.route("/email/send-comment-notification", methods=["POST"])
 def send_comment_notification():
@@ -134,11 +143,11 @@ def send_comment_notification():
 
     if success:
         return jsonify(
-            message="Comment notification email sent successfully",
-            sentAt=current_timestamp()
-        ), 200
+            message="Comment notification email queued for delivery",
+            queuedAt=current_timestamp()
+        ), 202
     else:
-        return jsonify(error="Failed to send comment notification email"), 500
+        return jsonify(error="Failed to queue comment notification email"), 500
 
 @app.route("/email/send-deadline-extension-request", methods=["POST"])
 def send_deadline_extension_request():
@@ -171,9 +180,9 @@ def send_deadline_extension_request():
     )
 
     if success:
-        return jsonify(message="Deadline extension request email sent successfully"), 200
+        return jsonify(message="Deadline extension request email queued for delivery", queuedAt=current_timestamp()), 202
     else:
-        return jsonify(error="Failed to send deadline extension request email"), 500
+        return jsonify(error="Failed to queue deadline extension request email"), 500
 
 @app.route("/email/send-deadline-extension-response", methods=["POST"])
 def send_deadline_extension_response():
@@ -205,9 +214,9 @@ def send_deadline_extension_response():
     )
 
     if success:
-        return jsonify(message="Deadline extension response email sent successfully"), 200
+        return jsonify(message="Deadline extension response email queued for delivery", queuedAt=current_timestamp()), 202
     else:
-        return jsonify(error="Failed to send deadline extension response email"), 500
+        return jsonify(error="Failed to queue deadline extension response email"), 500
 
 @app.route("/email/send-deadline-changed", methods=["POST"])
 def send_deadline_changed():
@@ -238,9 +247,37 @@ def send_deadline_changed():
     )
 
     if success:
-        return jsonify(message="Deadline changed email sent successfully"), 200
+        return jsonify(message="Deadline changed email queued for delivery", queuedAt=current_timestamp()), 202
     else:
-        return jsonify(error="Failed to send deadline changed email"), 500
+        return jsonify(error="Failed to queue deadline changed email"), 500
+
+@app.route("/email/send-batch", methods=["POST"])
+def send_batch():
+    """Queue a list of typed email jobs in one call"""
+    try:
+        data = request.get_json(force=False, silent=False)
+    except Exception as e:
+        return jsonify({"error": "Invalid JSON"}), 400
+
+    if data is None or not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    jobs = data.get('jobs') if isinstance(data, dict) else None
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify(error="Missing required field: jobs"), 400
+    if len(jobs) > BATCH_MAX_JOBS:
+        return jsonify(error=f"Batch exceeds {BATCH_MAX_JOBS} jobs"), 400
+
+    results = email_service.send_batch(jobs)
+    accepted = sum(1 for result in results if result['status'] in ('queued', 'sent'))
+    failed = any(result['status'] == 'failed' for result in results)
+
+    return jsonify(
+        results=results,
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        queuedAt=current_timestamp()
+    ), 202 if accepted else 500 if failed else 400
 
 @app.route("/email/test", methods=["POST"])
 def test_email():
@@ -256,13 +293,19 @@ def test_email():
     else:
         return jsonify(error="Failed to send test email"), 500
 
+@app.route("/email/queue", methods=["GET"])
+def email_queue_stats():
+    """Outbox depth and delivery latency"""
+    return jsonify(email_queue.stats()), 200
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     return jsonify(
         status="healthy",
         service="email-service",
-        smtp_configured=email_service.is_configured()
+        smtp_configured=email_service.is_configured(),
+        renderCache=email_service.render_cache.stats()
     ), 200
 
 if __name__ == '__main__':
@@ -270,4 +313,5 @@ if __name__ == '__main__':
         logger.warning("SMTP credentials not configured. Email sending will fail.")
         logger.warning("Please set SMTP_USER and SMTP_PASSWORD environment variables.")
     
+    start_worker_jobs(app)
     app.run(host='0.0.0.0', port=6005, debug=True)
\ No newline at end of file
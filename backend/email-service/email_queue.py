@@ -0,0 +1,280 @@
+# backend/email-service/email_queue.py
+"""Durable outbox for outgoing email.
+
+The email routes render a message and store it in a local SQLite table
+instead of talking to the SMTP server inside the request, so callers get a
+202 as soon as the message is on disk. EmailSenderPool threads drain the
+table: each claim reserves the message with a lease (so a crashed sender's
+message is picked up again) and a send slot from a pacing row shared by every
+process using the file, which caps delivery at EMAIL_RATE_PER_SECOND overall.
+A failed send is retried with exponential backoff until EMAIL_MAX_ATTEMPTS,
+and a permanent SMTP rejection fails the message at once.
+"""
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class EmailQueue:
+    """SQLite-backed queue of rendered emails"""
+
+    def __init__(self, path=None, rate=None, lease_seconds=None, retention_seconds=None):
+        path = path or os.getenv("EMAIL_QUEUE_PATH", "email_queue.sqlite3")
+        self.rate = rate if rate is not None else float(os.getenv("EMAIL_RATE_PER_SECOND", "10"))
+        self.lease_seconds = lease_seconds if lease_seconds is not None else float(
+            os.getenv("EMAIL_SEND_LEASE_SECONDS", "120"))
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(
+            os.getenv("EMAIL_QUEUE_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        self._enqueued = threading.Event()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emails ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, to_email TEXT NOT NULL, subject TEXT NOT NULL,"
+                " html TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL, created_at REAL NOT NULL, sent_at REAL, last_error TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS emails_due ON emails (status, next_attempt_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS emails_sent ON emails (sent_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS pacing (id INTEGER PRIMARY KEY, next_slot REAL NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO pacing VALUES (1, 0)")
+
+    def _transaction(self, func):
+        """Run func(connection) in a write transaction that other processes wait on"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, to_email, subject, html):
+        """Store a message for delivery and return its id"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO emails (to_email, subject, html, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", (to_email, subject, html, PENDING, now, now)
+            )
+        self._enqueued.set()
+        return cursor.lastrowid
+
+    def enqueue_many(self, messages):
+        """Store (to_email, subject, html) messages in one transaction and return their ids"""
+        now = time.time()
+
+        def insert(conn):
+            return [conn.execute(
+                "INSERT INTO emails (to_email, subject, html, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", (to_email, subject, html, PENDING, now, now)
+            ).lastrowid for to_email, subject, html in messages]
+
+        message_ids = self._transaction(insert)
+        self._enqueued.set()
+        return message_ids
+
+    def wait_for_enqueue(self, timeout):
+        """Wait until this process enqueues a message or timeout passes (other processes are seen by polling)"""
+        woke = self._enqueued.wait(timeout)
+        self._enqueued.clear()
+        return woke
+
+    def claim(self, now=None):
+        """
+        Lease the next due message and reserve a send slot.
+
+        Returns (message dict, slot time) or None when nothing is due. The caller
+        sends at the slot time; until the lease expires no other sender sees it.
+        """
+        now = time.time() if now is None else now
+
+        def claim_next(conn):
+            row = conn.execute(
+                "SELECT id, to_email, subject, html, attempts, created_at FROM emails"
+                " WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1", (PENDING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            slot = now
+            if self.rate > 0:
+                slot = max(now, conn.execute("SELECT next_slot FROM pacing WHERE id = 1").fetchone()[0])
+                conn.execute("UPDATE pacing SET next_slot = ? WHERE id = 1", (slot + 1 / self.rate,))
+            conn.execute("UPDATE emails SET next_attempt_at = ? WHERE id = ?", (slot + self.lease_seconds, row[0]))
+            message_id, to_email, subject, html, attempts, created_at = row
+            return {"id": message_id, "toEmail": to_email, "subject": subject, "html": html,
+                    "attempts": attempts, "createdAt": created_at}, slot
+
+        return self._transaction(claim_next)
+
+    def mark_sent(self, message_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "UPDATE emails SET status = ?, sent_at = ?, attempts = attempts + 1, html = '', last_error = NULL"
+                " WHERE id = ?", (SENT, now, message_id)
+            )
+
+    def mark_failed(self, message_id, error, retry_at=None):
+        """Record a failed attempt; the message is retried at retry_at, or given up when it is None"""
+        with self._lock:
+            if retry_at is None:
+                self._conn.execute(
+                    "UPDATE emails SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                    (FAILED, error, message_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE emails SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (retry_at, error, message_id)
+                )
+
+    def prune(self, now=None):
+        """Delete sent and failed messages older than the retention period"""
+        cutoff = (time.time() if now is None else now) - self.retention_seconds
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM emails WHERE status != ? AND created_at < ?", (PENDING, cutoff)
+            ).rowcount
+
+    def stats(self, now=None, window_seconds=3600):
+        """Queue depth and delivery latency (seconds from enqueue to send) over the last window"""
+        now = time.time() if now is None else now
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM emails GROUP BY status").fetchall())
+            due, retrying, oldest = self._conn.execute(
+                "SELECT SUM(next_attempt_at <= ?), SUM(attempts > 0), MIN(created_at) FROM emails WHERE status = ?",
+                (now, PENDING)
+            ).fetchone()
+            latencies = [row[0] for row in self._conn.execute(
+                "SELECT sent_at - created_at FROM emails WHERE status = ? AND sent_at >= ? ORDER BY 1",
+                (SENT, now - window_seconds)
+            )]
+        latency = {"count": len(latencies), "windowSeconds": window_seconds}
+        if latencies:
+            latency.update(
+                avgSeconds=round(sum(latencies) / len(latencies), 3),
+                p50Seconds=round(latencies[len(latencies) // 2], 3),
+                p95Seconds=round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                maxSeconds=round(latencies[-1], 3),
+            )
+        return {
+            "depth": {"pending": counts.get(PENDING, 0), "due": due or 0, "retrying": retrying or 0,
+                      "sent": counts.get(SENT, 0), "failed": counts.get(FAILED, 0)},
+            "oldestPendingSeconds": round(now - oldest, 3) if oldest is not None else None,
+            "latency": latency,
+            "ratePerSecond": self.rate,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def is_permanent(error):
+    """True for SMTP rejections that a retry cannot fix (5xx replies, refused recipients)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class EmailSenderPool:
+    """Threads that deliver queued emails with paced sends and backoff retries"""
+
+    def __init__(self, queue, deliver, workers=None, max_attempts=None, backoff_seconds=None,
+                 max_backoff_seconds=None, poll_seconds=None):
+        """
+        Args:
+            queue: EmailQueue to drain
+            deliver: callable(to_email, subject, html) that sends now and raises on failure
+        """
+        self.queue = queue
+        self.deliver = deliver
+        self.workers = workers if workers is not None else int(os.getenv("EMAIL_SENDER_WORKERS", "4"))
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else float(
+            os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "30"))
+        self.max_backoff_seconds = max_backoff_seconds if max_backoff_seconds is not None else float(
+            os.getenv("EMAIL_MAX_BACKOFF_SECONDS", "3600"))
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(
+            os.getenv("EMAIL_QUEUE_POLL_SECONDS", "1"))
+        self._stop = threading.Event()
+        self._threads = []
+
+    def retry_delay(self, attempts):
+        """Backoff before retry number `attempts` (1, 2, ...): base * 2^(attempts - 1), capped"""
+        return min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+
+    def process_one(self, now=None):
+        """Claim and send one due message. Returns False when nothing was due."""
+        now = time.time() if now is None else now
+        claimed = self.queue.claim(now)
+        if claimed is None:
+            return False
+        message, slot = claimed
+        if self._stop.wait(max(0, slot - now)):
+            # Shutting down before the slot: the lease expires and another sender takes it
+            return False
+
+        try:
+            self.deliver(message["toEmail"], message["subject"], message["html"])
+        except Exception as e:
+            attempts = message["attempts"] + 1
+            if is_permanent(e) or attempts >= self.max_attempts:
+                logger.error(f"Giving up on email {message['id']} to {message['toEmail']} "
+                             f"after {attempts} attempt(s): {str(e)}")
+                self.queue.mark_failed(message["id"], str(e))
+            else:
+                delay = self.retry_delay(attempts)
+                logger.warning(f"Email {message['id']} to {message['toEmail']} failed ({str(e)}); "
+                               f"retrying in {delay:.0f}s")
+                self.queue.mark_failed(message["id"], str(e), retry_at=now + delay)
+            return True
+
+        self.queue.mark_sent(message["id"])
+        logger.info(f"Email {message['id']} sent to {message['toEmail']}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.process_one():
+                    self.queue.wait_for_enqueue(self.poll_seconds)
+            except Exception as e:
+                logger.error(f"Email sender error: {str(e)}")
+                self._stop.wait(self.poll_seconds)
+
+    def _prune(self):
+        while not self._stop.wait(3600):
+            try:
+                self.queue.prune()
+            except Exception as e:
+                logger.error(f"Email queue prune error: {str(e)}")
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._run, name=f"email-sender-{i}", daemon=True)
+                         for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._prune, name="email-queue-prune", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started {self.workers} email sender(s).")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
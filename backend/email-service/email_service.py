@@ -1,23 +1,48 @@
 # backend/email-service/email_service.py
-import smtplib
 import os
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from models import EmailRequest
+from smtp_pool import SMTPConnectionPool
+import templates
+from templates import RenderCache, cached_render
 
 logger = logging.getLogger(__name__)
 
+# Batch job type -> (render method, required fields, optional fields with defaults), in the render method's
+# argument order; the field names match the single-email routes
+BATCH_JOB_TYPES = {
+    "task-update": ("render_task_update_email", ("taskTitle", "oldStatus", "newStatus"),
+                    (("isSubtask", False), ("parentTaskTitle", None))),
+    "comment-notification": ("render_comment_notification_email", ("taskTitle", "commentText", "commenterName"),
+                             (("isSubtask", False), ("parentTaskTitle", None), ("taskDeadline", None))),
+    "deadline-extension-request": ("render_deadline_extension_request_email",
+                                   ("itemTitle", "requesterName", "currentDeadline", "proposedDeadline"),
+                                   (("reason", ""), ("itemType", "task"), ("parentTaskTitle", None))),
+    "deadline-extension-response": ("render_deadline_extension_response_email", ("itemTitle", "status"),
+                                    (("newDeadline", None), ("rejectionReason", None), ("itemType", "task"),
+                                     ("parentTaskTitle", None))),
+    "deadline-changed": ("render_deadline_changed_email", ("itemTitle", "newDeadline"),
+                         (("requesterName", None), ("itemType", "task"), ("parentTaskTitle", None))),
+}
+
 class EmailService:
     """Service for sending email notifications"""
     
-    def __init__(self):
+    def __init__(self, outbox=None):
         self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_user = os.getenv("SMTP_USER", "")
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
         self.from_email = os.getenv("FROM_EMAIL", self.smtp_user)
         self.from_name = os.getenv("FROM_NAME", "Task Management System")
+        # Sessions are opened and authenticated once and reused across sends
+        self.smtp_pool = SMTPConnectionPool(self.smtp_host, self.smtp_port, self.smtp_user, self.smtp_password)
+        # EmailQueue that send_email writes to instead of sending inline (None sends inline)
+        self.outbox = outbox
+        # Rendered (subject, html) by event, so a fan-out renders each body once
+        self.render_cache = RenderCache(int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "256")))
     
     def format_deadline(self, deadline_epoch):
         """Format deadline epoch to readable date"""
@@ -69,95 +94,112 @@ class EmailService:
         if email_req.task_notes:
             notes_html = f'<p style="margin: 16px 0; color: #4b5563; font-size: 14px; line-height: 1.6;">{email_req.task_notes}</p>'
         
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Task Deadline Reminder</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Task Deadline Reminder</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: {urgency_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        {urgency_label}
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{email_req.task_title}</h2>
-                                    {parent_task_html}
-                                    <div style="background-color: #f9fafb; border-left: 4px solid {urgency_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
-                                        <table role="presentation" style="width: 100%;">
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Deadline:</td>
-                                                <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600; text-align: right;">{deadline_str}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Time Remaining:</td>
-                                                <td style="padding: 8px 0; color: {urgency_color}; font-size: 14px; font-weight: 600; text-align: right;">{time_remaining}</td>
-                                            </tr>
-                                        </table>
-                                    </div>
-                                    {notes_html}
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        Please review this task and take necessary action before the deadline.
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html = templates.TASK_REMINDER.render(
+            urgency_color=urgency_color,
+            urgency_label=urgency_label,
+            task_title=email_req.task_title,
+            parent_task_html=parent_task_html,
+            deadline_str=deadline_str,
+            time_remaining=time_remaining,
+            notes_html=notes_html
+        )
         return html
     
-    def send_email(self, to_email, subject, html_content):
-        """Send email using SMTP"""
+    def build_message(self, to_email, subject, html_content):
+        """Build the MIME message for an HTML email"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html_content, 'html'))
+        return msg
+
+    def deliver_email(self, to_email, subject, html_content):
+        """Send email over SMTP now; raises on failure"""
+        self.smtp_pool.send_message(self.build_message(to_email, subject, html_content))
+
+    def send_email(self, to_email, subject, html_content, queue=True):
+        """Send email, or hand it to the outbox when one is attached and queue is set"""
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            
-            logger.info(f"Email sent successfully to {to_email}")
+            if queue and self.outbox is not None:
+                message_id = self.outbox.enqueue(to_email, subject, html_content)
+                logger.info(f"Email {message_id} to {to_email} queued")
+            else:
+                self.deliver_email(to_email, subject, html_content)
+                logger.info(f"Email sent successfully to {to_email}")
             return True
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def render_job(self, job):
+        """
+        Render one batch job.
+
+        Returns:
+            ((to_email, subject, html), None) or (None, error message)
+        """
+        if not isinstance(job, dict):
+            return None, "Job must be an object"
+        job_type = job.get("type")
+        if job_type == "task-reminder":
+            email_req = EmailRequest.from_dict(job)
+            errors = email_req.validate()
+            if errors:
+                return None, f"Validation failed: {', '.join(errors)}"
+            return (email_req.to_email, *self.render_task_reminder(email_req)), None
+        if job_type not in BATCH_JOB_TYPES:
+            return None, f"Unknown job type: {job_type}"
+
+        render, required, optional = BATCH_JOB_TYPES[job_type]
+        for field in ("toEmail",) + required:
+            if field not in job:
+                return None, f"Missing required field: {field}"
+        args = [job[field] for field in required] + [job.get(field, default) for field, default in optional]
+        try:
+            return (job["toEmail"], *getattr(self, render)(*args)), None
+        except Exception as e:
+            return None, f"Failed to render email: {str(e)}"
+
+    def send_batch(self, jobs):
+        """
+        Render a list of email jobs and queue them in one write, or send them over pooled SMTP sessions
+        when no outbox is attached.
+
+        Returns:
+            one result per job, in order: {"index", "status": "queued" | "sent" | "invalid" | "failed", ...}
+        """
+        results = [None] * len(jobs)
+        messages = []
+        for index, job in enumerate(jobs):
+            message, error = self.render_job(job)
+            if error:
+                results[index] = {"index": index, "status": "invalid", "error": error}
+            else:
+                messages.append((index, message))
+
+        if self.outbox is not None and messages:
+            try:
+                message_ids = self.outbox.enqueue_many([message for _, message in messages])
+            except Exception as e:
+                logger.error(f"Failed to queue email batch: {str(e)}")
+                for index, _ in messages:
+                    results[index] = {"index": index, "status": "failed", "error": "Failed to queue email"}
+                return results
+            for (index, _), message_id in zip(messages, message_ids):
+                results[index] = {"index": index, "status": "queued", "id": message_id}
+            logger.info(f"Queued {len(messages)} of {len(jobs)} batch emails")
+            return results
+
+        for index, (to_email, subject, html_content) in messages:
+            try:
+                self.deliver_email(to_email, subject, html_content)
+                results[index] = {"index": index, "status": "sent"}
+            except Exception as e:
+                logger.error(f"Failed to send email to {to_email}: {str(e)}")
+                results[index] = {"index": index, "status": "failed", "error": str(e)}
+        return results
+
     def send_task_reminder(self, email_req: EmailRequest):
         """Send task or subtask deadline reminder email"""
         # Validate request
@@ -165,17 +207,20 @@ class EmailService:
         if errors:
             return False, errors
         
-        # Create subject
+        success = self.send_email(email_req.to_email, *self.render_task_reminder(email_req))
+        
+        return success, []
+
+    def render_task_reminder(self, email_req: EmailRequest):
+        """Subject and HTML of a task or subtask deadline reminder"""
         if email_req.is_subtask:
             subject = f"Subtask Deadline Reminder: {email_req.task_title}"
         else:
             subject = f"Task Deadline Reminder: {email_req.task_title}"
-        
-        # Create and send email
-        html_content = self.create_email_html(email_req)
-        success = self.send_email(email_req.to_email, subject, html_content)
-        
-        return success, []
+        # The body does not mention the recipient, so reminders for one item share it
+        key = ("render_task_reminder", email_req.task_title, email_req.task_deadline, email_req.days_until_deadline,
+               email_req.task_notes, email_req.is_subtask, email_req.parent_task_title)
+        return self.render_cache.get_or_render(key, lambda: (subject, self.create_email_html(email_req)))
     
     def send_test_email(self, to_email):
         """Send test email"""
@@ -191,7 +236,8 @@ class EmailService:
         </body>
         </html>
         """
-        return self.send_email(to_email, subject, html_content)
+        # Delivered synchronously so the caller learns whether SMTP works
+        return self.send_email(to_email, subject, html_content, queue=False)
     
     def is_configured(self):
         """Check if SMTP credentials are configured"""
@@ -223,86 +269,32 @@ class EmailService:
         if parent_task_title:
             parent_task_html = f'<p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">Part of task: <strong style="color: #111827;">{parent_task_title}</strong></p>'
 
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>{task_type} Status Update</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">{task_type} Status Update</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: {new_status_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        STATUS CHANGED
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{task_title}</h2>
-                                    {parent_task_html}
-                                    <div style="background-color: #f9fafb; border-left: 4px solid {new_status_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
-                                        <table role="presentation" style="width: 100%;">
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Previous Status:</td>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 600; text-align: right; text-decoration: line-through;">{old_status_display}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">New Status:</td>
-                                                <td style="padding: 8px 0; color: {new_status_color}; font-size: 14px; font-weight: 600; text-align: right;">{new_status_display}</td>
-                                            </tr>
-                                        </table>
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        The status of this {task_type.lower()} has been updated. Please review the changes and take any necessary action.
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html = templates.TASK_UPDATE.render(
+            task_type=task_type,
+            new_status_color=new_status_color,
+            task_title=task_title,
+            parent_task_html=parent_task_html,
+            old_status_display=old_status_display,
+            new_status_display=new_status_display,
+            task_type_lower=task_type.lower()
+        )
         return html
 
     def send_task_update_email(self, to_email, task_title, old_status, new_status, is_subtask=False, parent_task_title=None):
         """Send task status update email"""
+        return self.send_email(to_email, *self.render_task_update_email(
+            task_title, old_status, new_status, is_subtask, parent_task_title
+        ))
 
-        # Create subject
+    @cached_render
+    def render_task_update_email(self, task_title, old_status, new_status, is_subtask=False, parent_task_title=None):
+        """Subject and HTML of a task status update email"""
         task_type = "Subtask" if is_subtask else "Task"
         subject = f"{task_type} Status Update: {task_title}"
-
-        # Create and send email
         html_content = self.create_task_update_email_html(
             task_title, old_status, new_status, is_subtask, parent_task_title
         )
-        success = self.send_email(to_email, subject, html_content)
-
-        return success
+        return subject, html_content
 
     def create_comment_notification_email_html(self, task_title, comment_text, commenter_name,
                                                is_subtask=False, parent_task_title=None, task_deadline=None):
@@ -315,88 +307,47 @@ class EmailService:
         if parent_task_title:
             parent_task_html = f'<p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">Part of task: <strong style="color: #111827;">{parent_task_title}</strong></p>'
 
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>New Comment on {task_type}</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">New Comment on {task_type}</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: #10b981; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        NEW COMMENT
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{task_title}</h2>
-                                    {parent_task_html}
-                                    <div style="background-color: #f0f9ff; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 12px;">
-                                        <p style="margin: 0 0 8px 0; color: #6b7280; font-size: 13px; font-weight: 500;">
-                                            Comment by <strong style="color: #111827;">{commenter_name}</strong>
-                                        </p>
-                                        <p style="margin: 0; color: #6b7280; font-size: 14px; line-height: 1.6; font-style: italic; white-space: pre-wrap; word-wrap: break-word; padding-left: 0;">
-                                            "{comment_text}"
-                                        </p>
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        A new comment has been added to a {task_type.lower()} you are assigned to. Please review the comment and respond if necessary.
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html = templates.COMMENT_NOTIFICATION.render(
+            task_type=task_type,
+            task_title=task_title,
+            parent_task_html=parent_task_html,
+            commenter_name=commenter_name,
+            comment_text=comment_text,
+            task_type_lower=task_type.lower()
+        )
         return html
 
     def send_comment_notification_email(self, to_email, task_title, comment_text, commenter_name,
                                         is_subtask=False, parent_task_title=None, task_deadline=None):
         """Send comment notification email"""
+        return self.send_email(to_email, *self.render_comment_notification_email(
+            task_title, comment_text, commenter_name, is_subtask, parent_task_title, task_deadline
+        ))
 
-        # Create subject
+    @cached_render
+    def render_comment_notification_email(self, task_title, comment_text, commenter_name,
+                                          is_subtask=False, parent_task_title=None, task_deadline=None):
+        """Subject and HTML of a comment notification email"""
         task_type = "Subtask" if is_subtask else "Task"
         subject = f"New Comment on {task_type}: {task_title}"
-
-        # Create and send email
         html_content = self.create_comment_notification_email_html(
             task_title, comment_text, commenter_name, is_subtask, parent_task_title, task_deadline
         )
-        success = self.send_email(to_email, subject, html_content)
-
-        return success
+        return subject, html_content
 
     def send_deadline_extension_request_email(self, to_email, item_title, requester_name,
                                               current_deadline, proposed_deadline, reason,
                                               item_type="task", parent_task_title=None):
         """Send deadline extension request email"""
+        return self.send_email(to_email, *self.render_deadline_extension_request_email(
+            item_title, requester_name, current_deadline, proposed_deadline, reason, item_type, parent_task_title
+        ))
+
+    @cached_render
+    def render_deadline_extension_request_email(self, item_title, requester_name,
+                                                current_deadline, proposed_deadline, reason,
+                                                item_type="task", parent_task_title=None):
+        """Subject and HTML of a deadline extension request email"""
         from datetime import datetime
 
         # Format deadlines
@@ -423,81 +374,28 @@ class EmailService:
             """
 
         # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Deadline Extension Request</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Deadline Extension Request</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: #f59e0b; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        EXTENSION REQUESTED
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{item_title}</h2>
-                                    {parent_task_html}
-                                    <p style="margin: 0 0 20px 0; color: #6b7280; font-size: 14px;">
-                                        <strong style="color: #111827;">{requester_name}</strong> has requested a deadline extension.
-                                    </p>
-                                    <div style="background-color: #f9fafb; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
-                                        <table role="presentation" style="width: 100%;">
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Current Deadline:</td>
-                                                <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600; text-align: right;">{current_deadline_str}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Proposed Deadline:</td>
-                                                <td style="padding: 8px 0; color: #3b82f6; font-size: 14px; font-weight: 600; text-align: right;">{proposed_deadline_str}</td>
-                                            </tr>
-                                        </table>
-                                    </div>
-                                    {reason_html}
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        Please review this request in your in-app notification inbox to approve or reject it.
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html_content = templates.EXTENSION_REQUEST.render(
+            item_title=item_title,
+            parent_task_html=parent_task_html,
+            requester_name=requester_name,
+            current_deadline_str=current_deadline_str,
+            proposed_deadline_str=proposed_deadline_str,
+            reason_html=reason_html
+        )
 
-        success = self.send_email(to_email, subject, html_content)
-        return success
+        return subject, html_content
 
     def send_deadline_extension_response_email(self, to_email, item_title, status, new_deadline=None,
                                                rejection_reason=None, item_type="task", parent_task_title=None):
         """Send deadline extension response email (approved/rejected)"""
+        return self.send_email(to_email, *self.render_deadline_extension_response_email(
+            item_title, status, new_deadline, rejection_reason, item_type, parent_task_title
+        ))
+
+    @cached_render
+    def render_deadline_extension_response_email(self, item_title, status, new_deadline=None,
+                                                 rejection_reason=None, item_type="task", parent_task_title=None):
+        """Subject and HTML of a deadline extension response email"""
         from datetime import datetime
 
         # Create subject
@@ -544,70 +442,35 @@ class EmailService:
             </div>
             """
 
+        closing_message = ('The new deadline is now in effect.' if status == 'approved'
+                           else 'Please plan accordingly with the original deadline.')
+
         # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Extension Request {status_text}</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Extension Request {status_text}</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: {border_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        {badge_text}
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{item_title}</h2>
-                                    {parent_task_html}
-                                    <div style="background-color: {bg_color}; border-left: 4px solid {border_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
-                                        <p style="margin: 0; color: #111827; font-size: 14px;">{status_message}</p>
-                                    </div>
-                                    {details_html}
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        {'The new deadline is now in effect.' if status == 'approved' else 'Please plan accordingly with the original deadline.'}
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html_content = templates.EXTENSION_RESPONSE.render(
+            status_text=status_text,
+            border_color=border_color,
+            badge_text=badge_text,
+            item_title=item_title,
+            parent_task_html=parent_task_html,
+            bg_color=bg_color,
+            status_message=status_message,
+            details_html=details_html,
+            closing_message=closing_message
+        )
 
-        success = self.send_email(to_email, subject, html_content)
-        return success
+        return subject, html_content
 
     def send_deadline_changed_email(self, to_email, item_title, new_deadline, requester_name=None,
                                     item_type="task", parent_task_title=None):
         """Send deadline changed email"""
+        return self.send_email(to_email, *self.render_deadline_changed_email(
+            item_title, new_deadline, requester_name, item_type, parent_task_title
+        ))
+
+    @cached_render
+    def render_deadline_changed_email(self, item_title, new_deadline, requester_name=None,
+                                      item_type="task", parent_task_title=None):
+        """Subject and HTML of a deadline changed email"""
         from datetime import datetime
 
         # Format new deadline
@@ -628,69 +491,11 @@ class EmailService:
             requester_info = f' on request by <strong style="color: #111827;">{requester_name}</strong>'
 
         # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Deadline Extended</title>
-        </head>
-        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
-            <table role="presentation" style="width: 100%; border-collapse: collapse;">
-                <tr>
-                    <td style="padding: 40px 20px;">
-                        <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                            <tr>
-                                <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                                    <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Deadline Extended</h1>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px 0;">
-                                    <div style="display: inline-block; background-color: #3b82f6; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
-                                        DEADLINE UPDATED
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 20px 30px;">
-                                    <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">{item_title}</h2>
-                                    {parent_task_html}
-                                    <p style="margin: 0 0 20px 0; color: #6b7280; font-size: 14px;">
-                                        The deadline has been extended{requester_info}.
-                                    </p>
-                                    <div style="background-color: #dbeafe; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
-                                        <table role="presentation" style="width: 100%;">
-                                            <tr>
-                                                <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">New Deadline:</td>
-                                                <td style="padding: 8px 0; color: #3b82f6; font-size: 14px; font-weight: 600; text-align: right;">{new_deadline_str}</td>
-                                            </tr>
-                                        </table>
-                                    </div>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="padding: 0 30px 30px;">
-                                    <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
-                                        The new deadline is now in effect. Please plan your work accordingly.
-                                    </p>
-                                </td>
-                            </tr>
-                            <tr>
-                                <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
-                                    <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
-                                        This is an automated notification from your Task Management System.
-                                    </p>
-                                </td>
-                            </tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
+        html_content = templates.DEADLINE_CHANGED.render(
+            item_title=item_title,
+            parent_task_html=parent_task_html,
+            requester_info=requester_info,
+            new_deadline_str=new_deadline_str
+        )
 
-        success = self.send_email(to_email, subject, html_content)
-        return success
\ No newline at end of file
+        return subject, html_content
@@ -0,0 +1,156 @@
+# backend/email-service/smtp_pool.py
+"""Reusable authenticated SMTP sessions.
+
+Opening a session costs a TCP connect, STARTTLS and AUTH, often hundreds of
+milliseconds, and providers rate-limit new connections. The pool keeps up to
+SMTP_POOL_SIZE sessions open and sends many messages on each. A session that
+sat idle longer than SMTP_MAX_IDLE_SECONDS is checked with NOOP before reuse,
+one that has sent SMTP_MAX_MESSAGES_PER_CONNECTION messages is retired, and a
+send that fails because the server dropped the session is retried once on a
+fresh one.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    """An open SMTP connection and its usage counters"""
+
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of logged-in SMTP sessions"""
+
+    def __init__(self, host, port, user="", password="", size=None, max_messages=None, max_idle=None,
+                 starttls=None, timeout=None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(1, size if size is not None else int(os.getenv("SMTP_POOL_SIZE", "4")))
+        self.max_messages = max_messages if max_messages is not None else int(
+            os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+        self.max_idle = max_idle if max_idle is not None else float(os.getenv("SMTP_MAX_IDLE_SECONDS", "30"))
+        self.starttls = starttls if starttls is not None else os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        self.timeout = timeout if timeout is not None else float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        self.connections_opened += 1
+        return _Session(server)
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _alive(session):
+        try:
+            return session.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self):
+        """Take an idle session, or open one if fewer than size are open, waiting otherwise"""
+        with self._condition:
+            while not self._idle and self._open >= self.size:
+                self._condition.wait()
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                session = None
+                self._open += 1
+
+        if session is not None and time.monotonic() - session.last_used > self.max_idle and not self._alive(session):
+            logger.info("Replacing stale SMTP connection")
+            self._quit(session.server)
+            session = None
+        if session is None:
+            try:
+                session = self._connect()
+            except Exception:
+                self._release(None)
+                raise
+        return session
+
+    def _release(self, session):
+        """Return a session to the pool, or give up its slot when session is None"""
+        if session is not None and session.sent >= self.max_messages > 0:
+            self._quit(session.server)
+            session = None
+        with self._condition:
+            if session is None:
+                self._open -= 1
+            else:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+            self._condition.notify()
+
+    @contextmanager
+    def session(self):
+        """Borrow a logged-in SMTP connection; it is discarded if the block raises"""
+        session = self._acquire()
+        try:
+            yield session
+        except Exception:
+            self._quit(session.server)
+            self._release(None)
+            raise
+        self._release(session)
+
+    def send_message(self, msg):
+        """Send msg on a pooled session, retrying once if the server had dropped it"""
+        for attempt in (1, 2):
+            try:
+                with self.session() as session:
+                    session.server.send_message(msg)
+                    session.sent += 1
+                self.messages_sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if attempt == 2:
+                    raise
+                logger.info("SMTP connection dropped; retrying on a new connection")
+
+    def close(self):
+        """Close every idle session"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for session in idle:
+            self._quit(session.server)
+
+    def stats(self):
+        with self._condition:
+            return {"open": self._open, "idle": len(self._idle), "size": self.size,
+                    "connectionsOpened": self.connections_opened, "messagesSent": self.messages_sent}
@@ -0,0 +1,458 @@
+# backend/email-service/templates.py
+"""Email layouts compiled once at import.
+
+Each layout is split once into its literal HTML chunks (with the source
+indentation dropped) and slot names, so rendering is a single join.
+RenderCache keeps recently rendered (subject, html) pairs by event, so a
+fan-out renders the body once and only the recipient changes per message.
+"""
+import functools
+import re
+import threading
+from collections import OrderedDict
+
+_SLOT = re.compile(r"\$\{(\w+)\}")
+_INDENT = re.compile(r"\n[ \t]+")
+
+
+class EmailTemplate:
+    """An HTML layout with ${field} slots"""
+
+    def __init__(self, source):
+        chunks = _SLOT.split(source.strip())
+        self.literals = [_INDENT.sub("\n", chunk) for chunk in chunks[0::2]]
+        self.fields = chunks[1::2]
+        # Literal chunks after the first, each paired with the slot before it
+        self._pairs = list(zip(self.fields, self.literals[1:]))
+
+    def render(self, **values):
+        return self.literals[0] + "".join(str(values[field]) + literal for field, literal in self._pairs)
+
+
+class RenderCache:
+    """Thread-safe cache of recently rendered emails keyed by event, evicting the oldest first"""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        """Return the cached rendering for key, calling render() on a miss"""
+        try:
+            value = self._entries.get(key)
+        except TypeError:
+            # Unhashable arguments (lists from a malformed request) are rendered uncached
+            return render()
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = render()
+        if self.size > 0:
+            with self._lock:
+                self._entries[key] = value
+                if len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxSize": self.size, "hits": self.hits, "misses": self.misses}
+
+
+def cached_render(method):
+    """Serve a render method from its instance's render_cache, keyed by method name and arguments"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def render(self, *args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+        return self.render_cache.get_or_render(key, lambda: method(self, *args, **kwargs))
+
+    return render
+
+
+TASK_REMINDER = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Task Deadline Reminder</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Task Deadline Reminder</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: ${urgency_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                ${urgency_label}
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${task_title}</h2>
+                            ${parent_task_html}
+                            <div style="background-color: #f9fafb; border-left: 4px solid ${urgency_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
+                                <table role="presentation" style="width: 100%;">
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Deadline:</td>
+                                        <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600; text-align: right;">${deadline_str}</td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Time Remaining:</td>
+                                        <td style="padding: 8px 0; color: ${urgency_color}; font-size: 14px; font-weight: 600; text-align: right;">${time_remaining}</td>
+                                    </tr>
+                                </table>
+                            </div>
+                            ${notes_html}
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                Please review this task and take necessary action before the deadline.
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+TASK_UPDATE = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>${task_type} Status Update</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">${task_type} Status Update</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: ${new_status_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                STATUS CHANGED
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${task_title}</h2>
+                            ${parent_task_html}
+                            <div style="background-color: #f9fafb; border-left: 4px solid ${new_status_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
+                                <table role="presentation" style="width: 100%;">
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Previous Status:</td>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 600; text-align: right; text-decoration: line-through;">${old_status_display}</td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">New Status:</td>
+                                        <td style="padding: 8px 0; color: ${new_status_color}; font-size: 14px; font-weight: 600; text-align: right;">${new_status_display}</td>
+                                    </tr>
+                                </table>
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                The status of this ${task_type_lower} has been updated. Please review the changes and take any necessary action.
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+COMMENT_NOTIFICATION = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>New Comment on ${task_type}</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">New Comment on ${task_type}</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: #10b981; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                NEW COMMENT
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${task_title}</h2>
+                            ${parent_task_html}
+                            <div style="background-color: #f0f9ff; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 12px;">
+                                <p style="margin: 0 0 8px 0; color: #6b7280; font-size: 13px; font-weight: 500;">
+                                    Comment by <strong style="color: #111827;">${commenter_name}</strong>
+                                </p>
+                                <p style="margin: 0; color: #6b7280; font-size: 14px; line-height: 1.6; font-style: italic; white-space: pre-wrap; word-wrap: break-word; padding-left: 0;">
+                                    "${comment_text}"
+                                </p>
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                A new comment has been added to a ${task_type_lower} you are assigned to. Please review the comment and respond if necessary.
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+EXTENSION_REQUEST = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Deadline Extension Request</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Deadline Extension Request</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: #f59e0b; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                EXTENSION REQUESTED
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${item_title}</h2>
+                            ${parent_task_html}
+                            <p style="margin: 0 0 20px 0; color: #6b7280; font-size: 14px;">
+                                <strong style="color: #111827;">${requester_name}</strong> has requested a deadline extension.
+                            </p>
+                            <div style="background-color: #f9fafb; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
+                                <table role="presentation" style="width: 100%;">
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Current Deadline:</td>
+                                        <td style="padding: 8px 0; color: #111827; font-size: 14px; font-weight: 600; text-align: right;">${current_deadline_str}</td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">Proposed Deadline:</td>
+                                        <td style="padding: 8px 0; color: #3b82f6; font-size: 14px; font-weight: 600; text-align: right;">${proposed_deadline_str}</td>
+                                    </tr>
+                                </table>
+                            </div>
+                            ${reason_html}
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                Please review this request in your in-app notification inbox to approve or reject it.
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+EXTENSION_RESPONSE = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Extension Request ${status_text}</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Extension Request ${status_text}</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: ${border_color}; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                ${badge_text}
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${item_title}</h2>
+                            ${parent_task_html}
+                            <div style="background-color: ${bg_color}; border-left: 4px solid ${border_color}; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
+                                <p style="margin: 0; color: #111827; font-size: 14px;">${status_message}</p>
+                            </div>
+                            ${details_html}
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                ${closing_message}
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+DEADLINE_CHANGED = EmailTemplate("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Deadline Extended</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 40px 20px;">
+                <table role="presentation" style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <tr>
+                        <td style="background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
+                            <h1 style="margin: 0; color: #ffffff; font-size: 24px; font-weight: 700;">Deadline Extended</h1>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px 0;">
+                            <div style="display: inline-block; background-color: #3b82f6; color: #ffffff; padding: 8px 16px; border-radius: 20px; font-size: 12px; font-weight: 600; letter-spacing: 0.5px;">
+                                DEADLINE UPDATED
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 20px 30px;">
+                            <h2 style="margin: 0 0 16px 0; color: #111827; font-size: 20px; font-weight: 600;">${item_title}</h2>
+                            ${parent_task_html}
+                            <p style="margin: 0 0 20px 0; color: #6b7280; font-size: 14px;">
+                                The deadline has been extended${requester_info}.
+                            </p>
+                            <div style="background-color: #dbeafe; border-left: 4px solid #3b82f6; padding: 16px; border-radius: 4px; margin-bottom: 20px;">
+                                <table role="presentation" style="width: 100%;">
+                                    <tr>
+                                        <td style="padding: 8px 0; color: #6b7280; font-size: 14px; font-weight: 500;">New Deadline:</td>
+                                        <td style="padding: 8px 0; color: #3b82f6; font-size: 14px; font-weight: 600; text-align: right;">${new_deadline_str}</td>
+                                    </tr>
+                                </table>
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0 30px 30px;">
+                            <p style="margin: 0 0 16px 0; color: #6b7280; font-size: 14px;">
+                                The new deadline is now in effect. Please plan your work accordingly.
+                            </p>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; border-radius: 0 0 12px 12px; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0; color: #9ca3af; font-size: 12px; text-align: center;">
+                                This is an automated notification from your Task Management System.
+                            </p>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
@@ -10,6 +10,7 @@ os.environ['SMTP_PORT'] = '587'
 os.environ['SMTP_USER'] = 'test@test.com'
 os.environ['SMTP_PASSWORD'] = 'testpass'
 os.environ['FROM_EMAIL'] = 'test@test.com'
+os.environ['EMAIL_QUEUE_PATH'] = ':memory:'
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -147,11 +148,11 @@ class TestEmailService:
         assert "Parent Task" in html
         assert "Subtask" in html
     
-    @patch('email_service.smtplib.SMTP')
+    @patch('smtp_pool.smtplib.SMTP')
     def test_send_email_success(self, mock_smtp, email_service):
         """Test successful email sending"""
         mock_server = MagicMock()
-        mock_smtp.return_value.__enter__.return_value = mock_server
+        mock_smtp.return_value = mock_server
         
         result = email_service.send_email(
             "recipient@example.com",
@@ -167,10 +168,10 @@ class TestEmailService:
         )
         mock_server.send_message.assert_called_once()
     
-    @patch('email_service.smtplib.SMTP')
+    @patch('smtp_pool.smtplib.SMTP')
     def test_send_email_failure(self, mock_smtp, email_service):
         """Test email sending failure"""
-        mock_smtp.return_value.__enter__.side_effect = Exception("SMTP Error")
+        mock_smtp.side_effect = Exception("SMTP Error")
         
         result = email_service.send_email(
             "recipient@example.com",
@@ -180,11 +181,11 @@ class TestEmailService:
         
         assert result == False
     
-    @patch('email_service.smtplib.SMTP')
+    @patch('smtp_pool.smtplib.SMTP')
     def test_send_task_reminder(self, mock_smtp, email_service, sample_email_request):
         """Test sending task reminder"""
         mock_server = MagicMock()
-        mock_smtp.return_value.__enter__.return_value = mock_server
+        mock_smtp.return_value = mock_server
         
         success, errors = email_service.send_task_reminder(sample_email_request)
         
@@ -192,17 +193,46 @@ class TestEmailService:
         assert len(errors) == 0
         mock_server.send_message.assert_called_once()
     
-    @patch('email_service.smtplib.SMTP')
+    @patch('smtp_pool.smtplib.SMTP')
     def test_send_test_email(self, mock_smtp, email_service):
         """Test sending test email"""
         mock_server = MagicMock()
-        mock_smtp.return_value.__enter__.return_value = mock_server
+        mock_smtp.return_value = mock_server
         
         result = email_service.send_test_email("test@example.com")
         
         assert result == True
         mock_server.send_message.assert_called_once()
     
+    @patch('smtp_pool.smtplib.SMTP')
+    def test_send_email_reuses_pooled_connection(self, mock_smtp, email_service):
+        """Test consecutive sends share one authenticated SMTP session"""
+        mock_server = MagicMock()
+        mock_smtp.return_value = mock_server
+        
+        for i in range(3):
+            assert email_service.send_email(f"user{i}@example.com", "Subject", "<html>Test</html>") == True
+        
+        assert mock_smtp.call_count == 1
+        mock_server.login.assert_called_once()
+        assert mock_server.send_message.call_count == 3
+        assert email_service.smtp_pool.stats()["idle"] == 1
+    
+    @patch('smtp_pool.smtplib.SMTP')
+    def test_send_email_replaces_dropped_connection(self, mock_smtp, email_service):
+        """Test a send on a connection the server closed is retried on a new one"""
+        import smtplib
+        stale_server, fresh_server = MagicMock(), MagicMock()
+        stale_server.send_message.side_effect = [None, smtplib.SMTPServerDisconnected("closed")]
+        mock_smtp.side_effect = [stale_server, fresh_server]
+        
+        assert email_service.send_email("a@example.com", "Subject", "<html>Test</html>") == True
+        assert email_service.send_email("b@example.com", "Subject", "<html>Test</html>") == True
+        
+        assert mock_smtp.call_count == 2
+        fresh_server.send_message.assert_called_once()
+        assert email_service.smtp_pool.stats()["open"] == 1
+    
     def test_is_configured(self, email_service):
         """Test configuration check"""
         assert email_service.is_configured() == True
@@ -262,10 +292,10 @@ class TestEmailEndpoints:
             headers={'Content-Type': 'application/json'}
         )
         
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
         assert 'message' in data
-        assert 'sentAt' in data
+        assert 'queuedAt' in data
     
     @patch('app.email_service.send_task_reminder')
     def test_send_task_reminder_failure(self, mock_send, client):
@@ -342,9 +372,9 @@ class TestTaskUpdateEndpoint:
             "newStatus": "completed"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
-        assert data['message'] == "Task update email sent successfully"
+        assert data['message'] == "Task update email queued for delivery"
         mock_send.assert_called_once()
 
     @patch('app.email_service.send_task_update_email')
@@ -361,7 +391,7 @@ class TestTaskUpdateEndpoint:
             "parentTaskTitle": "Parent Task"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         mock_send.assert_called_once_with(
             "test@example.com", "Test Subtask", "to_do", "in_progress", True, "Parent Task"
         )
@@ -404,7 +434,7 @@ class TestTaskUpdateEndpoint:
 
         assert response.status_code == 500
         data = response.get_json()
-        assert 'Failed to send task update email' in data['error']
+        assert 'Failed to queue task update email' in data['error']
 
 
 class TestCommentNotificationEndpoint:
@@ -422,9 +452,9 @@ class TestCommentNotificationEndpoint:
             "commenterName": "John Doe"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
-        assert data['message'] == "Comment notification email sent successfully"
+        assert data['message'] == "Comment notification email queued for delivery"
 
     @patch('app.email_service.send_comment_notification_email')
     def test_send_comment_notification_with_subtask(self, mock_send, client):
@@ -441,7 +471,7 @@ class TestCommentNotificationEndpoint:
             "taskDeadline": 1700000000
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         mock_send.assert_called_once_with(
             "test@example.com", "Test Subtask", "Looks good", "Jane Doe",
             True, "Parent Task", 1700000000
@@ -499,9 +529,9 @@ class TestDeadlineExtensionRequestEndpoint:
             "reason": "Need more time"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
-        assert data['message'] == "Deadline extension request email sent successfully"
+        assert data['message'] == "Deadline extension request email queued for delivery"
 
     @patch('app.email_service.send_deadline_extension_request_email')
     def test_send_deadline_extension_request_with_subtask(self, mock_send, client):
@@ -519,7 +549,7 @@ class TestDeadlineExtensionRequestEndpoint:
             "parentTaskTitle": "Parent Task"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         mock_send.assert_called_once()
 
     def test_send_deadline_extension_request_missing_body(self, client):
@@ -573,9 +603,9 @@ class TestDeadlineExtensionResponseEndpoint:
             "newDeadline": 1700086400
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
-        assert data['message'] == "Deadline extension response email sent successfully"
+        assert data['message'] == "Deadline extension response email queued for delivery"
 
     @patch('app.email_service.send_deadline_extension_response_email')
     def test_send_deadline_extension_response_rejected(self, mock_send, client):
@@ -591,7 +621,7 @@ class TestDeadlineExtensionResponseEndpoint:
             "parentTaskTitle": "Parent"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         mock_send.assert_called_once()
 
     def test_send_deadline_extension_response_missing_body(self, client):
@@ -641,9 +671,9 @@ class TestDeadlineChangedEndpoint:
             "newDeadline": 1700086400
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.get_json()
-        assert data['message'] == "Deadline changed email sent successfully"
+        assert data['message'] == "Deadline changed email queued for delivery"
 
     @patch('app.email_service.send_deadline_changed_email')
     def test_send_deadline_changed_with_requester(self, mock_send, client):
@@ -659,7 +689,7 @@ class TestDeadlineChangedEndpoint:
             "parentTaskTitle": "Parent Task"
         })
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         mock_send.assert_called_once_with(
             "collaborator@example.com", "Test Subtask", 1700086400,
             "John Doe", "subtask", "Parent Task"
@@ -698,5 +728,195 @@ class TestDeadlineChangedEndpoint:
         assert response.status_code == 500
 
 
+class TestEmailQueue:
+    """Test the durable outbox and its sender pool"""
+
+    @pytest.fixture
+    def queue(self):
+        from email_queue import EmailQueue
+        queue = EmailQueue(':memory:', rate=0)
+        yield queue
+        queue.close()
+
+    def test_route_queues_message(self, client):
+        """Test an email route stores the rendered message and returns 202"""
+        with patch('smtp_pool.smtplib.SMTP') as mock_smtp:
+            response = client.post('/email/send-task-update', json={
+                "toEmail": "queued@example.com",
+                "taskTitle": "Queued Task",
+                "oldStatus": "ongoing",
+                "newStatus": "completed"
+            })
+            mock_smtp.assert_not_called()
+
+        assert response.status_code == 202
+        stats = client.get('/email/queue').get_json()
+        assert stats['depth']['pending'] >= 1
+        assert 'latency' in stats
+
+    def test_sender_delivers_and_records_latency(self, queue):
+        """Test a claimed message is delivered once and counted as sent"""
+        from email_queue import EmailSenderPool
+        deliver = Mock()
+        senders = EmailSenderPool(queue, deliver, workers=1)
+        queue.enqueue("a@example.com", "Subject", "<html>A</html>")
+
+        assert senders.process_one() == True
+        assert senders.process_one() == False
+        deliver.assert_called_once_with("a@example.com", "Subject", "<html>A</html>")
+        stats = queue.stats()
+        assert stats['depth']['sent'] == 1
+        assert stats['depth']['pending'] == 0
+        assert stats['latency']['count'] == 1
+
+    def test_sender_retries_with_backoff_then_gives_up(self, queue):
+        """Test failed sends back off exponentially and fail after max attempts"""
+        from email_queue import EmailSenderPool
+        deliver = Mock(side_effect=ConnectionError("down"))
+        senders = EmailSenderPool(queue, deliver, workers=1, max_attempts=3, backoff_seconds=10)
+        queue.enqueue("a@example.com", "Subject", "<html>A</html>")
+
+        import time
+        now = time.time()
+        assert senders.process_one(now) == True
+        assert queue.claim(now + 5) is None
+        assert queue.stats(now + 5)['depth']['retrying'] == 1
+        assert senders.process_one(now + 11) == True
+        assert queue.claim(now + 25) is None
+        assert senders.process_one(now + 60) == True
+
+        assert deliver.call_count == 3
+        assert senders.retry_delay(1) == 10 and senders.retry_delay(2) == 20
+        assert queue.stats()['depth']['failed'] == 1
+
+    def test_permanent_rejection_is_not_retried(self, queue):
+        """Test a 5xx SMTP reply fails the message immediately"""
+        import smtplib
+        from email_queue import EmailSenderPool
+        deliver = Mock(side_effect=smtplib.SMTPDataError(550, b"mailbox unavailable"))
+        senders = EmailSenderPool(queue, deliver, workers=1)
+        queue.enqueue("a@example.com", "Subject", "<html>A</html>")
+
+        senders.process_one()
+
+        assert deliver.call_count == 1
+        assert queue.stats()['depth']['failed'] == 1
+
+    def test_claims_are_paced_to_rate(self):
+        """Test each claim reserves a send slot 1/rate after the previous one"""
+        import time
+        from email_queue import EmailQueue
+        queue = EmailQueue(':memory:', rate=5)
+        for i in range(3):
+            queue.enqueue(f"user{i}@example.com", "Subject", "<html></html>")
+        now = time.time()
+
+        slots = [queue.claim(now)[1] for _ in range(3)]
+
+        assert slots == pytest.approx([now, now + 0.2, now + 0.4])
+        assert queue.claim(now) is None
+        queue.close()
+
+
+class TestSendBatchEndpoint:
+    """Test batch email endpoint"""
+
+    def test_send_batch_mixed_jobs(self, client):
+        """Test POST /email/send-batch queues valid jobs and reports invalid ones per item"""
+        response = client.post('/email/send-batch', json={"jobs": [
+            {"type": "task-update", "toEmail": "a@example.com", "taskTitle": "T",
+             "oldStatus": "ongoing", "newStatus": "completed"},
+            {"type": "task-reminder", "toEmail": "b@example.com", "taskTitle": "T",
+             "taskDeadline": 1700000000, "daysUntilDeadline": 1.0},
+            {"type": "comment-notification", "toEmail": "c@example.com", "taskTitle": "T"},
+            {"type": "unknown", "toEmail": "d@example.com"}
+        ]})
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['accepted'] == 2
+        assert data['rejected'] == 2
+        assert [r['status'] for r in data['results']] == ["queued", "queued", "invalid", "invalid"]
+        assert data['results'][2]['error'] == "Missing required field: commentText"
+        assert "Unknown job type" in data['results'][3]['error']
+
+    def test_send_batch_all_invalid(self, client):
+        """Test POST /email/send-batch with no valid jobs"""
+        response = client.post('/email/send-batch', json={"jobs": [{"type": "deadline-changed"}]})
+        assert response.status_code == 400
+
+    def test_send_batch_missing_jobs(self, client):
+        """Test POST /email/send-batch without a jobs list"""
+        response = client.post('/email/send-batch', json={"jobs": []})
+        assert response.status_code == 400
+        response = client.post('/email/send-batch', json={"type": "task-update"})
+        assert response.status_code == 400
+
+    @patch('smtp_pool.smtplib.SMTP')
+    def test_send_batch_without_outbox_shares_session(self, mock_smtp, email_service):
+        """Test a batch sent inline goes out over one pooled SMTP session"""
+        mock_server = MagicMock()
+        mock_smtp.return_value = mock_server
+        jobs = [{"type": "deadline-changed", "toEmail": f"user{i}@example.com", "itemTitle": "T",
+                 "newDeadline": 1700086400} for i in range(3)]
+
+        results = email_service.send_batch(jobs)
+
+        assert [r['status'] for r in results] == ["sent"] * 3
+        assert mock_smtp.call_count == 1
+        assert mock_server.send_message.call_count == 3
+
+
+class TestEmailTemplates:
+    """Test compiled templates and the per-event render cache"""
+
+    def test_template_compiles_slots_and_drops_indentation(self):
+        """Test a template renders its slots and strips source indentation"""
+        from templates import EmailTemplate
+        template = EmailTemplate("""
+            <div>
+                <h2>${title}</h2>
+                <p>{literal braces} ${count}</p>
+            </div>
+        """)
+
+        assert template.fields == ["title", "count"]
+        assert template.render(title="Report", count=3) == "<div>\n<h2>Report</h2>\n<p>{literal braces} 3</p>\n</div>"
+
+    def test_fan_out_renders_body_once(self, email_service):
+        """Test the same comment for many recipients is rendered once"""
+        with patch.object(email_service, 'create_comment_notification_email_html',
+                          wraps=email_service.create_comment_notification_email_html) as mock_create:
+            jobs = [{"type": "comment-notification", "toEmail": f"user{i}@example.com", "taskTitle": "T",
+                     "commentText": "Looks good", "commenterName": "Jane"} for i in range(5)]
+            email_service.outbox = Mock()
+            email_service.outbox.enqueue_many.return_value = list(range(5))
+
+            results = email_service.send_batch(jobs)
+
+        assert [r['status'] for r in results] == ["queued"] * 5
+        assert mock_create.call_count == 1
+        messages = email_service.outbox.enqueue_many.call_args[0][0]
+        assert [m[0] for m in messages] == [f"user{i}@example.com" for i in range(5)]
+        assert len({m[2] for m in messages}) == 1
+        assert email_service.render_cache.stats()['hits'] == 4
+
+    def test_reminders_share_body_across_recipients(self, email_service, sample_email_request):
+        """Test reminders that differ only by recipient share one rendering"""
+        from dataclasses import replace
+        first = email_service.render_task_reminder(sample_email_request)
+        second = email_service.render_task_reminder(replace(sample_email_request, to_email="other@example.com"))
+        changed = email_service.render_task_reminder(replace(sample_email_request, days_until_deadline=0.5))
+
+        assert second is first
+        assert changed[1] != first[1]
+
+    def test_unhashable_arguments_render_uncached(self, email_service):
+        """Test malformed list arguments still render"""
+        subject, html = email_service.render_deadline_changed_email(["T"], 1700086400)
+        assert "['T']" in subject
+        assert email_service.render_cache.stats()['size'] == 0
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
@@ -5,13 +5,14 @@ import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from shared import init_firebase, validate_epoch_timestamp
+from shared import init_firebase, validate_epoch_timestamp, init_responses
 
 from extension_request_service import ExtensionRequestService
 from models import CreateExtensionRequestRequest, UpdateExtensionRequestRequest
 
 app = Flask(__name__)
 CORS(app)
+init_responses(app)
 
 # Initialize Firebase
 init_firebase()
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class ExtensionRequest:
     """Extension Request data model"""
     request_id: str
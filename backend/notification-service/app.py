@@ -7,13 +7,14 @@ import os
 import logging
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from shared import init_firebase
+from shared import init_firebase, cache_stats, with_etag, init_responses
 
 from notification_service import NotificationService
 from scheduler_service import SchedulerService
 
 app = Flask(__name__)
 CORS(app)
+init_responses(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,12 +28,21 @@ notification_service = NotificationService()
 email_service_url = os.getenv("EMAIL_SERVICE_URL", "http://email-service:6005")
 scheduler_service = SchedulerService(email_service_url)
 
+def send_email_batch(jobs):
+    """Send (user_id, email job) pairs in one /email/send-batch request.
+
+    Returns the user ids whose email was accepted.
+    """
+    accepted = scheduler_service.send_email_batch([job for _, job in jobs])
+    return [jobs[index][0] for index in accepted]
+
 @app.route("/notifications/<user_id>", methods=["GET"])
+@with_etag
 def get_user_notifications(user_id):
     """Get all notifications for a user"""
     try:
-        notifications = notification_service.get_user_notifications(user_id)
-        return jsonify(notifications=[n.to_dict() for n in notifications]), 200
+        notifications = notification_service.get_user_notifications(user_id, wire=True)
+        return jsonify(notifications=notifications), 200
     except Exception as e:
         return jsonify(error=f"Failed to retrieve notifications: {str(e)}"), 500
 
@@ -48,6 +58,15 @@ def get_unread_notifications(user_id):
     except Exception as e:
         return jsonify(error=f"Failed to retrieve unread notifications: {str(e)}"), 500
 
+@app.route("/notifications/<user_id>/unread/count", methods=["GET"])
+@with_etag
+def get_unread_count(user_id):
+    """Get a user's unread notification count"""
+    try:
+        return jsonify(count=notification_service.get_unread_count(user_id)), 200
+    except Exception as e:
+        return jsonify(error=f"Failed to retrieve unread count: {str(e)}"), 500
+
 @app.route("/notifications/<user_id>/<notification_id>/read", methods=["PATCH"])
 def mark_notification_read(user_id, notification_id):
     """Mark a notification as read"""
@@ -91,7 +110,8 @@ def mark_all_notifications_read(user_id):
 def trigger_scheduler_manually():
     """Manually trigger the deadline checker (for testing)"""
     try:
-        scheduler_service.trigger_manually()
+        if not scheduler_service.trigger_manually():
+            return jsonify(error="Deadline check is already running in another process"), 409
         return jsonify(message="Scheduler triggered successfully"), 200
     except Exception as e:
         return jsonify(error=f"Failed to trigger scheduler: {str(e)}"), 500
@@ -119,7 +139,7 @@ def send_task_update_notification():
         user_emails = data.get('userEmails', {})  # Dict mapping user_id to email
 
         notifications_sent = []
-        emails_sent = []
+        email_jobs = []
 
         # Send notifications to each user
         for user_id in user_ids:
@@ -136,32 +156,20 @@ def send_task_update_notification():
                 if notification_id:
                     notifications_sent.append(user_id)
 
-            # Send email notification if channel includes email
+            # Queue email notification if channel includes email
             if channel in ['email', 'both'] and user_id in user_emails:
-                try:
-                    import requests
-                    email_data = {
-                        "toEmail": user_emails[user_id],
-                        "taskTitle": task_title,
-                        "oldStatus": old_status,
-                        "newStatus": new_status,
-                        "isSubtask": is_subtask,
-                        "parentTaskTitle": parent_task_title
-                    }
-
-                    response = requests.post(
-                        f"{email_service_url}/email/send-task-update",
-                        json=email_data,
-                        timeout=10
-                    )
-
-                    if response.status_code == 200:
-                        emails_sent.append(user_id)
-                        logger.info(f"Task update email sent to {user_emails[user_id]}")
-                    else:
-                        logger.error(f"Failed to send email: {response.text}")
-                except Exception as e:
-                    logger.error(f"Error sending email: {str(e)}")
+                email_jobs.append((user_id, {
+                    "type": "task-update",
+                    "toEmail": user_emails[user_id],
+                    "taskTitle": task_title,
+                    "oldStatus": old_status,
+                    "newStatus": new_status,
+                    "isSubtask": is_subtask,
+                    "parentTaskTitle": parent_task_title
+                }))
+
+        # One request to the email service for the whole fan-out
+        emails_sent = send_email_batch(email_jobs)
 
         return jsonify(
             message="Task update notifications sent",
@@ -199,7 +207,7 @@ def send_comment_notification():
         recipient_emails = data.get('recipientEmails', {})  # Dict mapping user_id to email
 
         notifications_sent = []
-        emails_sent = []
+        email_jobs = []
 
         # Send notifications to each recipient
         for user_id in recipient_ids:
@@ -221,33 +229,21 @@ def send_comment_notification():
                 if notification_id:
                     notifications_sent.append(user_id)
 
-            # Send email notification if channel includes email
+            # Queue email notification if channel includes email
             if channel in ['email', 'both'] and user_id in recipient_emails:
-                try:
-                    import requests
-                    email_data = {
-                        "toEmail": recipient_emails[user_id],
-                        "taskTitle": task_title,
-                        "commentText": comment_text,
-                        "commenterName": commenter_name,
-                        "isSubtask": is_subtask,
-                        "parentTaskTitle": parent_task_title,
-                        "taskDeadline": task_deadline
-                    }
-
-                    response = requests.post(
-                        f"{email_service_url}/email/send-comment-notification",
-                        json=email_data,
-                        timeout=10
-                    )
-
-                    if response.status_code == 200:
-                        emails_sent.append(user_id)
-                        logger.info(f"Comment notification email sent to {recipient_emails[user_id]}")
-                    else:
-                        logger.error(f"Failed to send email: {response.text}")
-                except Exception as e:
-                    logger.error(f"Error sending email: {str(e)}")
+                email_jobs.append((user_id, {
+                    "type": "comment-notification",
+                    "toEmail": recipient_emails[user_id],
+                    "taskTitle": task_title,
+                    "commentText": comment_text,
+                    "commenterName": commenter_name,
+                    "isSubtask": is_subtask,
+                    "parentTaskTitle": parent_task_title,
+                    "taskDeadline": task_deadline
+                }))
+
+        # One request to the email service for the whole fan-out
+        emails_sent = send_email_batch(email_jobs)
 
         return jsonify(
             message="Comment notifications sent",
@@ -262,7 +258,7 @@ def send_comment_notification():
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(status="healthy", service="notification-service"), 200
+    return jsonify(status="healthy", service="notification-service", cache=cache_stats()), 200
 
 
 @app.route("/notifications/deadline-extension-request", methods=["POST"])
@@ -327,7 +323,7 @@ def send_deadline_extension_request_notification():
                     timeout=10
                 )
 
-                if response.status_code == 200:
+                if response.status_code in (200, 202):
                     email_sent = True
                     logger.info(f"✅ Deadline extension request email sent to {owner_email}")
                 else:
@@ -413,7 +409,7 @@ def send_deadline_extension_response_notification():
                     timeout=10
                 )
 
-                if response.status_code == 200:
+                if response.status_code in (200, 202):
                     email_sent = True
                     logger.info(f"Deadline extension response email sent to {requester_email}")
                 else:
@@ -457,7 +453,7 @@ def send_deadline_changed_notification():
         parent_task_title = data.get('parentTaskTitle')
 
         notifications_sent = []
-        emails_sent = []
+        email_jobs = []
 
         for user_id in collaborator_ids:
             # Send in-app notification if channel includes in-app
@@ -468,32 +464,20 @@ def send_deadline_changed_notification():
                 if notification_id:
                     notifications_sent.append(user_id)
 
-            # Send email notification if channel includes email
+            # Queue email notification if channel includes email
             if channel in ['email', 'both'] and user_id in user_emails:
-                try:
-                    import requests
-                    email_data = {
-                        "toEmail": user_emails[user_id],
-                        "itemTitle": item_title,
-                        "newDeadline": new_deadline,
-                        "requesterName": requester_name,
-                        "itemType": item_type,
-                        "parentTaskTitle": parent_task_title
-                    }
-
-                    response = requests.post(
-                        f"{email_service_url}/email/send-deadline-changed",
-                        json=email_data,
-                        timeout=10
-                    )
-
-                    if response.status_code == 200:
-                        emails_sent.append(user_id)
-                        logger.info(f"Deadline changed email sent to {user_emails[user_id]}")
-                    else:
-                        logger.error(f"Failed to send email: {response.text}")
-                except Exception as e:
-                    logger.error(f"Error sending email: {str(e)}")
+                email_jobs.append((user_id, {
+                    "type": "deadline-changed",
+                    "toEmail": user_emails[user_id],
+                    "itemTitle": item_title,
+                    "newDeadline": new_deadline,
+                    "requesterName": requester_name,
+                    "itemType": item_type,
+                    "parentTaskTitle": parent_task_title
+                }))
+
+        # One request to the email service for the whole fan-out
+        emails_sent = send_email_batch(email_jobs)
 
         return jsonify(
             message="Deadline change notifications sent",
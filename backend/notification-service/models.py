@@ -2,7 +2,14 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+# Keys to_dict only includes when set ("actionable" when not None, the rest when truthy), in its order
+OPTIONAL_KEYS = (
+    "taskId", "subTaskId", "parentTaskTitle", "oldStatus", "newStatus", "commentText", "commenterName",
+    "commenterId", "actionable", "extensionRequestId", "requesterId", "requesterName", "itemId", "itemType",
+    "itemTitle", "status", "rejectionReason", "newDeadline"
+)
+
+@dataclass(slots=True)
 class Notification:
     """Notification data model"""
     notification_id: str
@@ -130,6 +137,28 @@ class Notification:
 
         return result
 
+    @staticmethod
+    def project(data: dict):
+        """Convert a stored notification straight to the dictionary to_dict returns, without building a Notification"""
+        result = {
+            "notificationId": data.get("notificationId", ""),
+            "userId": data.get("userId", ""),
+            "type": data.get("type", ""),
+            "title": data.get("title", ""),
+            "message": data.get("message", ""),
+            "taskTitle": data.get("taskTitle", ""),
+            "taskDeadline": data.get("taskDeadline", 0),
+            "daysUntilDeadline": data.get("daysUntilDeadline", 0),
+            "read": data.get("read", False),
+            "createdAt": data.get("createdAt", 0),
+            "readAt": data.get("readAt")
+        }
+        for key in OPTIONAL_KEYS:
+            value = data.get(key)
+            if value or (key == "actionable" and value is not None):
+                result[key] = value
+        return result
+
 @dataclass
 class NotificationPreferences:
     """User notification preferences"""
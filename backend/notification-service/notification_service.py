@@ -5,11 +5,25 @@ import logging
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import get_db_reference, current_timestamp, days_until_deadline
+from shared import get_db_reference, get_cache, watch_for_changes, current_timestamp, days_until_deadline, fetch_changed, generate_push_id
 from models import Notification
 
 logger = logging.getLogger(__name__)
 
+# A reminder is not sent again for the same (item, user, reminder day) within this window
+LEDGER_WINDOW_SECONDS = 86400
+
+UNREAD_COUNT = "unreadCount"
+
+
+def _adjusted(count, delta):
+    """A counter moved by delta; a missing counter stays missing until get_unread_count builds it"""
+    return None if count is None else max(0, count + delta)
+
+
+class _Unchanged(Exception):
+    """Raised inside a transaction to leave the value untouched"""
+
 class NotificationService:
     """Service for managing notifications"""
     
@@ -17,6 +31,9 @@ class NotificationService:
         self.db = get_db_reference()
         self.notifications_ref = get_db_reference("notifications")
         self.notification_sent_ref = get_db_reference("notificationsSent")
+        self.counters_ref = get_db_reference("notificationCounters")
+        watch_for_changes("users", get_db_reference("users"))
+        watch_for_changes("taskTitles", get_db_reference("tasks"))
     
     def create_notification(self, user_id, item_id, item_data, days_until, is_subtask=False, parent_task_title=None):
         """Create a notification in Firebase"""
@@ -24,61 +41,121 @@ class NotificationService:
             user_notifications_ref = self.notifications_ref.child(user_id)
             new_notification_ref = user_notifications_ref.push()
             notification_id = new_notification_ref.key
-            
-            # Determine message
-            if days_until < 1:
-                if days_until < 0:
-                    time_msg = "overdue"
-                else:
-                    hours_until = int(days_until * 24)
-                    time_msg = f"due in {hours_until} hours"
-            else:
-                time_msg = f"due in {int(days_until)} days"
-            
-            # Create notification
-            if is_subtask:
-                notification_type = "subtask_deadline_reminder"
-                title = "Subtask Deadline Approaching"
-                message = f"'{item_data.get('title', 'Untitled')}' is {time_msg}"
-                item_id_field = "subTaskId"
-            else:
-                notification_type = "task_deadline_reminder"
-                title = "Task Deadline Approaching"
-                message = f"'{item_data.get('title', 'Untitled')}' is {time_msg}"
-                item_id_field = "taskId"
-            
-            notification_data = {
-                "notificationId": notification_id,
-                "userId": user_id,
-                item_id_field: item_id,
-                "type": notification_type,
-                "title": title,
-                "message": message,
-                "taskTitle": item_data.get('title', 'Untitled'),
-                "taskDeadline": item_data.get('deadline'),
-                "daysUntilDeadline": days_until,
-                "read": False,
-                "createdAt": current_timestamp(),
-                "readAt": None
-            }
-            
-            if is_subtask and 'taskId' in item_data:
-                notification_data["taskId"] = item_data["taskId"]
-                if parent_task_title:
-                    notification_data["parentTaskTitle"] = parent_task_title
-            
+            notification_data = self.build_deadline_notification(
+                notification_id, user_id, item_id, item_data, days_until, is_subtask, parent_task_title
+            )
             new_notification_ref.set(notification_data)
+            self.adjust_unread_count(user_id, 1)
             logger.info(f"Created notification for user {user_id}")
             return notification_id
         except Exception as e:
             logger.error(f"Failed to create notification: {str(e)}")
             return None
-    
-    def get_user_notifications(self, user_id):
-        """Get all notifications for a user"""
+
+    @staticmethod
+    def build_deadline_notification(notification_id, user_id, item_id, item_data, days_until,
+                                    is_subtask=False, parent_task_title=None):
+        """Build the record of a deadline reminder notification"""
+        # Determine message
+        if days_until < 1:
+            if days_until < 0:
+                time_msg = "overdue"
+            else:
+                hours_until = int(days_until * 24)
+                time_msg = f"due in {hours_until} hours"
+        else:
+            time_msg = f"due in {int(days_until)} days"
+
+        # Create notification
+        if is_subtask:
+            notification_type = "subtask_deadline_reminder"
+            title = "Subtask Deadline Approaching"
+            message = f"'{item_data.get('title', 'Untitled')}' is {time_msg}"
+            item_id_field = "subTaskId"
+        else:
+            notification_type = "task_deadline_reminder"
+            title = "Task Deadline Approaching"
+            message = f"'{item_data.get('title', 'Untitled')}' is {time_msg}"
+            item_id_field = "taskId"
+
+        notification_data = {
+            "notificationId": notification_id,
+            "userId": user_id,
+            item_id_field: item_id,
+            "type": notification_type,
+            "title": title,
+            "message": message,
+            "taskTitle": item_data.get('title', 'Untitled'),
+            "taskDeadline": item_data.get('deadline'),
+            "daysUntilDeadline": days_until,
+            "read": False,
+            "createdAt": current_timestamp(),
+            "readAt": None
+        }
+
+        if is_subtask and 'taskId' in item_data:
+            notification_data["taskId"] = item_data["taskId"]
+            if parent_task_title:
+                notification_data["parentTaskTitle"] = parent_task_title
+
+        return notification_data
+
+    def create_deadline_notifications(self, reminders, ledger=None, now=None, batch_paths=None):
+        """Record due deadline reminders with batched multi-path writes.
+
+        Args:
+            reminders: dicts with itemId, userId, reminderDay, item, daysUntil, isSubtask,
+                parentTaskTitle and inApp (whether to write an in-app notification)
+            ledger: recent notificationsSent entries from get_recent_ledger (read here if None)
+
+        Returns:
+            (reminders that were not sent in the last day, number of writes: the multi-path
+            updates plus one unreadCount transaction per user given in-app notifications)
+        """
+        now = current_timestamp() if now is None else now
+        if ledger is None:
+            ledger = self.get_recent_ledger(now)
+        batch_paths = batch_paths or int(os.getenv("NOTIFICATION_BATCH_PATHS", "500"))
+
+        due, updates, writes, unread = [], {}, 0, {}
+        for reminder in reminders:
+            key = self.ledger_key(reminder["itemId"], reminder["userId"], reminder["reminderDay"])
+            if key in ledger:
+                continue
+            ledger[key] = entry = self.ledger_entry(reminder["itemId"], reminder["userId"], reminder["reminderDay"], now)
+            updates[f"notificationsSent/{key}"] = entry
+            if reminder["inApp"]:
+                notification_id = generate_push_id()
+                updates[f"notifications/{reminder['userId']}/{notification_id}"] = self.build_deadline_notification(
+                    notification_id, reminder["userId"], reminder["itemId"], reminder["item"],
+                    reminder["daysUntil"], reminder["isSubtask"], reminder["parentTaskTitle"]
+                )
+                reminder["notificationId"] = notification_id
+                unread[reminder["userId"]] = unread.get(reminder["userId"], 0) + 1
+            due.append(reminder)
+
+            if len(updates) >= batch_paths:
+                self.db.update(updates)
+                updates, writes = {}, writes + 1
+
+        if updates:
+            self.db.update(updates)
+            writes += 1
+        if unread:
+            self.adjust_unread_counts(unread)
+            writes += len(unread)
+        return due, writes
+
+    def get_user_notifications(self, user_id, wire=False):
+        """Get all notifications for a user, newest first (as wire dicts when wire is set)"""
         user_notifications_ref = self.notifications_ref.child(user_id)
         all_notifications = user_notifications_ref.get() or {}
         
+        if wire:
+            notifications_list = [Notification.project(n) for n in all_notifications.values()]
+            notifications_list.sort(key=lambda x: x["createdAt"], reverse=True)
+            return notifications_list
+
         notifications_list = [Notification.from_dict(n) for n in all_notifications.values()]
         notifications_list.sort(key=lambda x: x.created_at, reverse=True)
         
@@ -97,66 +174,180 @@ class NotificationService:
         
         return unread
     
+    def get_unread_count(self, user_id):
+        """Get a user's unread notification count from their counter (built on first use)"""
+        count = self.counters_ref.child(user_id).child(UNREAD_COUNT).get()
+        if count is None:
+            count = self.recount_unread(user_id)
+        return count
+
+    def recount_unread(self, user_id):
+        """Build a missing unreadCount from the user's notifications and return the count"""
+        all_notifications = self.notifications_ref.child(user_id).get() or {}
+        count = sum(1 for n in all_notifications.values() if not n.get('read', False))
+        # Another request may have built it meanwhile; reconcile_unread_counts fixes a create missed here
+        self.replace_unread_count(user_id, None, count)
+        return count
+
+    def replace_unread_count(self, user_id, expected, count):
+        """Set a user's unreadCount to count if it still holds expected. Returns True when it was set."""
+        def replace(current):
+            if current != expected:
+                raise _Unchanged()
+            return count
+
+        try:
+            self.counters_ref.child(user_id).child(UNREAD_COUNT).transaction(replace)
+        except _Unchanged:
+            return False
+        return True
+
+    def reconcile_unread_counts(self):
+        """Correct unreadCount counters that drifted from the notifications. Returns the number corrected.
+
+        Counters are read before the notifications and only replaced if they
+        have not moved since, so a create or read racing the scan is not undone.
+        """
+        counters = self.counters_ref.get() or {}
+        all_notifications = self.notifications_ref.get() or {}
+        corrected = 0
+        for user_id, counter in counters.items():
+            expected = (counter or {}).get(UNREAD_COUNT)
+            if expected is None:
+                continue
+            notifications = all_notifications.get(user_id) or {}
+            count = sum(1 for n in notifications.values() if not n.get('read', False))
+            if count != expected and self.replace_unread_count(user_id, expected, count):
+                logger.warning(f"Corrected unread count of user {user_id} from {expected} to {count}")
+                corrected += 1
+        return corrected
+
+    def adjust_unread_count(self, user_id, delta):
+        """Move a user's unreadCount by delta in a transaction (never below zero)"""
+        if not delta:
+            return
+        try:
+            self.counters_ref.child(user_id).child(UNREAD_COUNT).transaction(
+                lambda count: _adjusted(count, delta)
+            )
+        except Exception as e:
+            logger.error(f"Failed to update unread count for user {user_id}: {str(e)}")
+
+    def adjust_unread_counts(self, deltas):
+        """Move several users' unreadCount counters ({user_id: delta}), one transaction per user"""
+        for user_id, delta in deltas.items():
+            self.adjust_unread_count(user_id, delta)
+
+    @staticmethod
+    def _transact(ref, change):
+        """Run change(current) in a transaction on ref, where it may raise _Unchanged to write nothing.
+
+        Returns (value change saw on its last attempt, value written or None when unchanged).
+        """
+        seen = {}
+
+        def attempt(current):
+            seen["value"] = current
+            return change(current)
+
+        try:
+            written = ref.transaction(attempt)
+        except _Unchanged:
+            written = None
+        return seen.get("value"), written
+
     def mark_notification_read(self, user_id, notification_id):
         """Mark a notification as read"""
         notification_ref = self.notifications_ref.child(user_id).child(notification_id)
-        notification = notification_ref.get()
-        
+        now = current_timestamp()
+
+        def mark_read(notification):
+            if not notification or notification.get('read', False):
+                raise _Unchanged()
+            return {**notification, "read": True, "readAt": now}
+
+        # The flip is conditioned on the stored flag, so only the request that changed it decrements
+        notification, updated = self._transact(notification_ref, mark_read)
         if not notification:
             return None, "Notification not found"
+        if updated is not None:
+            self.adjust_unread_count(user_id, -1)
         
-        notification_ref.update({
-            "read": True,
-            "readAt": current_timestamp()
-        })
-        
-        return Notification.from_dict(notification_ref.get()), None
+        return Notification.from_dict(updated or notification), None
     
     def delete_notification(self, user_id, notification_id):
         """Delete a notification"""
         notification_ref = self.notifications_ref.child(user_id).child(notification_id)
-        notification = notification_ref.get()
-        
+
+        def delete(notification):
+            if not notification:
+                raise _Unchanged()
+            return None
+
+        notification, _ = self._transact(notification_ref, delete)
         if not notification:
             return False, "Notification not found"
-        
-        notification_ref.delete()
+        if not notification.get('read', False):
+            self.adjust_unread_count(user_id, -1)
         return True, None
     
     def mark_all_notifications_read(self, user_id):
         """Mark all notifications as read for a user"""
-        user_notifications_ref = self.notifications_ref.child(user_id)
-        all_notifications = user_notifications_ref.get() or {}
-        
+        unread = self.notifications_ref.child(user_id).order_by_child('read').equal_to(False).get() or {}
+        if not unread:
+            return 0
+
         current_time = current_timestamp()
-        update_count = 0
-        
-        for notification_id, notification in all_notifications.items():
-            if not notification.get('read', False):
-                notification_ref = user_notifications_ref.child(notification_id)
-                notification_ref.update({
-                    "read": True,
-                    "readAt": current_time
-                })
-                update_count += 1
-        
-        return update_count
+        updates = {}
+        for notification_id in unread:
+            updates[f"notifications/{user_id}/{notification_id}/read"] = True
+            updates[f"notifications/{user_id}/{notification_id}/readAt"] = current_time
+        # One multi-path write of the unread notifications' flags; reconcile_unread_counts
+        # corrects the counter if a single mark-read of one of them raced this
+        self.db.update(updates)
+        self.adjust_unread_count(user_id, -len(unread))
+
+        return len(unread)
     
+    @staticmethod
+    def match_reminder_day(days_until, reminder_times):
+        """Return the reminder day within half a day of days_until, or None"""
+        for reminder_day in reminder_times:
+            if abs(days_until - reminder_day) < 0.5:
+                return reminder_day
+        return None
+
+    @staticmethod
+    def ledger_key(item_id, user_id, reminder_day):
+        """Key of a reminder in the notificationsSent ledger"""
+        return f"{item_id}_{user_id}_{reminder_day}"
+
+    @staticmethod
+    def ledger_entry(item_id, user_id, reminder_day, sent_at):
+        """notificationsSent record of a reminder"""
+        return {
+            'taskId': item_id,
+            'userId': user_id,
+            'reminderDay': reminder_day,
+            'sentAt': sent_at
+        }
+
+    def get_recent_ledger(self, now=None):
+        """Load every ledger entry sent within the last day with one indexed query"""
+        now = current_timestamp() if now is None else now
+        return fetch_changed(self.notification_sent_ref, "sentAt", now - LEDGER_WINDOW_SECONDS + 1)
+
     def should_send_notification(self, task_id, user_id, days_until, reminder_times):
         """Check if notification should be sent"""
         # Check if days_until matches any reminder time
-        matched_reminder_day = None
-        for reminder_day in reminder_times:
-            if abs(days_until - reminder_day) < 0.5:
-                matched_reminder_day = reminder_day
-                break
-        
+        matched_reminder_day = self.match_reminder_day(days_until, reminder_times)
+
         if not matched_reminder_day:
             return False
         
         # Check if already sent
         try:
-            notification_key = f"{task_id}_{user_id}_{matched_reminder_day}"
+            notification_key = self.ledger_key(task_id, user_id, matched_reminder_day)
             sent_ref = self.notification_sent_ref.child(notification_key)
             sent_record = sent_ref.get()
             
@@ -164,7 +355,7 @@ class NotificationService:
             
             if sent_record:
                 sent_timestamp = sent_record.get('sentAt', 0)
-                if current_time - sent_timestamp < 86400:  # 24 hours
+                if current_time - sent_timestamp < LEDGER_WINDOW_SECONDS:
                     return False
             
             return matched_reminder_day
@@ -175,14 +366,9 @@ class NotificationService:
     def mark_notification_sent(self, task_id, user_id, matched_reminder_day):
         """Mark that a notification has been sent"""
         try:
-            notification_key = f"{task_id}_{user_id}_{matched_reminder_day}"
+            notification_key = self.ledger_key(task_id, user_id, matched_reminder_day)
             sent_ref = self.notification_sent_ref.child(notification_key)
-            sent_ref.set({
-                'taskId': task_id,
-                'userId': user_id,
-                'reminderDay': matched_reminder_day,
-                'sentAt': current_timestamp()
-            })
+            sent_ref.set(self.ledger_entry(task_id, user_id, matched_reminder_day, current_timestamp()))
         except Exception as e:
             logger.error(f"Error marking notification as sent: {str(e)}")
 
@@ -231,6 +417,7 @@ class NotificationService:
                 notification_data["parentTaskTitle"] = parent_task_title
 
             new_notification_ref.set(notification_data)
+            self.adjust_unread_count(user_id, 1)
             logger.info(f"Created task update notification for user {user_id}")
             return notification_id
         except Exception as e:
@@ -320,6 +507,7 @@ class NotificationService:
                 notification_data["parentTaskTitle"] = parent_task_title
 
             new_notification_ref.set(notification_data)
+            self.adjust_unread_count(user_id, 1)
             logger.info(f"Created comment notification for user {user_id}")
             return notification_id
         except Exception as e:
@@ -375,13 +563,7 @@ class NotificationService:
         # Get parent task title if this is a subtask
         parent_task_title = None
         if item_type == "subtask":
-            subtasks_ref = get_db_reference("subtasks")
-            subtask_data = subtasks_ref.child(item_id).get()
-            if subtask_data and subtask_data.get("taskId"):
-                tasks_ref = get_db_reference("tasks")
-                task_data = tasks_ref.child(subtask_data.get("taskId")).get()
-                if task_data:
-                    parent_task_title = task_data.get("title")
+            parent_task_title = self._get_parent_task_title(item_id)
 
         notification_data = {
             "notificationId": notification_id,
@@ -404,6 +586,7 @@ class NotificationService:
             notification_data["parentTaskTitle"] = parent_task_title
         
         self.notifications_ref.child(owner_id).child(notification_id).set(notification_data)
+        self.adjust_unread_count(owner_id, 1)
         return notification_id
     
     def create_deadline_extension_response_notification(self, requester_id: str, item_id: str,
@@ -420,13 +603,7 @@ class NotificationService:
         # Get parent task title if this is a subtask
         parent_task_title = None
         if item_type == "subtask":
-            subtasks_ref = get_db_reference("subtasks")
-            subtask_data = subtasks_ref.child(item_id).get()
-            if subtask_data and subtask_data.get("taskId"):
-                tasks_ref = get_db_reference("tasks")
-                task_data = tasks_ref.child(subtask_data.get("taskId")).get()
-                if task_data:
-                    parent_task_title = task_data.get("title")
+            parent_task_title = self._get_parent_task_title(item_id)
 
         if status == "approved":
             if new_deadline:
@@ -457,6 +634,7 @@ class NotificationService:
             notification_data["parentTaskTitle"] = parent_task_title
         
         self.notifications_ref.child(requester_id).child(notification_id).set(notification_data)
+        self.adjust_unread_count(requester_id, 1)
         return notification_id
 
     def create_deadline_changed_notification(self, user_id: str, item_id: str,
@@ -477,13 +655,7 @@ class NotificationService:
         # Get parent task title if this is a subtask
         parent_task_title = None
         if item_type == "subtask":
-            subtasks_ref = get_db_reference("subtasks")
-            subtask_data = subtasks_ref.child(item_id).get()
-            if subtask_data and subtask_data.get("taskId"):
-                tasks_ref = get_db_reference("tasks")
-                task_data = tasks_ref.child(subtask_data.get("taskId")).get()
-                if task_data:
-                    parent_task_title = task_data.get("title")
+            parent_task_title = self._get_parent_task_title(item_id)
 
         # Build message with requester name if available
         if requester_name:
@@ -511,12 +683,29 @@ class NotificationService:
             notification_data["parentTaskTitle"] = parent_task_title
 
         self.notifications_ref.child(user_id).child(notification_id).set(notification_data)
+        self.adjust_unread_count(user_id, 1)
         return notification_id
 
     def _get_user_name(self, user_id: str):
         """Helper to get user name from user_id"""
-        users_ref = get_db_reference("users") 
-        user_data = users_ref.child(user_id).get()
+        user_data = get_cache("users").get_or_load(
+            user_id, lambda: get_db_reference("users").child(user_id).get()
+        )
         if user_data:
             return user_data.get("name", "Unknown User")
-        return "Unknown User"
\ No newline at end of file
+        return "Unknown User"
+
+    def _get_parent_task_title(self, subtask_id: str):
+        """Helper to get the parent task title of a subtask (None if unknown)"""
+        def load_parent_id():
+            subtask_data = get_db_reference("subtasks").child(subtask_id).get()
+            return subtask_data.get("taskId") if subtask_data else None
+
+        def load_title(task_id):
+            task_data = get_db_reference("tasks").child(task_id).get()
+            return task_data.get("title") if task_data else None
+
+        task_id = get_cache("subtaskParents").get_or_load(subtask_id, load_parent_id)
+        if not task_id:
+            return None
+        return get_cache("taskTitles").get_or_load(task_id, lambda: load_title(task_id))
@@ -0,0 +1,313 @@
+# backend/notification-service/reminder_engine.py
+"""Event-driven deadline reminders.
+
+Instead of rescanning every 15 minutes, the engine mirrors the tasks,
+subtasks, notificationPreferences and users trees through database
+listeners. Whenever an item's deadline, status or members change, or a
+user's reminder preferences change, it recomputes the fire time of every
+(item, user, reminder day) of that item or user: the moment the deadline is
+exactly that many days away. Fire times live in a persistent priority queue
+(a local SQLite table ordered by fire time), and the engine thread sleeps
+until the earliest one, so reminders go out on time and the process is idle
+between them.
+"""
+import sys
+import os
+import logging
+import sqlite3
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared import get_db_reference, ScheduledJob, TreeMirror
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+# A reminder whose fire time passed while nobody was listening still goes out while
+# the deadline is within half a day of the reminder, the scheduler's matching tolerance
+CATCH_UP_WINDOW = 0.5 * DAY_SECONDS
+
+
+class ReminderQueue:
+    """Persistent priority queue of reminder fire times"""
+
+    def __init__(self, path=None):
+        path = path or os.getenv("REMINDER_QUEUE_PATH", "reminders.sqlite3")
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reminders ("
+                " key TEXT PRIMARY KEY, fire_at INTEGER NOT NULL, item_id TEXT NOT NULL,"
+                " is_subtask INTEGER NOT NULL, user_id TEXT NOT NULL, reminder_day REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reminders_fire_at ON reminders (fire_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reminders_item ON reminders (item_id, is_subtask)")
+
+    @staticmethod
+    def _row(entry):
+        return (entry["key"], entry["fireAt"], entry["itemId"], int(entry["isSubtask"]),
+                entry["userId"], entry["reminderDay"])
+
+    def _write(self, delete_sql, delete_args, entries):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(delete_sql, delete_args)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO reminders VALUES (?, ?, ?, ?, ?, ?)", [self._row(e) for e in entries]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def replace_all(self, entries):
+        """Replace the whole queue"""
+        self._write("DELETE FROM reminders", (), entries)
+
+    def replace_item(self, item_id, is_subtask, entries):
+        """Replace the pending reminders of one task or subtask"""
+        self._write("DELETE FROM reminders WHERE item_id = ? AND is_subtask = ?", (item_id, int(is_subtask)), entries)
+
+    def next_fire_at(self):
+        """Earliest pending fire time, or None when the queue is empty"""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(fire_at) FROM reminders").fetchone()[0]
+
+    def due(self, now, limit=1000):
+        """Pending reminders whose fire time is at or before now, earliest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, fire_at, item_id, is_subtask, user_id, reminder_day FROM reminders"
+                " WHERE fire_at <= ? ORDER BY fire_at LIMIT ?", (now, limit)
+            ).fetchall()
+        return [{"key": key, "fireAt": fire_at, "itemId": item_id, "isSubtask": bool(is_subtask),
+                 "userId": user_id, "reminderDay": int(day) if day == int(day) else day}
+                for key, fire_at, item_id, is_subtask, user_id, day in rows]
+
+    def remove(self, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM reminders WHERE key = ?", [(key,) for key in keys])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class ReminderEngine:
+    """Fire deadline reminders at their exact time from a queue kept current by listeners"""
+
+    def __init__(self, scheduler_service, queue=None, clock=time.time):
+        self.scheduler_service = scheduler_service
+        self.notification_service = scheduler_service.notification_service
+        self.queue = queue if queue is not None else ReminderQueue()
+        self.clock = clock
+        self._condition = threading.Condition(threading.RLock())
+        self.tasks = TreeMirror(get_db_reference("tasks"), lambda ids: self._items_changed(ids, False), self._condition)
+        self.subtasks = TreeMirror(get_db_reference("subtasks"), lambda ids: self._items_changed(ids, True), self._condition)
+        self.preferences = TreeMirror(get_db_reference("notificationPreferences"), self._preferences_changed, self._condition)
+        self.users = TreeMirror(get_db_reference("users"), lock=self._condition)
+        # Replicas may run side by side; only the lease holder fires a batch
+        self.fire_job = ScheduledJob(get_db_reference("schedulerJobs/reminder_engine"), interval=0,
+                                     lease_seconds=int(os.getenv("REMINDER_LEASE_SECONDS", "60")))
+        self.settings = {}
+        self.fired = 0
+        self._thread = None
+        self._stopped = False
+        self._planning = False
+
+    # Planning
+
+    def plan_item(self, item_id, item_data, is_subtask, now):
+        """Queue entries for every reminder of one task or subtask"""
+        if not isinstance(item_data, dict) or item_data.get('status', '').lower() == 'completed':
+            return []
+        deadline = item_data.get('deadline')
+        if not deadline:
+            return []
+
+        owner_id = item_data.get('ownerId')
+        users = {owner_id} if owner_id else set()
+        collaborators = item_data.get('collaborators', [])
+        if isinstance(collaborators, list):
+            users.update(collaborators)
+
+        entries = []
+        for user_id in users:
+            if user_id not in self.settings:
+                continue
+            for reminder_day in self.settings[user_id][1]:
+                if not reminder_day:
+                    continue
+                fire_at = deadline - reminder_day * DAY_SECONDS
+                if fire_at < now:
+                    if now >= fire_at + CATCH_UP_WINDOW:
+                        continue
+                    fire_at = now
+                entries.append({
+                    "key": self.notification_service.ledger_key(item_id, user_id, reminder_day),
+                    "fireAt": int(fire_at), "itemId": item_id, "isSubtask": is_subtask,
+                    "userId": user_id, "reminderDay": reminder_day,
+                })
+        return entries
+
+    def rebuild(self):
+        """Recompute the whole queue from the mirrored trees"""
+        now = self.clock()
+        self.settings = self.scheduler_service.reminder_settings(self.preferences.records)
+        entries = []
+        for item_id, item_data in self.tasks.records.items():
+            entries.extend(self.plan_item(item_id, item_data, False, now))
+        for item_id, item_data in self.subtasks.records.items():
+            entries.extend(self.plan_item(item_id, item_data, True, now))
+        self.queue.replace_all(entries)
+        logger.info(f"Reminder queue rebuilt with {len(entries)} pending reminders.")
+
+    def replan(self, item_ids, is_subtask):
+        """Recompute the queue entries of the given tasks or subtasks"""
+        now = self.clock()
+        records = (self.subtasks if is_subtask else self.tasks).records
+        for item_id in item_ids:
+            self.queue.replace_item(item_id, is_subtask, self.plan_item(item_id, records.get(item_id), is_subtask, now))
+
+    def _items_changed(self, item_ids, is_subtask):
+        if not self._ready():
+            return
+        if item_ids is None:
+            self.rebuild()
+        else:
+            self.replan(item_ids, is_subtask)
+        self._condition.notify_all()
+
+    def _preferences_changed(self, user_ids):
+        if not self._ready():
+            return
+        if user_ids is None:
+            self.rebuild()
+        else:
+            self.settings = self.scheduler_service.reminder_settings(self.preferences.records)
+            # Preference changes are rare; find the user's items with a scan of the mirrors
+            for mirror, is_subtask in ((self.tasks, False), (self.subtasks, True)):
+                affected = [item_id for item_id, item in mirror.records.items() if self._involves(item, user_ids)]
+                self.replan(affected, is_subtask)
+        self._condition.notify_all()
+
+    @staticmethod
+    def _involves(item, user_ids):
+        if not isinstance(item, dict):
+            return False
+        collaborators = item.get('collaborators')
+        return item.get('ownerId') in user_ids or (
+            isinstance(collaborators, list) and not user_ids.isdisjoint(collaborators)
+        )
+
+    def _ready(self):
+        """Plan incrementally only after the initial rebuild; earlier events are covered by it"""
+        return self._planning
+
+    # Firing
+
+    def fire_due(self, now=None):
+        """Send every reminder whose time has come. Returns the number of reminders sent."""
+        now = self.clock() if now is None else now
+        with self._condition:
+            entries = self.queue.due(now)
+            if not entries:
+                return 0
+            reminders = [reminder for reminder in map(self._reminder, entries) if reminder]
+            all_users = dict(self.users.records)
+
+        sent = []
+
+        def send():
+            if reminders:
+                due, _ = self.notification_service.create_deadline_notifications(reminders)
+                sent.extend(due)
+
+        if not self.fire_job.run_if_due(send, force=True):
+            # Another replica is firing; its ledger entries will deduplicate ours on the next attempt
+            return 0
+        self.queue.remove([entry["key"] for entry in entries])
+
+        self.scheduler_service.dispatch_emails(sent, all_users)
+        self.fired += len(sent)
+        logger.info(f"Fired {len(sent)} of {len(entries)} due reminders.")
+        return len(sent)
+
+    def _reminder(self, entry):
+        """Reminder for a due queue entry, or None if the item or preferences no longer call for it"""
+        is_subtask = entry["isSubtask"]
+        item_data = (self.subtasks if is_subtask else self.tasks).records.get(entry["itemId"])
+        if not item_data or item_data.get('status', '').lower() == 'completed' or not item_data.get('deadline'):
+            return None
+        settings = self.settings.get(entry["userId"])
+        if not settings or entry["reminderDay"] not in settings[1]:
+            return None
+
+        channel = settings[0]
+        days_until = round((item_data['deadline'] - self.clock()) / DAY_SECONDS, 1)
+        parent_task_title = None
+        if is_subtask:
+            parent_task = self.tasks.records.get(item_data.get('taskId'))
+            if parent_task:
+                parent_task_title = parent_task.get('title', 'Untitled')
+        return {
+            "itemId": entry["itemId"], "userId": entry["userId"], "reminderDay": entry["reminderDay"],
+            "item": item_data, "daysUntil": days_until, "isSubtask": is_subtask,
+            "parentTaskTitle": parent_task_title,
+            "inApp": channel in ['in-app', 'both'], "email": channel in ['email', 'both'],
+        }
+
+    # Lifecycle
+
+    def start(self):
+        """Load the mirrors, rebuild the queue and start the firing thread"""
+        mirrors = (self.users, self.preferences, self.tasks, self.subtasks)
+        for mirror in mirrors:
+            mirror.start()
+        # Listeners deliver the initial snapshot asynchronously on Firebase
+        for mirror in mirrors:
+            mirror.loaded.wait(float(os.getenv("REMINDER_LOAD_TIMEOUT_SECONDS", "300")))
+        with self._condition:
+            self.rebuild()
+            self._planning = True
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="reminder-engine", daemon=True)
+        self._thread.start()
+        logger.info("Reminder engine started.")
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._planning = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for mirror in (self.users, self.preferences, self.tasks, self.subtasks):
+            mirror.stop()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                next_fire_at = self.queue.next_fire_at()
+                delay = None if next_fire_at is None else next_fire_at - self.clock()
+                if delay is None or delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            try:
+                if not self.fire_due():
+                    time.sleep(1)
+            except Exception as e:
+                logger.error(f"Error firing reminders: {str(e)}")
+                time.sleep(5)
@@ -0,0 +1,59 @@
+# backend/notification-service/scheduler.py
+"""Run the deadline scheduler in its own process.
+
+The HTTP workers never send deadline reminders; this process does. With
+SCHEDULER_MODE=events (the default) the reminder engine fires each reminder
+at its exact time from listener-driven state; SCHEDULER_MODE=poll, or a
+database backend without listeners, runs the periodic deadline check. It
+also recounts the users' unreadCount counters every UNREAD_RECOUNT_SECONDS
+to correct drift from failed or interrupted counter updates.
+Run with: python scheduler.py
+"""
+import sys
+import os
+import signal
+import logging
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared import init_firebase, get_db_reference, ScheduledJob
+from scheduler_service import SchedulerService
+from reminder_engine import ReminderEngine
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    init_firebase()
+
+    scheduler_service = SchedulerService(os.getenv("EMAIL_SERVICE_URL", "http://email-service:6005"))
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    mode = os.getenv("SCHEDULER_MODE", "events").lower()
+    if mode == "events" and not hasattr(get_db_reference("tasks"), "listen"):
+        logger.warning("Database backend has no listeners; falling back to periodic deadline checks.")
+        mode = "poll"
+
+    runner = ReminderEngine(scheduler_service) if mode == "events" else scheduler_service
+    runner.start()
+
+    recount_job = ScheduledJob(
+        get_db_reference("schedulerJobs/unread_recount"),
+        interval=int(os.getenv("UNREAD_RECOUNT_SECONDS", "86400")),
+    )
+    poll_seconds = int(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+    while not stopped.is_set():
+        try:
+            recount_job.run_if_due(scheduler_service.notification_service.reconcile_unread_counts)
+        except Exception as e:
+            logger.error(f"Unread count recount failed: {str(e)}")
+        stopped.wait(poll_seconds)
+    runner.stop()
+
+
+if __name__ == '__main__':
+    main()
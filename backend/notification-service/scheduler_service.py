@@ -3,15 +3,28 @@ import sys
 import os
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
 from apscheduler.schedulers.background import BackgroundScheduler
 
+try:
+    import numpy as np
+except ImportError:  # optional speed-up; every item is checked in Python without it
+    np = None
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import get_db_reference, days_until_deadline
+from shared import get_db_reference, current_timestamp, ScheduledJob, fetch_changed, get_many
 from notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
 
+DAY_SECONDS = 24 * 60 * 60
+# Reminders match within half a day of days-until rounded to one decimal; the
+# vectorized pre-filter works on unrounded days, so it keeps a little slack
+PREFILTER_TOLERANCE = 0.6
+
 class SchedulerService:
     """Service for scheduling deadline checks"""
     
@@ -20,33 +33,59 @@ class SchedulerService:
         self.subtasks_ref = get_db_reference("subtasks")
         self.preferences_ref = get_db_reference("notificationPreferences")
         self.users_ref = get_db_reference("users")
+        self.deleted_tasks_ref = get_db_reference("deletedTasks")
+        self.deleted_subtasks_ref = get_db_reference("deletedSubtasks")
         self.notification_service = NotificationService()
         self.email_service_url = email_service_url
         self.scheduler = None
+        # Reminder emails go out on a bounded pool sharing keep-alive connections to email-service
+        self.email_concurrency = max(1, int(os.getenv("EMAIL_DISPATCH_CONCURRENCY", "8")))
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.email_concurrency)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        # Reminder emails are posted to /email/send-batch in chunks of this many jobs
+        self.email_batch_size = max(1, int(os.getenv("EMAIL_BATCH_SIZE", "200")))
+        # Schedule and lease persist in the database so only one process runs each check
+        self.deadline_job = ScheduledJob(
+            get_db_reference("schedulerJobs/task_deadline_checker"),
+            interval=int(os.getenv("DEADLINE_CHECK_INTERVAL_SECONDS", "900")),
+        )
+        # Trees kept between runs; refreshed from changes since the watermark
+        self.state = None
+        self.watermark = None
+        self.last_full_refresh = None
+        self.full_refresh_seconds = int(os.getenv("SCHEDULER_FULL_REFRESH_SECONDS", "21600"))
     
+    @staticmethod
+    def reminder_payload(user_email, task_data, days_until, is_subtask=False, parent_task_title=None):
+        """Body of a task reminder email request"""
+        payload = {
+            "toEmail": user_email,
+            "taskTitle": task_data.get('title', 'Untitled'),
+            "taskDeadline": task_data.get('deadline'),
+            "daysUntilDeadline": days_until,
+            "taskNotes": task_data.get('notes', ''),
+            "isSubtask": is_subtask
+        }
+        if is_subtask and parent_task_title:
+            payload["parentTaskTitle"] = parent_task_title
+        return payload
+
     def send_email_notification(self, user_email, task_data, days_until, is_subtask=False, parent_task_title=None):
         """Send email notification via email service"""
         try:
-            payload = {
-                "toEmail": user_email,
-                "taskTitle": task_data.get('title', 'Untitled'),
-                "taskDeadline": task_data.get('deadline'),
-                "daysUntilDeadline": days_until,
-                "taskNotes": task_data.get('notes', ''),
-                "isSubtask": is_subtask
-            }
-            
-            if is_subtask and parent_task_title:
-                payload["parentTaskTitle"] = parent_task_title
+            payload = self.reminder_payload(user_email, task_data, days_until, is_subtask, parent_task_title)
             
-            response = requests.post(
+            response = self.http.post(
                 f"{self.email_service_url}/email/send-task-reminder",
                 json=payload,
                 timeout=10
             )
             
-            if response.status_code == 200:
-                logger.info(f"Email sent successfully to {user_email}")
+            # The email service queues the message and answers 202
+            if response.status_code in (200, 202):
+                logger.info(f"Email queued for {user_email}")
                 return True
             else:
                 logger.error(f"Failed to send email to {user_email}: {response.text}")
@@ -55,186 +94,272 @@ class SchedulerService:
             logger.error(f"Error sending email to {user_email}: {str(e)}")
             return False
     
-    def check_task_deadlines(self):
-        """Check all tasks and subtasks and create notifications"""
-        logger.info("Starting task and subtask deadline check...")
-        
+    def send_email_batch(self, jobs):
+        """Post typed email jobs to the email service's /email/send-batch in one request.
+
+        Returns the indexes of the jobs it accepted.
+        """
+        if not jobs:
+            return []
         try:
-            all_tasks = self.tasks_ref.get() or {}
-            all_subtasks = self.subtasks_ref.get() or {}
-            all_preferences = self.preferences_ref.get() or {}
-            all_users = self.users_ref.get() or {}
-            
-            notification_count = 0
-            email_count = 0
-            
-            # Check tasks
-            for task_id, task_data in all_tasks.items():
-                if task_data.get('status', '').lower() == 'completed':
-                    continue
-                
-                deadline = task_data.get('deadline')
-                if not deadline:
-                    continue
-                
-                days_until = days_until_deadline(deadline)
-                
-                if days_until < -1:
-                    continue
-                
-                # Get users to notify
-                users_to_notify = []
-                owner_id = task_data.get('ownerId')
-                if owner_id:
-                    users_to_notify.append(owner_id)
-                
-                collaborators = task_data.get('collaborators', [])
-                if isinstance(collaborators, list):
-                    collaborators_without_owner = [c for c in collaborators if c != owner_id]
-                    users_to_notify.extend(collaborators_without_owner)
-                
-                users_to_notify = list(set(users_to_notify))
-                
-                # Send notifications
-                for user_id in users_to_notify:
-                    user_prefs = all_preferences.get(user_id)
-                    if not user_prefs:
-                        continue
-                    
-                    if not user_prefs.get('enabled', False) or not user_prefs.get('taskDeadlineReminders', False):
-                        continue
-                    
-                    channel = user_prefs.get('channel', 'both')
-                    reminder_times = user_prefs.get('reminderTimes', [])
-                    
-                    if not reminder_times:
-                        continue
-                    
-                    matched_reminder_day = self.notification_service.should_send_notification(
-                        task_id, user_id, days_until, reminder_times
-                    )
-                    
-                    if matched_reminder_day:
-                        self.notification_service.mark_notification_sent(task_id, user_id, matched_reminder_day)
-                        
-                        if channel in ['in-app', 'both']:
-                            notification_id = self.notification_service.create_notification(
-                                user_id, task_id, task_data, days_until
-                            )
-                            if notification_id:
-                                notification_count += 1
-                        
-                        if channel in ['email', 'both']:
-                            user_data = all_users.get(user_id)
-                            if user_data and user_data.get('email'):
-                                email_sent = self.send_email_notification(
-                                    user_data['email'],
-                                    task_data,
-                                    days_until
-                                )
-                                if email_sent:
-                                    email_count += 1
-            
-            # Check subtasks
-            for subtask_id, subtask_data in all_subtasks.items():
-                if subtask_data.get('status', '').lower() == 'completed':
-                    continue
-                
-                deadline = subtask_data.get('deadline')
-                if not deadline:
+            response = self.http.post(f"{self.email_service_url}/email/send-batch", json={"jobs": jobs}, timeout=30)
+            if response.status_code not in (200, 202):
+                logger.error(f"Failed to send email batch of {len(jobs)}: {response.text}")
+                return []
+            results = response.json().get("results", [])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Error sending email batch of {len(jobs)}: {str(e)}")
+            return []
+        for result in results:
+            if result.get("status") not in ("queued", "sent"):
+                logger.error(f"Email job {result.get('index')} rejected: {result.get('error')}")
+        return [result["index"] for result in results if result.get("status") in ("queued", "sent")]
+
+    @staticmethod
+    def reminder_settings(all_preferences):
+        """Map each user with deadline reminders enabled to (channel, reminderTimes)"""
+        settings = {}
+        for user_id, user_prefs in all_preferences.items():
+            if not isinstance(user_prefs, dict):
+                continue
+            if not user_prefs.get('enabled', False) or not user_prefs.get('taskDeadlineReminders', False):
+                continue
+            reminder_times = user_prefs.get('reminderTimes', [])
+            if reminder_times:
+                settings[user_id] = (user_prefs.get('channel', 'both'), reminder_times)
+        return settings
+
+    @staticmethod
+    def near_reminder(deadlines, offsets, now):
+        """Boolean mask of deadlines within a reminder window of any offset, in one vectorized pass per offset"""
+        days = (deadlines - now) / DAY_SECONDS
+        near = np.zeros(days.shape, dtype=bool)
+        for offset in offsets:
+            near |= np.abs(days - offset) < PREFILTER_TOLERANCE
+        return near & (deadlines != 0) & (days >= -1 - PREFILTER_TOLERANCE)
+
+    def collect_reminders(self, all_tasks, all_subtasks, all_preferences, now=None):
+        """Decide in memory which (item, user, reminder day) reminders are in range, ignoring the ledger.
+
+        Deadlines are evaluated as one column: with NumPy, only items whose
+        days-until falls near some user's reminder offset are checked per
+        user; without it every item is.
+        """
+        now = current_timestamp() if now is None else now
+        settings = self.reminder_settings(all_preferences)
+        if not settings:
+            return []
+
+        item_ids = [*all_tasks, *all_subtasks]
+        records = [*all_tasks.values(), *all_subtasks.values()]
+        task_count = len(all_tasks)
+
+        if np is not None and records:
+            offsets = sorted({day for _, reminder_times in settings.values() for day in reminder_times if day})
+            deadlines = np.fromiter((record.get('deadline') or 0 for record in records), dtype=np.float64, count=len(records))
+            candidates = np.flatnonzero(self.near_reminder(deadlines, offsets, now)).tolist()
+        else:
+            candidates = range(len(records))
+
+        reminders = []
+        for index in candidates:
+            item_id, item_data, is_subtask = item_ids[index], records[index], index >= task_count
+            if item_data.get('status', '').lower() == 'completed':
+                continue
+
+            deadline = item_data.get('deadline')
+            if not deadline:
+                continue
+
+            days_until = round((deadline - now) / DAY_SECONDS, 1)
+            if days_until < -1:
+                continue
+
+            # Get users to notify
+            owner_id = item_data.get('ownerId')
+            users_to_notify = {owner_id} if owner_id else set()
+            collaborators = item_data.get('collaborators', [])
+            if isinstance(collaborators, list):
+                users_to_notify.update(collaborators)
+
+            parent_task_title = None
+            for user_id in users_to_notify:
+                if user_id not in settings:
                     continue
-                
-                days_until = days_until_deadline(deadline)
-                
-                if days_until < -1:
+                channel, reminder_times = settings[user_id]
+
+                matched_reminder_day = self.notification_service.match_reminder_day(days_until, reminder_times)
+                if not matched_reminder_day:
                     continue
-                
-                parent_task_id = subtask_data.get('taskId')
-                parent_task_title = None
-                if parent_task_id and parent_task_id in all_tasks:
-                    parent_task_title = all_tasks[parent_task_id].get('title', 'Untitled')
-                
-                # Get users to notify
-                users_to_notify = []
-                owner_id = subtask_data.get('ownerId')
-                if owner_id:
-                    users_to_notify.append(owner_id)
-                
-                collaborators = subtask_data.get('collaborators', [])
-                if isinstance(collaborators, list):
-                    collaborators_without_owner = [c for c in collaborators if c != owner_id]
-                    users_to_notify.extend(collaborators_without_owner)
-                
-                users_to_notify = list(set(users_to_notify))
-                
-                # Send notifications
-                for user_id in users_to_notify:
-                    user_prefs = all_preferences.get(user_id)
-                    if not user_prefs:
-                        continue
-                    
-                    if not user_prefs.get('enabled', False) or not user_prefs.get('taskDeadlineReminders', False):
-                        continue
-                    
-                    channel = user_prefs.get('channel', 'both')
-                    reminder_times = user_prefs.get('reminderTimes', [])
-                    
-                    if not reminder_times:
-                        continue
-                    
-                    matched_reminder_day = self.notification_service.should_send_notification(
-                        subtask_id, user_id, days_until, reminder_times
-                    )
-                    
-                    if matched_reminder_day:
-                        self.notification_service.mark_notification_sent(subtask_id, user_id, matched_reminder_day)
-                        
-                        if channel in ['in-app', 'both']:
-                            notification_id = self.notification_service.create_notification(
-                                user_id, subtask_id, subtask_data, days_until,
-                                is_subtask=True, parent_task_title=parent_task_title
-                            )
-                            if notification_id:
-                                notification_count += 1
-                        
-                        if channel in ['email', 'both']:
-                            user_data = all_users.get(user_id)
-                            if user_data and user_data.get('email'):
-                                email_sent = self.send_email_notification(
-                                    user_data['email'],
-                                    subtask_data,
-                                    days_until,
-                                    is_subtask=True,
-                                    parent_task_title=parent_task_title
-                                )
-                                if email_sent:
-                                    email_count += 1
-            
-            logger.info(f"Deadline check completed. Created {notification_count} notifications, sent {email_count} emails.")
-        
+
+                if is_subtask and parent_task_title is None:
+                    parent_task_id = item_data.get('taskId')
+                    if parent_task_id and parent_task_id in all_tasks:
+                        parent_task_title = all_tasks[parent_task_id].get('title', 'Untitled')
+
+                reminders.append({
+                    "itemId": item_id,
+                    "userId": user_id,
+                    "reminderDay": matched_reminder_day,
+                    "item": item_data,
+                    "daysUntil": days_until,
+                    "isSubtask": is_subtask,
+                    "parentTaskTitle": parent_task_title,
+                    "inApp": channel in ['in-app', 'both'],
+                    "email": channel in ['email', 'both'],
+                })
+        return reminders
+
+    def refresh_state(self, round_trips, now=None):
+        """Bring the local copies of tasks, subtasks and preferences up to date.
+
+        The first run, and every SCHEDULER_FULL_REFRESH_SECONDS after it,
+        downloads the trees in full. Other runs read only the records whose
+        updatedAt moved past the watermark and the tombstones written since
+        then. Returns the number of records downloaded.
+        """
+        now = current_timestamp() if now is None else now
+        if self.state is None or now - self.last_full_refresh >= self.full_refresh_seconds:
+            self.state = {
+                "tasks": self.tasks_ref.get() or {},
+                "subtasks": self.subtasks_ref.get() or {},
+                "preferences": self.preferences_ref.get() or {},
+            }
+            round_trips["reads"] += 3
+            self.last_full_refresh = self.watermark = now
+            return sum(len(tree) for tree in self.state.values())
+
+        since = self.watermark
+        downloaded = 0
+        for tree, ref, tombstones_ref in (("tasks", self.tasks_ref, self.deleted_tasks_ref),
+                                          ("subtasks", self.subtasks_ref, self.deleted_subtasks_ref)):
+            changed = fetch_changed(ref, "updatedAt", since)
+            deleted = fetch_changed(tombstones_ref, "deletedAt", since)
+            records = self.state[tree]
+            for record_id in deleted:
+                if record_id not in changed:
+                    records.pop(record_id, None)
+            records.update(changed)
+            downloaded += len(changed) + len(deleted)
+
+        # Preferences are stamped in milliseconds by the frontend; deletes are picked up by the full refresh
+        changed = fetch_changed(self.preferences_ref, "updatedAt", since * 1000)
+        self.state["preferences"].update(changed)
+        round_trips["reads"] += 5
+        self.watermark = now
+        return downloaded + len(changed)
+
+    def get_users(self, user_ids, round_trips):
+        """Fetch the users a run emails, fresh each run so a changed address is used at once"""
+        users = get_many(self.users_ref, user_ids)
+        round_trips["reads"] += len(user_ids)
+        return users
+
+    def dispatch_emails(self, reminders, all_users):
+        """Send the email reminders as /email/send-batch requests of EMAIL_BATCH_SIZE jobs,
+        at most EMAIL_DISPATCH_CONCURRENCY in flight.
+
+        Returns (emails accepted, email requests).
+        """
+        jobs = []
+        for reminder in reminders:
+            user_data = all_users.get(reminder["userId"])
+            if reminder["email"] and user_data and user_data.get('email'):
+                jobs.append({"type": "task-reminder", **self.reminder_payload(
+                    user_data['email'], reminder["item"], reminder["daysUntil"],
+                    is_subtask=reminder["isSubtask"], parent_task_title=reminder["parentTaskTitle"]
+                )})
+        if not jobs:
+            return 0, 0
+
+        batches = [jobs[start:start + self.email_batch_size] for start in range(0, len(jobs), self.email_batch_size)]
+        with ThreadPoolExecutor(max_workers=min(self.email_concurrency, len(batches)),
+                                thread_name_prefix="reminder-email") as executor:
+            sent = sum(len(accepted) for accepted in executor.map(self.send_email_batch, batches))
+        return sent, len(batches)
+
+    def check_task_deadlines(self):
+        """Check all tasks and subtasks and create notifications.
+
+        Refreshes the local copies of the trees from what changed since the
+        last run, decides in memory, reads the last day of the
+        notificationsSent ledger once, and commits ledger entries and
+        notifications in batched multi-path updates before sending emails.
+        Returns a run summary with the round-trip and download counts.
+        """
+        logger.info("Starting task and subtask deadline check...")
+        summary = {"notifications": 0, "emails": 0, "downloaded": 0,
+                   "roundTrips": {"reads": 0, "writes": 0, "emails": 0}}
+        round_trips = summary["roundTrips"]
+
+        try:
+            summary["downloaded"] = self.refresh_state(round_trips)
+            all_tasks = self.state["tasks"]
+            all_subtasks = self.state["subtasks"]
+            all_preferences = self.state["preferences"]
+
+            reminders = self.collect_reminders(all_tasks, all_subtasks, all_preferences)
+
+            if reminders:
+                ledger = self.notification_service.get_recent_ledger()
+                round_trips["reads"] += 1
+                due, writes = self.notification_service.create_deadline_notifications(reminders, ledger)
+                round_trips["writes"] += writes
+            else:
+                due = []
+
+            summary["notifications"] = sum(1 for reminder in due if reminder["inApp"])
+            all_users = self.get_users({reminder["userId"] for reminder in due if reminder["email"]}, round_trips)
+            summary["emails"], round_trips["emails"] = self.dispatch_emails(due, all_users)
+
+            logger.info(
+                f"Deadline check completed. Created {summary['notifications']} notifications, "
+                f"sent {summary['emails']} emails from {summary['downloaded']} downloaded records. "
+                f"Round trips: {round_trips['reads']} reads, "
+                f"{round_trips['writes']} writes, {round_trips['emails']} email requests."
+            )
+
         except Exception as e:
             logger.error(f"Error during deadline check: {str(e)}")
-    
+            summary["error"] = str(e)
+
+        return summary
+
+    def run_if_due(self):
+        """Run the deadline check if its persisted schedule says it is due and no other process holds it"""
+        ran = self.deadline_job.run_if_due(self.check_task_deadlines)
+        if not ran:
+            logger.debug("Deadline check not due or running elsewhere; skipping.")
+        return ran
+
     def start(self):
         """Start the background scheduler"""
         self.scheduler = BackgroundScheduler()
-        
-        # Run every 15 minutes
+        poll_seconds = int(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+
+        # Poll the persisted schedule; the first poll runs immediately and catches up on a missed run
         self.scheduler.add_job(
-            func=self.check_task_deadlines,
+            func=self.run_if_due,
             trigger="interval",
-            seconds=900,
+            seconds=poll_seconds,
+            next_run_time=datetime.now(timezone.utc),
             id="task_deadline_checker",
             name="Check task and subtask deadlines",
+            max_instances=1,
+            coalesce=True,
             replace_existing=True
         )
-        
+
         self.scheduler.start()
-        logger.info("Scheduler started. Running every 15 minutes.")
-        
-        # Run once on startup
-        self.check_task_deadlines()
-    
+        logger.info(f"Scheduler started. Deadline check every {self.deadline_job.interval}s, polling every {poll_seconds}s.")
+
+    def stop(self):
+        """Shut the background scheduler down, waiting for a running check to finish"""
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=True)
+            self.scheduler = None
+            logger.info("Scheduler stopped.")
+
     def trigger_manually(self):
-        """Manually trigger deadline check (for testing)"""
-        self.check_task_deadlines()
\ No newline at end of file
+        """Manually trigger deadline check (for testing). Returns False if another process is running it."""
+        return self.deadline_job.run_if_due(self.check_task_deadlines, force=True)
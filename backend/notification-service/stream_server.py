@@ -0,0 +1,144 @@
+# backend/notification-service/stream_server.py
+"""Serve notification streams from one asyncio process.
+
+An open stream spends nearly all its time idle, so streams are not served by
+the gunicorn workers, where each would hold a worker thread: this process
+keeps every stream as a coroutine on one event loop, fed by one listener
+per connected user (see streams.py). It answers
+GET /notifications/<userId>/stream and GET /health, and is reached through
+Kong at /notification-stream.
+Run with: python stream_server.py
+"""
+import sys
+import os
+import re
+import json
+import signal
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared import init_firebase, get_db_reference
+from streams import NotificationStreams
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = re.compile(r"/notifications/([^/]+)/stream")
+
+# Sent with every response: the browser's EventSource connects across origins
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*", "Access-Control-Allow-Headers": "Last-Event-ID"}
+
+
+def response_head(status, headers):
+    """Status line and headers of an HTTP/1.1 response"""
+    lines = [f"HTTP/1.1 {status}"] + [f"{name}: {value}" for name, value in {**CORS_HEADERS, **headers}.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+def json_response(status, body, headers=None):
+    data = json.dumps(body).encode()
+    return response_head(status, {"Content-Type": "application/json", "Content-Length": len(data),
+                                  "Connection": "close", **(headers or {})}) + data
+
+
+class StreamServer:
+    """Minimal HTTP/1.1 server for the stream endpoint"""
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    async def read_request(self, reader):
+        """Return (method, path, query, headers) of the next request, or None if the client went away"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        return method, url.path, parse_qs(url.query), headers
+
+    async def handle(self, reader, writer):
+        """Serve one connection (one request; streams keep it until either side closes)"""
+        try:
+            request = await self.read_request(reader)
+            if request is not None:
+                await self.respond(writer, *request)
+        except (ConnectionError, ValueError):
+            pass
+        except Exception as e:
+            logger.error(f"Notification stream failed: {str(e)}")
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, path, query, headers):
+        match = STREAM_PATH.fullmatch(path)
+        if method == "OPTIONS":
+            writer.write(response_head("204 No Content", {"Access-Control-Allow-Methods": "GET, OPTIONS",
+                                                          "Content-Length": 0}))
+            return
+        if method != "GET" or (match is None and path != "/health"):
+            writer.write(json_response("404 Not Found", {"error": "Not found"}))
+            return
+        if path == "/health":
+            writer.write(json_response("200 OK", {"status": "healthy", "service": "notification-stream",
+                                                  "streams": self.streams.stats()}))
+            return
+        if not self.streams.available:
+            writer.write(json_response("501 Not Implemented",
+                                       {"error": "Notification streams need a database backend with listeners"}))
+            return
+
+        last_event_id = headers.get("last-event-id") or query.get("lastEventId", [None])[0]
+        stream = await self.streams.open(match.group(1), last_event_id)
+        if stream is None:
+            writer.write(json_response("503 Service Unavailable", {"error": "Too many open notification streams"},
+                                       {"Retry-After": "30"}))
+            return
+
+        try:
+            writer.write(response_head("200 OK", {"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                                  "X-Accel-Buffering": "no", "Connection": "close"}))
+            # Without a length the body runs until the connection closes; a failed write means the client left
+            async for chunk in stream:
+                writer.write(chunk.encode())
+                await writer.drain()
+        finally:
+            await stream.aclose()
+
+
+async def serve(streams, host, port, stopped):
+    server = await asyncio.start_server(StreamServer(streams).handle, host, port)
+    logger.info(f"Notification streams listening on {host}:{port}")
+    async with server:
+        await stopped.wait()
+    streams.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    init_firebase()
+
+    streams = NotificationStreams(get_db_reference("notifications"))
+    if not streams.available:
+        logger.warning("Database backend has no listeners; stream requests will get 501.")
+
+    async def run():
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stopped.set)
+        loop.add_signal_handler(signal.SIGINT, stopped.set)
+        await serve(streams, "0.0.0.0", int(os.getenv("PORT", "6008")), stopped)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+# backend/notification-service/streams.py
+"""Server-sent event streams of users' notifications.
+
+A user's streams in the process share one listener on notifications/<userId>,
+started with the user's first stream and stopped once the last one has been
+closed for STREAM_LINGER_SECONDS, so the process only holds the
+notifications of users that are connected. Listener events are handed to the
+asyncio loop serving the streams and turned into events: a `notification`
+event for every new notification and an `unreadCount` event whenever the
+count moves. Events are numbered, kept in a short per-user history and wake
+the user's streams, which otherwise wait on the loop and send only a comment
+line every STREAM_HEARTBEAT_SECONDS. A client that reconnects with
+Last-Event-ID is replayed what it missed from the history; when the id is
+older than the history or came from another process, it gets the current
+count and a `resync` event telling it to reload its list.
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+
+from shared.db_tree import split_path
+from models import Notification
+
+# How long EventSource waits before reconnecting after the stream drops
+RETRY_MILLISECONDS = 3000
+
+
+def format_event(event_id, name, data):
+    """Encode one event in the text/event-stream format"""
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _is_unread(record):
+    return isinstance(record, dict) and not record.get("read", False)
+
+
+class UserChannel:
+    """Events for one user's open streams; only touched from the event loop"""
+
+    def __init__(self, history_size):
+        # Ids are "<epoch>-<seq>": a Last-Event-ID from an earlier channel or another process never matches
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.history = deque(maxlen=history_size)
+        self.unread = set()
+        self.subscribers = 0
+        self.closed = False
+        self.loaded = False
+        # The user's listener; its first event loads the channel
+        self.registration = None
+        self._changed = asyncio.Event()
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def _publish(self, name, data):
+        self.seq += 1
+        self.history.append((self.seq, format_event(self.event_id(self.seq), name, data)))
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def load(self, records):
+        """Apply the listener's first event, the user's whole notifications node"""
+        self.unread = {key for key, record in (records or {}).items() if _is_unread(record)}
+        self.loaded = True
+        self._publish("unreadCount", {"count": len(self.unread)})
+        self._wake()
+
+    def apply(self, segments, value):
+        """Apply a change at notifications/<userId>/<segments>; new unread notifications are published"""
+        if not segments:
+            records = value if isinstance(value, dict) else {}
+            unread = {key for key, record in records.items() if _is_unread(record)}
+            added = sorted(unread - self.unread, key=lambda key: records[key].get("createdAt", 0))
+            self.unread = unread
+            for key in added:
+                if "createdAt" in records[key]:
+                    self._publish("notification", Notification.project(records[key]))
+        elif len(segments) == 1:
+            key = segments[0]
+            if not _is_unread(value):
+                self.unread.discard(key)
+            elif key not in self.unread:
+                self.unread.add(key)
+                if "createdAt" in value:
+                    self._publish("notification", Notification.project(value))
+        elif segments[1:] == ["read"]:
+            if value:
+                self.unread.discard(segments[0])
+            else:
+                self.unread.add(segments[0])
+
+    def finish(self, count):
+        """Publish the count if a batch of changes moved it from count, and wake the streams"""
+        if self.loaded and len(self.unread) != count:
+            self._publish("unreadCount", {"count": len(self.unread)})
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def resume(self, last_event_id):
+        """Events to send first and the seq to continue after, for a new stream"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        oldest = self.history[0][0] if self.history else self.seq + 1
+        if epoch == self.epoch and seq.isdigit() and oldest - 1 <= int(seq) <= self.seq:
+            return [event for number, event in self.history if number > int(seq)], self.seq
+        snapshot = [format_event(self.event_id(self.seq), "resync", {})] if last_event_id else []
+        if self.loaded:
+            # Otherwise the initial load publishes the count
+            snapshot.append(format_event(self.event_id(self.seq), "unreadCount", {"count": len(self.unread)}))
+        return snapshot, self.seq
+
+    async def wait(self, after, timeout):
+        """Wait until events past `after` are published or timeout passes.
+
+        Returns (events, last seq), or (None, after) once the channel is closed.
+        """
+        if self.seq <= after and not self.closed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self.closed:
+            return None, after
+        events = [event for number, event in self.history if number > after]
+        if self.history and self.history[0][0] > after + 1:
+            # Fell further behind than the history reaches
+            events.append(format_event(self.event_id(self.seq), "resync", {}))
+        return events, self.seq
+
+
+class EventStream:
+    """Body of one stream; the server calls aclose() when the client goes away"""
+
+    def __init__(self, events, release):
+        self._events = events
+        self._release = release
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._events.__anext__()
+
+    async def aclose(self):
+        await self._events.aclose()
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+
+class NotificationStreams:
+    """Per-process hub of users' notification streams, run on one asyncio loop"""
+
+    def __init__(self, notifications_ref, heartbeat_seconds=None, max_clients=None,
+                 history_size=None, linger_seconds=None):
+        """
+        Args:
+            notifications_ref: reference to the notifications tree (must support listen())
+        """
+        self.notifications_ref = notifications_ref
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds is not None else float(
+            os.getenv("STREAM_HEARTBEAT_SECONDS", "20"))
+        self.max_clients = max_clients if max_clients is not None else int(os.getenv("STREAM_MAX_CLIENTS", "10000"))
+        self.history_size = history_size if history_size is not None else int(os.getenv("STREAM_HISTORY_EVENTS", "100"))
+        self.linger_seconds = linger_seconds if linger_seconds is not None else float(
+            os.getenv("STREAM_LINGER_SECONDS", "60"))
+        self._loop = None
+        self._channels = {}
+        self._clients = 0
+
+    @property
+    def available(self):
+        """Whether the database backend delivers change events"""
+        return hasattr(self.notifications_ref, "listen")
+
+    def stats(self):
+        listeners = sum(1 for channel in self._channels.values() if channel.registration is not None)
+        return {"clients": self._clients, "users": len(self._channels), "listeners": listeners,
+                "maxClients": self.max_clients}
+
+    def _on_event(self, channel, event):
+        """Listener callback (runs on the listener's thread): hand the event to the loop"""
+        self._loop.call_soon_threadsafe(self._dispatch, channel, event)
+
+    def _dispatch(self, channel, event):
+        """Apply a listener event to the user's channel"""
+        if channel.closed:
+            return
+        segments = split_path(event.path or "/")
+        if event.event_type == "patch":
+            changes = [(segments + split_path(path), value) for path, value in (event.data or {}).items()]
+        else:
+            changes = [(segments, event.data)]
+
+        loaded, count = channel.loaded, len(channel.unread)
+        for path, value in changes:
+            if not path and not channel.loaded:
+                channel.load(value)
+            elif channel.loaded:
+                channel.apply(path, value)
+        if loaded:
+            channel.finish(count)
+
+    async def _acquire(self, user_id):
+        """Register a stream for user_id; returns its channel, or None when the process is full"""
+        if self._clients >= self.max_clients:
+            return None
+        self._loop = asyncio.get_running_loop()
+        channel = self._channels.get(user_id)
+        self._clients += 1
+        if channel is not None:
+            channel.subscribers += 1
+            return channel
+
+        channel = self._channels[user_id] = UserChannel(self.history_size)
+        channel.subscribers += 1
+        try:
+            # The first event, the user's current notifications, loads the channel
+            channel.registration = await self._loop.run_in_executor(
+                None, self.notifications_ref.child(user_id).listen, lambda event: self._on_event(channel, event))
+        except Exception:
+            self._release(user_id, channel, linger=False)
+            raise
+        if channel.closed:
+            # The hub was closed while the listener started
+            self._stop_listener(channel)
+        return channel
+
+    def _release(self, user_id, channel, linger=True):
+        channel.subscribers -= 1
+        self._clients -= 1
+        if channel.subscribers > 0:
+            return
+        if linger and self.linger_seconds > 0:
+            # Keep the history a while so a quick reconnect resumes instead of resyncing
+            self._loop.call_later(self.linger_seconds, self._expire, user_id, channel)
+        else:
+            self._expire(user_id, channel)
+
+    def _expire(self, user_id, channel):
+        if channel.subscribers > 0 or self._channels.get(user_id) is not channel:
+            return
+        del self._channels[user_id]
+        channel.close()
+        self._stop_listener(channel)
+
+    def _stop_listener(self, channel):
+        registration, channel.registration = channel.registration, None
+        if registration is not None:
+            # Closing a Firebase listener joins its thread, so keep it off the loop
+            self._loop.run_in_executor(None, registration.close)
+
+    async def open(self, user_id, last_event_id=None):
+        """Open a stream for user_id.
+
+        Returns an async iterator of text/event-stream chunks whose aclose()
+        ends the stream, or None when the process already serves
+        STREAM_MAX_CLIENTS streams.
+        """
+        channel = await self._acquire(user_id)
+        if channel is None:
+            return None
+        return EventStream(self._events(channel, last_event_id), lambda: self._release(user_id, channel))
+
+    async def _events(self, channel, last_event_id):
+        pending, after = channel.resume(last_event_id)
+        # The reconnect delay, then the missed events (or the current count)
+        yield f"retry: {RETRY_MILLISECONDS}\n\n" + "".join(pending)
+        while True:
+            events, after = await channel.wait(after, self.heartbeat_seconds)
+            if events is None:
+                return
+            yield "".join(events) if events else ": heartbeat\n\n"
+
+    def close(self):
+        """End every stream in this process and stop the listeners"""
+        channels, self._channels = list(self._channels.values()), {}
+        for channel in channels:
+            channel.close()
+            registration, channel.registration = channel.registration, None
+            if registration is not None:
+                registration.close()
@@ -4,6 +4,7 @@ from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
 import time
+import asyncio
 
 # Set environment variables before imports
 os.environ['JSON_PATH'] = '/tmp/dummy.json'
@@ -20,9 +21,18 @@ with patch('firebase_admin.initialize_app'):
 
             from notification_service import NotificationService
             from scheduler_service import SchedulerService
+            from reminder_engine import ReminderEngine, ReminderQueue
+            from streams import NotificationStreams
             from models import Notification
             from app import app
-            from shared import current_timestamp
+            from shared import current_timestamp, clear_caches
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty read-through caches."""
+    clear_caches()
+    yield
+
 
 @pytest.fixture
 def client():
@@ -180,6 +190,18 @@ class TestNotificationService:
         
         assert notification_id == "test-subtask-notif"
     
+    def test_notification_projection_matches_model(self):
+        """Test Notification.project drops the same empty optional fields as to_dict"""
+        record = {"notificationId": "n1", "userId": "u1", "type": "extension_request", "title": "T",
+                  "createdAt": 5, "actionable": False, "taskId": "", "itemId": "t1", "newDeadline": 0}
+
+        projected = Notification.project(record)
+        assert projected == Notification.from_dict(record).to_dict()
+        assert projected["actionable"] is False
+        assert "taskId" not in projected and "newDeadline" not in projected
+        assert projected["itemId"] == "t1"
+        assert not hasattr(Notification.from_dict(record), "__dict__")
+
     def test_get_user_notifications(self, mock_db_refs):
         """Test getting user notifications"""
         mock_notifications = Mock()
@@ -268,7 +290,7 @@ class TestNotificationService:
         mock_db_refs['notification'].return_value = mock_notifications
         
         mock_notification_ref = Mock()
-        mock_notification_ref.get.return_value = {
+        stored = {
             "notificationId": "n1",
             "userId": "u1",
             "type": "task_deadline_reminder",
@@ -281,15 +303,18 @@ class TestNotificationService:
             "createdAt": 1600000000,
             "readAt": None
         }
+        mock_notification_ref.transaction.side_effect = lambda update: update(stored)
         
         mock_notifications.child.return_value.child.return_value = mock_notification_ref
         
         service = NotificationService()
-        notification, error = service.mark_notification_read("u1", "n1")
+        with patch.object(service, 'adjust_unread_count') as adjust:
+            notification, error = service.mark_notification_read("u1", "n1")
         
         assert error is None
-        assert notification is not None
-        mock_notification_ref.update.assert_called_once()
+        assert notification.read is True
+        mock_notification_ref.transaction.assert_called_once()
+        adjust.assert_called_once_with("u1", -1)
     
     def test_mark_notification_read_not_found(self, mock_db_refs):
         """Test marking non-existent notification as read"""
@@ -297,7 +322,7 @@ class TestNotificationService:
         mock_db_refs['notification'].return_value = mock_notifications
         
         mock_notification_ref = Mock()
-        mock_notification_ref.get.return_value = None
+        mock_notification_ref.transaction.side_effect = lambda update: update(None)
         
         mock_notifications.child.return_value.child.return_value = mock_notification_ref
         
@@ -313,16 +338,18 @@ class TestNotificationService:
         mock_db_refs['notification'].return_value = mock_notifications
         
         mock_notification_ref = Mock()
-        mock_notification_ref.get.return_value = {"notificationId": "n1"}
+        mock_notification_ref.transaction.side_effect = lambda update: update({"notificationId": "n1"})
         
         mock_notifications.child.return_value.child.return_value = mock_notification_ref
         
         service = NotificationService()
-        success, error = service.delete_notification("u1", "n1")
+        with patch.object(service, 'adjust_unread_count') as adjust:
+            success, error = service.delete_notification("u1", "n1")
         
         assert success == True
         assert error is None
-        mock_notification_ref.delete.assert_called_once()
+        mock_notification_ref.transaction.assert_called_once()
+        adjust.assert_called_once_with("u1", -1)
     
     def test_mark_all_notifications_read(self, mock_db_refs):
         """Test marking all notifications as read"""
@@ -330,18 +357,23 @@ class TestNotificationService:
         mock_db_refs['notification'].return_value = mock_notifications
         
         mock_user_ref = Mock()
-        mock_user_ref.get.return_value = {
+        mock_user_ref.order_by_child.return_value.equal_to.return_value.get.return_value = {
             "n1": {"read": False},
-            "n2": {"read": False},
-            "n3": {"read": True}
+            "n2": {"read": False}
         }
-        mock_user_ref.child.return_value = Mock()
         mock_notifications.child.return_value = mock_user_ref
         
         service = NotificationService()
-        count = service.mark_all_notifications_read("u1")
+        with patch.object(service, 'adjust_unread_count') as adjust, \
+             patch.object(service, 'db') as mock_root:
+            count = service.mark_all_notifications_read("u1")
         
         assert count == 2
+        mock_user_ref.order_by_child.assert_called_once_with('read')
+        updates = mock_root.update.call_args[0][0]
+        assert sorted(updates) == ["notifications/u1/n1/read", "notifications/u1/n1/readAt",
+                                   "notifications/u1/n2/read", "notifications/u1/n2/readAt"]
+        adjust.assert_called_once_with("u1", -2)
     
     def test_should_send_notification_no_match(self, mock_db_refs):
         """Test should_send_notification with no matching reminder time"""
@@ -401,7 +433,7 @@ class TestNotificationService:
 class TestSchedulerService:
     """Test scheduler service class"""
     
-    @patch('scheduler_service.requests.post')
+    @patch('scheduler_service.requests.Session.post')
     def test_send_email_notification_success(self, mock_post, mock_db_refs):
         """Test successful email notification sending"""
         mock_post.return_value.status_code = 200
@@ -432,7 +464,7 @@ class TestSchedulerService:
         assert call_args[1]['json']['toEmail'] == "test@example.com"
         assert call_args[1]['json']['taskTitle'] == "Test Task"
     
-    @patch('scheduler_service.requests.post')
+    @patch('scheduler_service.requests.Session.post')
     def test_send_email_notification_failure(self, mock_post, mock_db_refs):
         """Test failed email notification sending"""
         mock_post.return_value.status_code = 500
@@ -456,7 +488,7 @@ class TestSchedulerService:
         
         assert result == False
     
-    @patch('scheduler_service.requests.post')
+    @patch('scheduler_service.requests.Session.post')
     def test_send_email_notification_with_subtask(self, mock_post, mock_db_refs):
         """Test email notification for subtask"""
         mock_post.return_value.status_code = 200
@@ -485,6 +517,51 @@ class TestSchedulerService:
         assert call_args[1]['json']['isSubtask'] == True
         assert call_args[1]['json']['parentTaskTitle'] == "Parent Task"
 
+    def test_dispatch_emails_bounded_pool(self, mock_db_refs):
+        """Test reminder emails go out as batch requests with at most EMAIL_DISPATCH_CONCURRENCY in flight"""
+        import threading
+        mock_db_refs['scheduler'].side_effect = lambda x: Mock()
+        with patch.dict(os.environ, {"EMAIL_DISPATCH_CONCURRENCY": "3", "EMAIL_BATCH_SIZE": "2"}):
+            service = SchedulerService("http://email-service:6005")
+
+        in_flight, peak, lock = [0], [0], threading.Lock()
+
+        def slow_batch(jobs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return [index for index, job in enumerate(jobs) if job["toEmail"] != "u3@test.com"]
+
+        reminders = [{"userId": f"u{i}", "email": i != 9, "item": {"title": "T"}, "daysUntil": 1.0,
+                      "isSubtask": False, "parentTaskTitle": None} for i in range(10)]
+        users = {f"u{i}": {"email": f"u{i}@test.com"} for i in range(10)}
+
+        with patch.object(service, 'send_email_batch', side_effect=slow_batch) as mock_batch:
+            assert service.dispatch_emails(reminders, users) == (8, 5)
+
+        assert mock_batch.call_count == 5
+        assert all(job["type"] == "task-reminder" for call in mock_batch.call_args_list for job in call[0][0])
+        assert 1 < peak[0] <= 3
+
+    @patch('scheduler_service.requests.Session.post')
+    def test_send_email_batch_returns_accepted_indexes(self, mock_post, mock_db_refs):
+        """Test a batch request reports which jobs the email service accepted"""
+        mock_db_refs['scheduler'].side_effect = lambda x: Mock()
+        service = SchedulerService("http://email-service:6005")
+        mock_post.return_value.status_code = 202
+        mock_post.return_value.json.return_value = {"results": [
+            {"index": 0, "status": "queued"}, {"index": 1, "status": "invalid", "error": "Missing required field: taskTitle"}
+        ]}
+
+        assert service.send_email_batch([{"type": "task-reminder"}, {"type": "task-reminder"}]) == [0]
+        assert mock_post.call_args[1]['json'] == {"jobs": [{"type": "task-reminder"}, {"type": "task-reminder"}]}
+
+        mock_post.return_value.status_code = 500
+        assert service.send_email_batch([{"type": "task-reminder"}]) == []
+
 class TestNotificationEndpoints:
     """Test Flask endpoints"""
     
@@ -499,7 +576,7 @@ class TestNotificationEndpoints:
     @patch('app.notification_service.get_user_notifications')
     def test_get_user_notifications(self, mock_get, client, sample_notification):
         """Test getting user notifications endpoint"""
-        mock_get.return_value = [sample_notification]
+        mock_get.return_value = [sample_notification.to_dict()]
         
         response = client.get('/notifications/u1')
         assert response.status_code == 200
@@ -507,6 +584,19 @@ class TestNotificationEndpoints:
         assert 'notifications' in data
         assert len(data['notifications']) == 1
     
+    @patch('app.notification_service.get_user_notifications')
+    def test_get_user_notifications_etag(self, mock_get, client, sample_notification):
+        """Test GET /notifications/<uid> answers 304 while the notifications are unchanged"""
+        mock_get.return_value = [sample_notification.to_dict()]
+
+        response = client.get('/notifications/u1')
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+        response = client.get('/notifications/u1', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+    
     @patch('app.notification_service.get_unread_notifications')
     def test_get_unread_notifications(self, mock_get, client):
         """Test getting unread notifications endpoint"""
@@ -585,14 +675,15 @@ class TestNotificationEndpoints:
         data = response.get_json()
         assert len(data['notificationsSent']) == 2
 
-    @patch('requests.post')
+    @patch('scheduler_service.requests.Session.post')
     @patch('app.notification_service.create_task_update_notification')
     @patch('app.notification_service.check_duplicate_update_notification')
     def test_send_task_update_notification_both_channels(self, mock_check_dup, mock_create, mock_post, client):
         """Test sending task update notification (both channels)"""
         mock_check_dup.return_value = False
         mock_create.return_value = "notif123"
-        mock_post.return_value.status_code = 200
+        mock_post.return_value.status_code = 202
+        mock_post.return_value.json.return_value = {"results": [{"index": 0, "status": "queued"}]}
 
         data = {
             "itemId": "st1",
@@ -611,6 +702,7 @@ class TestNotificationEndpoints:
         data = response.get_json()
         assert len(data['notificationsSent']) == 1
         assert len(data['emailsSent']) == 1
+        assert mock_post.call_args[0][0].endswith('/email/send-batch')
 
     @patch('app.notification_service.check_duplicate_update_notification')
     def test_send_task_update_notification_duplicate(self, mock_check_dup, client):
@@ -685,14 +777,15 @@ class TestNotificationEndpoints:
         data = response.get_json()
         assert len(data['notificationsSent']) == 1
 
-    @patch('requests.post')
+    @patch('scheduler_service.requests.Session.post')
     @patch('app.notification_service.create_comment_notification')
     @patch('app.notification_service.check_duplicate_comment_notification')
     def test_send_comment_notification_with_email(self, mock_check_dup, mock_create, mock_post, client):
         """Test sending comment notification with email"""
         mock_check_dup.return_value = False
         mock_create.return_value = "notif456"
-        mock_post.return_value.status_code = 200
+        mock_post.return_value.status_code = 202
+        mock_post.return_value.json.return_value = {"results": [{"index": 0, "status": "queued"}]}
 
         data = {
             "itemId": "st1",
@@ -712,6 +805,7 @@ class TestNotificationEndpoints:
         assert response.status_code == 200
         data = response.get_json()
         assert len(data['emailsSent']) == 1
+        assert mock_post.call_args[0][0].endswith('/email/send-batch')
 
     @patch('app.notification_service.create_deadline_extension_request_notification')
     def test_send_deadline_extension_request_in_app(self, mock_create, client):
@@ -841,12 +935,13 @@ class TestNotificationEndpoints:
         data = response.get_json()
         assert len(data['notificationsSent']) == 2
 
-    @patch('requests.post')
+    @patch('scheduler_service.requests.Session.post')
     @patch('app.notification_service.create_deadline_changed_notification')
     def test_send_deadline_changed_notification_with_email(self, mock_create, mock_post, client):
         """Test deadline changed notification with email"""
         mock_create.return_value = "notif901"
-        mock_post.return_value.status_code = 200
+        mock_post.return_value.status_code = 202
+        mock_post.return_value.json.return_value = {"results": [{"index": 0, "status": "queued"}]}
 
         data = {
             "itemId": "st1",
@@ -865,6 +960,7 @@ class TestNotificationEndpoints:
         assert response.status_code == 200
         data = response.get_json()
         assert len(data['emailsSent']) == 1
+        assert mock_post.call_args[0][0].endswith('/email/send-batch')
 
     # Error handling tests
     @patch('app.notification_service.get_user_notifications')
@@ -1196,6 +1292,32 @@ class TestNotificationServiceMethods:
 
         assert notif_id is not None
 
+    @patch('notification_service.get_db_reference')
+    def test_deadline_notifications_reuse_cached_lookups(self, mock_ref):
+        """Test requester names and parent task titles are fetched once across notifications"""
+        mock_notif_ref = Mock()
+        mock_users_ref = Mock()
+        mock_subtasks_ref = Mock()
+        mock_tasks_ref = Mock()
+
+        mock_users_ref.child.return_value.get.return_value = {"name": "Jane Doe"}
+        mock_subtasks_ref.child.return_value.get.return_value = {"taskId": "t1"}
+        mock_tasks_ref.child.return_value.get.return_value = {"title": "Parent Task"}
+
+        refs = {"users": mock_users_ref, "subtasks": mock_subtasks_ref, "tasks": mock_tasks_ref}
+        mock_ref.side_effect = lambda arg=None: refs.get(arg, mock_notif_ref)
+
+        service = NotificationService()
+        service.create_deadline_extension_request_notification("u1", "st1", "Test Subtask", "u2", "subtask", "er1")
+        service.create_deadline_changed_notification("u3", "st1", "subtask", "Test Subtask", 1710000000, "u2")
+
+        written = mock_notif_ref.child.return_value.child.return_value.set.call_args[0][0]
+        assert written["parentTaskTitle"] == "Parent Task"
+        assert written["requesterName"] == "Jane Doe"
+        assert mock_users_ref.child.return_value.get.call_count == 1
+        assert mock_subtasks_ref.child.return_value.get.call_count == 1
+        assert mock_tasks_ref.child.return_value.get.call_count == 1
+
     @patch('notification_service.get_db_reference')
     def test_create_deadline_extension_response_notification_approved(self, mock_ref):
         """Test creating extension response notification (approved)"""
@@ -1307,5 +1429,547 @@ class TestNotificationServiceMethods:
 
         assert name == "Unknown User"
 
+class TestSchedulerWithMemoryDatabase:
+    """Round-trip accounting with the in-memory database stand-in"""
+
+    @pytest.fixture
+    def memory_db(self, mock_db_refs):
+        from shared.memory_db import MemoryDatabase
+        database = MemoryDatabase()
+        mock_db_refs['notification'].side_effect = database.reference
+        mock_db_refs['scheduler'].side_effect = database.reference
+        now = current_timestamp()
+        database.load({
+            "tasks": {
+                "t1": {"taskId": "t1", "title": "Due soon", "ownerId": "u1", "collaborators": ["u1", "u2"],
+                       "deadline": now + 3 * 86400 + 600, "status": "ongoing"},
+                "t2": {"taskId": "t2", "title": "Done", "ownerId": "u1", "deadline": now + 3 * 86400,
+                       "status": "completed"},
+            },
+            "notificationPreferences": {
+                "u1": {"enabled": True, "taskDeadlineReminders": True, "channel": "in-app", "reminderTimes": [3]},
+                "u2": {"enabled": False},
+            },
+            "users": {"u1": {"email": "u1@test.com"}, "u2": {"email": "u2@test.com"}},
+        })
+        return database
+
+    def test_check_task_deadlines_round_trips(self, memory_db):
+        """Test the scheduler's notifications and round trips are observable"""
+        service = SchedulerService("http://email-service:6005")
+        memory_db.stats.reset()
+
+        summary = service.check_task_deadlines()
+        stats = memory_db.stats.snapshot()
+
+        # 3 tree reads, 1 indexed ledger query, 1 multi-path update for the ledger entry and notification,
+        # and 1 unreadCount transaction (a read and a conditional write)
+        assert stats["roundTrips"] == 7
+        assert stats["calls"]["get"] == 3
+        assert stats["calls"]["query"] == 1
+        assert stats["calls"]["update"] == 1
+        assert stats["calls"]["transaction"] == 2
+        assert summary["notifications"] == 1
+        assert summary["roundTrips"] == {"reads": 4, "writes": 2, "emails": 0}
+        assert stats["bytesReceived"] > 0
+        assert len(memory_db.reference("notifications/u1").get()) == 1
+        assert memory_db.reference("notifications/u2").get() is None
+
+        # A second run is deduplicated by the ledger
+        service.check_task_deadlines()
+        assert len(memory_db.reference("notifications/u1").get()) == 1
+
+    def test_incremental_runs_download_only_changes(self, memory_db):
+        """Test runs after the first read only records stamped past the watermark plus tombstones"""
+        service = SchedulerService("http://email-service:6005")
+        first = service.check_task_deadlines()
+        assert first["downloaded"] == 4
+
+        now = current_timestamp()
+        memory_db.reference("tasks/t3").set({"taskId": "t3", "title": "New", "ownerId": "u1", "status": "ongoing",
+                                             "deadline": now + 86400 + 600, "updatedAt": now + 1})
+        memory_db.reference("tasks/t2").delete()
+        memory_db.reference("deletedTasks/t2").set({"deletedAt": now + 1})
+        memory_db.reference("notificationPreferences/u1/reminderTimes").set([1, 3])
+        memory_db.reference("notificationPreferences/u1/updatedAt").set((now + 1) * 1000)
+        memory_db.stats.reset()
+
+        with patch('scheduler_service.current_timestamp', return_value=now + 2):
+            second = service.check_task_deadlines()
+
+        assert second["downloaded"] == 3
+        assert second["notifications"] == 1
+        assert memory_db.stats.snapshot()["calls"].get("get", 0) == 0
+        assert set(service.state["tasks"]) == {"t1", "t3"}
+        notifications = memory_db.reference("notifications/u1").get().values()
+        assert sorted(n["taskId"] for n in notifications) == ["t1", "t3"]
+
+        # The periodic full refresh reloads everything
+        service.full_refresh_seconds = 0
+        assert service.check_task_deadlines()["downloaded"] == 4
+
+    def test_reminder_emails_use_current_addresses(self, memory_db):
+        """Test each run fetches the users it emails, so a changed address is used on the next run"""
+        memory_db.reference("notificationPreferences/u1/channel").set("both")
+        service = SchedulerService("http://email-service:6005")
+        with patch.object(service, 'send_email_batch', side_effect=lambda jobs: jobs) as send:
+            assert service.check_task_deadlines()["emails"] == 1
+            assert send.call_args[0][0][0]["toEmail"] == "u1@test.com"
+
+            now = current_timestamp()
+            memory_db.reference("users/u1/email").set("new@test.com")
+            memory_db.reference("tasks/t3").set({"taskId": "t3", "title": "Next", "ownerId": "u1", "status": "ongoing",
+                                                 "deadline": now + 3 * 86400 + 600, "updatedAt": now + 1})
+            with patch('scheduler_service.current_timestamp', return_value=now + 2):
+                assert service.check_task_deadlines()["emails"] == 1
+            assert send.call_args[0][0][0]["toEmail"] == "new@test.com"
+
+    def test_vectorized_reminders_match_python_loop(self, mock_db_refs):
+        """Test the NumPy pre-filter selects exactly the reminders the per-item loop finds"""
+        import random
+        import scheduler_service
+        if scheduler_service.np is None:
+            pytest.skip("numpy not installed")
+
+        rng = random.Random(7)
+        now = current_timestamp()
+        users = [f"u{i}" for i in range(20)]
+        tasks = {
+            f"t{i}": {"title": f"Task {i}", "ownerId": rng.choice(users), "collaborators": rng.sample(users, 3),
+                      "deadline": now + rng.randint(-3 * 86400, 10 * 86400),
+                      "status": rng.choice(["ongoing", "completed", "unassigned"])}
+            for i in range(2000)
+        }
+        # Deadlines exactly on rounding ties around the reminder window edges
+        tasks.update({f"edge{i}": {"title": "Edge", "ownerId": "u0", "deadline": now + 4320 * i, "status": "ongoing"}
+                      for i in range(-25, 160, 2)})
+        subtasks = {
+            f"s{i}": {"title": f"Subtask {i}", "taskId": f"t{i}", "ownerId": rng.choice(users),
+                      "deadline": now + rng.randint(0, 8 * 86400), "status": "ongoing"}
+            for i in range(500)
+        }
+        preferences = {
+            user_id: {"enabled": True, "taskDeadlineReminders": True, "channel": rng.choice(["in-app", "email", "both"]),
+                      "reminderTimes": rng.sample([1, 2, 3, 7], 2)}
+            for user_id in users
+        }
+        preferences["u19"] = {"enabled": False}
+
+        mock_db_refs['scheduler'].side_effect = lambda x: Mock()
+        service = SchedulerService("http://email-service:6005")
+        key = lambda r: (r["itemId"], r["userId"], r["reminderDay"], r["daysUntil"], r["parentTaskTitle"])
+
+        vectorized = service.collect_reminders(tasks, subtasks, preferences, now=now)
+        with patch('scheduler_service.np', None):
+            looped = service.collect_reminders(tasks, subtasks, preferences, now=now)
+
+        assert vectorized
+        assert sorted(map(key, vectorized)) == sorted(map(key, looped))
+        assert all(r["userId"] != "u19" for r in vectorized)
+
+    def test_deadline_notifications_are_written_in_batches(self, memory_db):
+        """Test ledger entries and notifications share multi-path updates capped at the batch size"""
+        now = current_timestamp()
+        memory_db.reference("notificationsSent/t0_u1_3").set({"taskId": "t0", "userId": "u1", "sentAt": now - 600})
+        memory_db.reference("notificationsSent/t1_u1_3").set({"taskId": "t1", "userId": "u1", "sentAt": now - 86400})
+        service = NotificationService()
+        reminders = [
+            {"itemId": f"t{i}", "userId": "u1", "reminderDay": 3, "item": {"title": f"Task {i}", "deadline": now},
+             "daysUntil": 3.0, "isSubtask": False, "parentTaskTitle": None, "inApp": i % 2 == 0}
+            for i in range(5)
+        ]
+
+        ledger = service.get_recent_ledger(now)
+        assert list(ledger) == ["t0_u1_3"]
+
+        memory_db.stats.reset()
+        due, writes = service.create_deadline_notifications(reminders, ledger, now=now, batch_paths=3)
+
+        assert [reminder["itemId"] for reminder in due] == ["t1", "t2", "t3", "t4"]
+        calls = memory_db.stats.snapshot()["calls"]
+        assert calls["update"] == 2
+        assert writes == 3  # and one unreadCount transaction for u1's two notifications
+        notifications = memory_db.reference("notifications/u1").get()
+        assert sorted(n["taskId"] for n in notifications.values()) == ["t2", "t4"]
+        assert memory_db.reference("notificationsSent/t1_u1_3").get()["sentAt"] == now
+
+    def test_unread_count_follows_every_write(self, memory_db, client):
+        """Test unreadCount is built once from the notifications and then moved by each write"""
+        memory_db.reference("notifications/u1").set({"n1": {"read": False, "createdAt": 1},
+                                                      "n2": {"read": False, "createdAt": 2},
+                                                      "n3": {"read": True, "createdAt": 3}})
+        service = NotificationService()
+        assert service.get_unread_count("u1") == 2
+        assert memory_db.reference("notificationCounters/u1/unreadCount").get() == 2
+
+        new_id = service.create_deadline_changed_notification("u1", "t1", "task", "Report", 1700000000)
+        assert service.get_unread_count("u1") == 3
+        service.mark_notification_read("u1", "n1")
+        service.mark_notification_read("u1", "n1")
+        assert service.get_unread_count("u1") == 2
+        service.delete_notification("u1", "n3")
+        service.delete_notification("u1", new_id)
+        assert service.get_unread_count("u1") == 1
+        assert service.mark_all_notifications_read("u1") == 1
+        assert service.get_unread_count("u1") == 0
+
+        reminders = [{"itemId": "t2", "userId": user_id, "reminderDay": 1, "item": {"title": "Due", "deadline": 1},
+                      "daysUntil": 1.0, "isSubtask": False, "parentTaskTitle": None, "inApp": True}
+                     for user_id in ("u1", "u2")]
+        service.create_deadline_notifications(reminders, ledger={})
+        assert memory_db.reference("notificationCounters/u1/unreadCount").get() == 1
+        # u2 had no counter yet: it is built from the notifications on first read
+        assert memory_db.reference("notificationCounters/u2").get() is None
+
+        memory_db.stats.reset()
+        with patch('app.notification_service', service):
+            response = client.get('/notifications/u2/unread/count')
+        assert response.get_json() == {"count": 1}
+        memory_db.stats.reset()
+        with patch('app.notification_service', service):
+            response = client.get('/notifications/u2/unread/count')
+        assert response.get_json() == {"count": 1}
+        assert memory_db.stats.snapshot()["calls"] == {"get": 1}
+
+    def test_racing_reads_decrement_the_counter_once(self, memory_db):
+        """Test concurrent mark-read and delete calls only count real unread-to-read changes"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        memory_db.reference("notifications/u1").set({f"n{i}": {"read": False, "createdAt": i} for i in range(3)})
+        service = NotificationService()
+        assert service.get_unread_count("u1") == 3
+
+        calls = [lambda: service.mark_notification_read("u1", "n0")] * 4 + \
+                [lambda: service.delete_notification("u1", "n1")] * 4
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            list(pool.map(lambda call: call(), calls))
+
+        assert service.get_unread_count("u1") == 1
+        assert sorted(memory_db.reference("notifications/u1").get()) == ["n0", "n2"]
+
+    def test_mark_all_read_writes_only_unread_flags(self, memory_db):
+        """Test mark-all reads only the unread notifications and flips them in one update"""
+        memory_db.reference("notifications/u1").set({f"n{i}": {"read": i > 1, "createdAt": i, "message": "x" * 100}
+                                                      for i in range(50)})
+        service = NotificationService()
+        assert service.get_unread_count("u1") == 2
+
+        memory_db.stats.reset()
+        assert service.mark_all_notifications_read("u1") == 2
+        assert memory_db.stats.snapshot()["calls"] == {"query": 1, "update": 1, "transaction": 2}
+        assert service.get_unread_count("u1") == 0
+        assert memory_db.reference("notifications/u1/n1/message").get() == "x" * 100
+        assert all(n["read"] for n in memory_db.reference("notifications/u1").get().values())
+        assert service.mark_all_notifications_read("u1") == 0
+
+    def test_reconcile_unread_counts_fixes_drift(self, memory_db):
+        """Test the periodic recount corrects drifted counters but leaves ones that moved meanwhile"""
+        memory_db.reference().update({
+            "notifications/u1": {"n1": {"read": False}, "n2": {"read": True}},
+            "notifications/u2": {"n1": {"read": False}},
+            "notificationCounters/u1/unreadCount": 4,
+            "notificationCounters/u2/unreadCount": 1,
+            "notificationCounters/u3/unreadCount": 2,
+        })
+        service = NotificationService()
+
+        assert service.reconcile_unread_counts() == 2
+        assert memory_db.reference("notificationCounters").get() == {
+            "u1": {"unreadCount": 1}, "u2": {"unreadCount": 1}, "u3": {"unreadCount": 0}
+        }
+
+        # A create landing between the scan and the correction is not overwritten
+        assert service.replace_unread_count("u1", 4, 1) is False
+        assert memory_db.reference("notificationCounters/u1/unreadCount").get() == 1
+
+    def test_listen_and_latency(self, memory_db):
+        """Test listen() delivers writes and latency is applied per round trip"""
+        events = []
+        registration = memory_db.reference("notifications/u1").listen(events.append)
+        memory_db.reference("notifications/u1/n1").set({"read": False})
+        registration.close()
+        memory_db.reference("notifications/u1/n2").set({"read": False})
+
+        assert [(e.event_type, e.path) for e in events] == [("put", "/"), ("put", "/n1")]
+
+        memory_db.latency = 0.01
+        start = time.perf_counter()
+        memory_db.reference("tasks").order_by_child("status").equal_to("ongoing").get()
+        assert time.perf_counter() - start >= 0.01
+
+    def test_deadline_check_runs_once_across_replicas(self, memory_db):
+        """Test the persisted schedule and lease let only one scheduler run each check"""
+        first = SchedulerService("http://email-service:6005")
+        second = SchedulerService("http://email-service:6005")
+        first.deadline_job.owner, second.deadline_job.owner = "replica-1", "replica-2"
+
+        with patch.object(SchedulerService, 'check_task_deadlines') as mock_check:
+            assert first.run_if_due() is True
+            assert second.run_if_due() is False
+            assert first.run_if_due() is False
+            assert mock_check.call_count == 1
+
+        state = memory_db.reference("schedulerJobs/task_deadline_checker").get()
+        assert state["lastStatus"] == "ok"
+        assert state["nextRunAt"] - state["lastRunAt"] <= 900
+        assert "owner" not in state
+
+    def test_deadline_check_lease_blocks_until_expiry(self, memory_db):
+        """Test a held lease blocks other replicas, even forced ones, until it expires"""
+        from shared import ScheduledJob
+        job_ref = memory_db.reference("schedulerJobs/task_deadline_checker")
+        crashed = ScheduledJob(job_ref, interval=900, owner="crashed")
+        other = ScheduledJob(job_ref, interval=900, owner="other")
+        now = current_timestamp()
+
+        assert crashed.claim(now=now) is True
+        assert other.claim(force=True, now=now + 60) is False
+        assert other.claim(now=now + 901) is True
+        assert job_ref.get()["owner"] == "other"
+
+        # The stale owner finishing late does not clear the new lease
+        crashed.complete(now=now + 902)
+        assert job_ref.get()["owner"] == "other"
+
+
+
+class TestReminderEngine:
+    """Event-driven reminders fired from the persistent queue"""
+
+    @pytest.fixture
+    def engine(self, mock_db_refs, tmp_path):
+        from shared.memory_db import MemoryDatabase
+        database = MemoryDatabase()
+        mock_db_refs['notification'].side_effect = database.reference
+        mock_db_refs['scheduler'].side_effect = database.reference
+        database.load({
+            "notificationPreferences": {
+                "u1": {"enabled": True, "taskDeadlineReminders": True, "channel": "in-app", "reminderTimes": [1, 3]},
+            },
+            "users": {"u1": {"email": "u1@test.com"}},
+        })
+        clock = Mock(return_value=1_700_000_000)
+        with patch('reminder_engine.get_db_reference', side_effect=database.reference):
+            engine = ReminderEngine(SchedulerService("http://email-service:6005"),
+                                    queue=ReminderQueue(str(tmp_path / "reminders.sqlite3")), clock=clock)
+        for mirror in (engine.users, engine.preferences, engine.tasks, engine.subtasks):
+            mirror.start()
+        engine.rebuild()
+        engine._planning = True
+        engine.database = database
+        yield engine
+        for mirror in (engine.users, engine.preferences, engine.tasks, engine.subtasks):
+            mirror.stop()
+        engine.queue.close()
+
+    def test_fire_times_follow_deadline_and_preference_changes(self, engine):
+        """Test writes re-plan fire times exactly and reminders fire once at their time"""
+        now = engine.clock()
+        deadline = now + 5 * 86400
+        engine.database.reference("tasks/t1").set({"title": "Report", "ownerId": "u1", "deadline": deadline,
+                                                    "status": "ongoing"})
+
+        assert engine.queue.next_fire_at() == deadline - 3 * 86400
+        assert len(engine.queue) == 2
+
+        # Moving the deadline moves its fire times
+        engine.database.reference("tasks/t1/deadline").set(deadline + 3600)
+        assert engine.queue.next_fire_at() == deadline + 3600 - 3 * 86400
+
+        # Dropping the 3-day reminder from the user's preferences drops its entry
+        engine.database.reference("notificationPreferences/u1/reminderTimes").set([1])
+        assert len(engine.queue) == 1
+        assert engine.queue.next_fire_at() == deadline + 3600 - 86400
+
+        assert engine.fire_due(now=deadline + 3600 - 86400 - 1) == 0
+        engine.clock.return_value = deadline + 3600 - 86400
+        assert engine.fire_due() == 1
+        assert len(engine.queue) == 0
+        notification = list(engine.database.reference("notifications/u1").get().values())[0]
+        assert notification["daysUntilDeadline"] == 1.0
+        assert engine.database.reference("notificationsSent/t1_u1_1").get()["sentAt"] > 0
+
+    def test_completed_items_and_missed_reminders_are_not_queued(self, engine):
+        """Test completed items leave the queue and reminders missed by over half a day are skipped"""
+        now = engine.clock()
+        engine.database.reference("subtasks/s1").set({"title": "Review", "taskId": "t9", "collaborators": ["u1"],
+                                                       "deadline": now + 3 * 86400 + 600, "status": "ongoing"})
+        assert len(engine.queue) == 2
+        engine.database.reference("subtasks/s1/status").set("completed")
+        assert len(engine.queue) == 0
+
+        # 2.6 days left: the 3-day reminder is still in its window and fires now, the 1-day one later
+        engine.database.reference("subtasks/s2").set({"title": "Late", "ownerId": "u1",
+                                                       "deadline": now + int(2.6 * 86400), "status": "ongoing"})
+        assert engine.queue.next_fire_at() == now
+        # 2.4 days left: the 3-day reminder was missed
+        engine.database.reference("subtasks/s3").set({"title": "Later", "ownerId": "u1",
+                                                       "deadline": now + int(2.4 * 86400), "status": "ongoing"})
+        assert sorted(entry["itemId"] for entry in engine.queue.due(now)) == ["s2"]
+
+
+class TestNotificationStreams:
+    """Server-sent event streams fed by a listener per connected user"""
+
+    @pytest.fixture
+    def database(self):
+        from shared.memory_db import MemoryDatabase
+        database = MemoryDatabase()
+        database.reference("notifications/u1/n1").set({"notificationId": "n1", "read": False, "createdAt": 1})
+        return database
+
+    @pytest.fixture
+    def streams(self, database):
+        streams = NotificationStreams(database.reference("notifications"), heartbeat_seconds=0.01, linger_seconds=0)
+        yield streams
+        streams.close()
+
+    @staticmethod
+    def events(chunk):
+        """(id, event, data) for each event in a chunk of the stream"""
+        import json
+        parsed = []
+        for block in chunk.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith((":", "retry")))
+            if "event" in fields:
+                parsed.append((fields["id"], fields["event"], json.loads(fields["data"])))
+        return parsed
+
+    def test_stream_pushes_new_notifications_and_count_changes(self, database, streams):
+        """Test a stream starts with the count, then carries each change, with heartbeats in between"""
+        async def scenario():
+            stream = await streams.open("u1")
+            first = await anext(stream)
+            assert first.startswith("retry: ")
+            assert [event[1:] for event in self.events(first)] == [("unreadCount", {"count": 1})]
+            assert await anext(stream) == ": heartbeat\n\n"
+
+            database.reference("notifications/u1/n2").set({"notificationId": "n2", "message": "Hi", "read": False,
+                                                           "createdAt": 2})
+            [(_, name, data), (_, count_name, count)] = self.events(await anext(stream))
+            assert name == "notification" and data["notificationId"] == "n2" and data["message"] == "Hi"
+            assert (count_name, count) == ("unreadCount", {"count": 2})
+
+            database.reference("notifications/u1/n1").update({"read": True, "readAt": 3})
+            database.reference("notifications/u2/n3").set({"read": False, "createdAt": 3})
+            assert [event[1:] for event in self.events(await anext(stream))] == [("unreadCount", {"count": 1})]
+
+            assert streams.stats()["clients"] == 1
+            await stream.aclose()
+            assert streams.stats() == {"clients": 0, "users": 0, "listeners": 0, "maxClients": 10000}
+
+        asyncio.run(scenario())
+
+    def test_reconnect_resumes_from_last_event_id(self, database, streams):
+        """Test a reconnect gets the events it missed, and an unknown id gets the count and a resync"""
+        async def scenario():
+            keep_open = await streams.open("u1")
+            stream = await streams.open("u1")
+            [(last_id, _, _)] = self.events(await anext(stream))
+            await stream.aclose()
+
+            database.reference("notifications/u1/n2").set({"notificationId": "n2", "read": False, "createdAt": 2})
+            await asyncio.sleep(0)
+            resumed = await streams.open("u1", last_id)
+            assert [event[1] for event in self.events(await anext(resumed))] == ["notification", "unreadCount"]
+            await resumed.aclose()
+
+            stale = await streams.open("u1", "0000-7")
+            assert [event[1:] for event in self.events(await anext(stale))] == [
+                ("resync", {}), ("unreadCount", {"count": 2})]
+            await stale.aclose()
+            await keep_open.aclose()
+
+        asyncio.run(scenario())
+
+    def test_listeners_follow_connected_users(self, database, streams):
+        """Test a user's streams share one listener on their node, stopped when the last stream closes"""
+        async def stopped(count):
+            for _ in range(100):
+                if len(database._listeners) == count:
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+
+        async def scenario():
+            opened = [(user_id, await streams.open(user_id)) for user_id in ("u1", "u1", "u2", "u3")]
+            for _, stream in opened:
+                await anext(stream)
+            assert sorted(tuple(listener.segments) for listener in database._listeners) == [
+                ("notifications", "u1"), ("notifications", "u2"), ("notifications", "u3")]
+            assert streams.stats() == {"clients": 4, "users": 3, "listeners": 3, "maxClients": 10000}
+
+            database.reference("notifications/u2/n9").set({"notificationId": "n9", "read": False, "createdAt": 9})
+            streams_of = dict(opened)
+            [(_, name, data), _] = self.events(await anext(streams_of["u2"]))
+            assert (name, data["notificationId"]) == ("notification", "n9")
+            assert await anext(streams_of["u3"]) == ": heartbeat\n\n"
+
+            # A multi-path update at the root reaches each user's listener as a change under their node
+            database.reference().update({"notifications/u3/n10": {"notificationId": "n10", "read": False,
+                                                                  "createdAt": 10}})
+            assert [event[1] for event in self.events(await anext(streams_of["u3"]))] == [
+                "notification", "unreadCount"]
+
+            for user_id, stream in opened[:2]:
+                await stream.aclose()
+            assert await stopped(2)
+            assert streams.stats()["listeners"] == 2
+            for user_id, stream in opened[2:]:
+                await stream.aclose()
+            assert await stopped(0)
+
+        asyncio.run(scenario())
+
+    def test_stream_server_limits_and_responses(self, database):
+        """Test the stream server sends event streams and refuses clients past the limit"""
+        from stream_server import StreamServer
+
+        async def request(port, path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+            await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).decode()
+            return reader, writer, head
+
+        async def scenario(streams):
+            server = await asyncio.start_server(StreamServer(streams).handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer, head = await request(port, "/notifications/u1/stream")
+                assert head.startswith("HTTP/1.1 200") and "Content-Type: text/event-stream" in head
+                chunk = ""
+                while "unreadCount" not in chunk:
+                    chunk += (await reader.read(1024)).decode()
+                assert [event[1] for event in self.events(chunk)] == ["unreadCount"]
+
+                _, full, full_head = await request(port, "/notifications/u1/stream")
+                assert full_head.startswith("HTTP/1.1 503") and "Retry-After: 30" in full_head
+                full.close()
+
+                writer.close()
+                for _ in range(100):
+                    if streams.stats()["clients"] == 0:
+                        break
+                    await asyncio.sleep(0.01)
+                assert streams.stats()["clients"] == 0
+                _, other, missing = await request(port, "/notifications/u1")
+                assert missing.startswith("HTTP/1.1 404")
+                other.close()
+            streams.close()
+
+        asyncio.run(scenario(NotificationStreams(database.reference("notifications"), heartbeat_seconds=0.01,
+                                                 max_clients=1, linger_seconds=0)))
+
+        async def unavailable():
+            server = await asyncio.start_server(StreamServer(NotificationStreams(Mock(spec=["child"]))).handle,
+                                                "127.0.0.1", 0)
+            async with server:
+                _, writer, head = await request(server.sockets[0].getsockname()[1], "/notifications/u1/stream")
+                assert head.startswith("HTTP/1.1 501")
+                writer.close()
+
+        asyncio.run(unavailable())
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
@@ -5,13 +5,14 @@ import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from shared import init_firebase
+from shared import init_firebase, with_etag, init_responses
 
 from project_service import ProjectService
 from models import CreateProjectRequest, UpdateProjectRequest
 
 app = Flask(__name__)
 CORS(app)
+init_responses(app)
 
 # Initialize Firebase
 init_firebase()
@@ -50,10 +51,11 @@ def get_projects_by_department(department):
     return jsonify(projects=[p.to_dict() for p in projects]), 200
 
 @app.route("/project/<userid>", methods=["GET"])
+@with_etag
 def get_user_projects(userid):
     """Get projects for a user"""
-    projects = project_service.get_user_projects(userid)
-    return jsonify(projects=[p.to_dict() for p in projects]), 200
+    projects = project_service.get_user_projects(userid, wire=True)
+    return jsonify(projects=projects), 200
 
 @app.route("/project/update", methods=["POST"])
 def update_project():
@@ -2,7 +2,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     """Project data model"""
     project_id: str
@@ -44,6 +44,21 @@ class Project:
             "archived": self.archived
         }
 
+    @staticmethod
+    def project(data: dict):
+        """Convert a stored project straight to the dictionary to_dict returns, without building a Project"""
+        return {
+            "projectId": data.get("projectId", ""),
+            "title": data.get("title", ""),
+            "ownerId": data.get("ownerId", ""),
+            "collaborators": data.get("collaborators", []),
+            "description": data.get("description", ""),
+            "deadline": data.get("deadline", 0),
+            "creationDate": data.get("creationDate", 0),
+            "department": data.get("department", "Unknown"),
+            "archived": data.get("archived", False)
+        }
+
 @dataclass
 class CreateProjectRequest:
     """Request model for creating a project"""
@@ -73,12 +73,13 @@ class ProjectService:
         ]
         return filtered
     
-    def get_user_projects(self, user_id):
-        """Get projects for a user (owner or collaborator) - excluding archived"""
+    def get_user_projects(self, user_id, wire=False):
+        """Get projects for a user (owner or collaborator) - excluding archived (as wire dicts when wire is set)"""
         all_projects = self.projects_ref.get() or {}
         
+        convert = Project.project if wire else Project.from_dict
         filtered = [
-            Project.from_dict(p) for p in all_projects.values()
+            convert(p) for p in all_projects.values()
             if (user_id == p.get("ownerId") or user_id in p.get("collaborators", []))
             and not p.get("archived", False)
         ]
@@ -81,6 +81,11 @@ class TestProjectModels:
         assert data["ownerId"] == "u1"
         assert len(data["collaborators"]) == 2
         assert data["archived"] == False
+
+    def test_project_projection_matches_model(self, sample_project):
+        """Test Project.project returns what to_dict returns, defaults included"""
+        for record in (sample_project.to_dict(), {"projectId": "p2", "title": "Sparse"}):
+            assert Project.project(record) == Project.from_dict(record).to_dict()
     
     def test_create_project_request_validate_success(self):
         """Test validation with valid data"""
@@ -667,6 +672,24 @@ class TestProjectEndpoints:
         data = response.get_json()
         assert 'projects' in data
     
+    @patch('app.project_service.get_user_projects')
+    def test_get_user_projects_etag(self, mock_get, client, sample_project):
+        """Test GET /project/<userid> answers 304 while the projects are unchanged"""
+        mock_get.return_value = [sample_project.to_dict()]
+
+        response = client.get('/project/user123')
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+
+        response = client.get('/project/user123', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+        mock_get.return_value = []
+        response = client.get('/project/user123', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    
     @patch('app.project_service.update_project')
     def test_update_project(self, mock_update, client, sample_project):
         """Test updating project"""
@@ -1,7 +1,18 @@
 # shared/__init__.py
 """Shared utilities for all microservices"""
 
-from .firebase_config import init_firebase, get_db_reference
+from .firebase_config import init_firebase, get_db_reference, get_db_backend, use_database
+from .batch import get_many
+from .indexes import IndexState
+from .db_tree import generate_push_id
+from .activation import ActivationSweeper
+from .jobs import ScheduledJob
+from .pagination import encode_cursor, decode_cursor, parse_page_args, fetch_page
+from .changes import parse_since, is_expired, fetch_changed, tombstone_paths
+from .mirror import TreeMirror
+from .http import with_etag, init_responses
+from .serving import on_worker_start, start_worker_jobs
+from .cache import get_cache, invalidate, clear_caches, cache_stats, watch_for_changes
 from .utils import (
     current_timestamp, 
     validate_epoch_timestamp, 
@@ -13,6 +24,31 @@ from .utils import (
 __all__ = [
     'init_firebase',
     'get_db_reference',
+    'get_db_backend',
+    'use_database',
+    'get_many',
+    'IndexState',
+    'generate_push_id',
+    'ActivationSweeper',
+    'ScheduledJob',
+    'encode_cursor',
+    'decode_cursor',
+    'parse_page_args',
+    'fetch_page',
+    'parse_since',
+    'is_expired',
+    'fetch_changed',
+    'tombstone_paths',
+    'TreeMirror',
+    'with_etag',
+    'init_responses',
+    'on_worker_start',
+    'start_worker_jobs',
+    'get_cache',
+    'invalidate',
+    'clear_caches',
+    'cache_stats',
+    'watch_for_changes',
     'current_timestamp',
     'validate_epoch_timestamp',
     'validate_status',
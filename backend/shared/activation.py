@@ -0,0 +1,211 @@
+# shared/activation.py
+"""Background activation of tasks and subtasks whose start date arrives.
+
+Writers record every record that is not active yet under
+``pendingActivations/<tree>/<recordId>`` (its activation time) in the same
+multi-path update as the record itself. One sweeper per deployment, holding
+a lease at ``schedulerJobs/<tree>_activation``, keeps a min-heap of that
+queue, reloads it every ACTIVATION_POLL_SECONDS and sleeps until the earliest
+entry is due, so read paths can return the stored ``active`` flag without
+recomputing it. The whole tree is read only when the sweeper takes the lease
+and then every ACTIVATION_RESYNC_SECONDS, to catch records written without
+a queue entry.
+"""
+
+import heapq
+import logging
+import os
+import threading
+
+from .batch import get_many
+from .jobs import ScheduledJob
+from .utils import current_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class ActivationSweeper:
+    """Flip the active flag of records in one tree when their start date arrives"""
+
+    def __init__(self, name, records_ref, queue_ref, activation_time, refresh, lease_ref=None,
+                 poll_interval=None, resync_interval=None):
+        """
+        Args:
+            name: label used in logs, thread names and queue paths ("tasks", "subtasks")
+            records_ref: reference to the tree holding the records
+            queue_ref: reference to pendingActivations/<name>
+            activation_time: callable(record) -> epoch at which the record becomes active, or None
+            refresh: callable({record_id: record}) that persists due flags in one batch and returns the count
+            lease_ref: job record whose lease lets one process sweep at a time (None sweeps unconditionally)
+        """
+        self.name = name
+        self.records_ref = records_ref
+        self.queue_ref = queue_ref
+        self.activation_time = activation_time
+        self.refresh = refresh
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv("ACTIVATION_POLL_SECONDS", "60")
+        )
+        self.resync_interval = resync_interval if resync_interval is not None else float(
+            os.getenv("ACTIVATION_RESYNC_SECONDS", "86400")
+        )
+        self.lease = ScheduledJob(lease_ref, self.poll_interval, lease_seconds=3 * self.poll_interval) \
+            if lease_ref is not None else None
+        self.leader = self.lease is None
+        self.activated = 0
+        self._heap = []
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def pending_time(self, record):
+        """Activation time of a record that is not active yet, or None"""
+        if record and not record.get("active", False):
+            return self.activation_time(record)
+        return None
+
+    def queue_paths(self, record_id, record):
+        """Multi-path update entry adding (or, for None or active records, removing) a record's queue entry"""
+        return {f"pendingActivations/{self.name}/{record_id}": self.pending_time(record)}
+
+    def schedule(self, record_id, activate_at):
+        """Track a queued record in the heap (None stops tracking it)"""
+        with self._condition:
+            if activate_at is None:
+                self._pending.pop(record_id, None)
+                return
+            self._pending[record_id] = activate_at
+            heapq.heappush(self._heap, (activate_at, record_id))
+            self._condition.notify()
+
+    def next_activation(self):
+        """Return (activation time, record id) of the earliest pending record, or None"""
+        with self._condition:
+            self._drop_stale()
+            return self._heap[0] if self._heap else None
+
+    def load(self):
+        """Rebuild the heap from the queue. Returns the number of pending records."""
+        queue = self.queue_ref.get() or {}
+        heap = [(activate_at, record_id) for record_id, activate_at in queue.items()]
+        heapq.heapify(heap)
+        with self._condition:
+            self._heap, self._pending = heap, dict(queue)
+            self._condition.notify()
+        return len(queue)
+
+    def sync(self):
+        """Read the whole tree, activate overdue records and queue the rest. Returns the number flipped."""
+        records = self.records_ref.get() or {}
+        flipped = self.refresh(records)
+        now = current_timestamp()
+
+        pending = {}
+        for record_id, record in records.items():
+            activate_at = self.pending_time(record)
+            if activate_at is not None and activate_at > now:
+                pending[record_id] = activate_at
+        if pending:
+            # Only sets entries; one a writer moved after the read above is corrected when it comes due
+            self.queue_ref.update(pending)
+        queued = self.load()
+
+        self.activated += flipped
+        logger.info(f"Activation sweep of {self.name}: {flipped} activated, {queued} pending")
+        return flipped
+
+    def activate_due(self, now=None):
+        """Activate every pending record whose activation time has passed. Returns the number flipped."""
+        now = now if now is not None else current_timestamp()
+        with self._condition:
+            due = []
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, record_id = heapq.heappop(self._heap)
+                self._pending.pop(record_id, None)
+                due.append(record_id)
+                self._drop_stale()
+        if not due:
+            return 0
+
+        # Re-read the records so deleted or rescheduled ones are not resurrected
+        records = get_many(self.records_ref, due)
+        flipped = self.refresh(records)
+        # Drop the queue entries of activated or deleted records, move those of rescheduled ones
+        queue = {record_id: self.pending_time(records.get(record_id)) for record_id in due}
+        for record_id, activate_at in queue.items():
+            self.schedule(record_id, activate_at)
+        self.queue_ref.update(queue)
+        self.activated += flipped
+        return flipped
+
+    def start(self):
+        """Start the background worker (only once)"""
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-activation", daemon=True)
+        self._thread.start()
+        logger.info(f"Activation sweeper for {self.name} started")
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.lease is not None and self.leader:
+            self.lease.complete()
+            self.leader = False
+
+    # Internal helpers -----------------------------------------------------
+
+    def _drop_stale(self):
+        """Pop heap entries superseded by a later schedule() or load()"""
+        while self._heap and self._pending.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _hold_lease(self):
+        """Take or renew the lease; True while this process is the sweeper"""
+        if self.lease is None:
+            return True
+        held = self.lease.claim(force=True)
+        if held != self.leader:
+            logger.info(f"Activation sweeper for {self.name} {'took' if held else 'lost'} the lease")
+            self.leader = held
+        return held
+
+    def _run(self):
+        next_sync = next_load = 0
+        while not self._stopped:
+            try:
+                now = current_timestamp()
+                if not self._hold_lease():
+                    # Another process sweeps; resync from the tree once this one takes over
+                    next_sync = 0
+                elif now >= next_sync:
+                    self.sync()
+                    next_sync = now + self.resync_interval
+                    next_load = now + self.poll_interval
+                else:
+                    if now >= next_load:
+                        self.load()
+                        next_load = now + self.poll_interval
+                    self.activate_due(now)
+            except Exception as e:
+                logger.error(f"Activation sweep of {self.name} failed: {str(e)}")
+                # Resync soon: records popped from the heap before the failure are picked up again
+                next_sync = current_timestamp() + 60
+
+            with self._condition:
+                if self._stopped:
+                    break
+                wake_at = current_timestamp() + self.poll_interval
+                if self.leader:
+                    head = self.next_activation()
+                    wake_at = min(wake_at, next_sync, next_load, head[0] if head else wake_at)
+                timeout = max(wake_at - current_timestamp(), 0)
+                if timeout:
+                    self._condition.wait(timeout)
@@ -0,0 +1,29 @@
+# shared/batch.py
+"""Batched record fetches for keys listed in a denormalized index tree.
+
+The Realtime Database has no multi-get, so the records are fetched with
+concurrent child reads; wall-clock time is then roughly one round trip per
+DB_FETCH_CONCURRENCY records instead of one per record.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def get_many(ref, keys, max_workers=None):
+    """Fetch ref/<key> for every key and return {key: value} for the records that exist"""
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    if max_workers is None:
+        max_workers = int(os.getenv("DB_FETCH_CONCURRENCY", "16"))
+    max_workers = max(1, min(max_workers, len(keys)))
+
+    if max_workers == 1:
+        values = [ref.child(key).get() for key in keys]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            values = list(executor.map(lambda key: ref.child(key).get(), keys))
+
+    return {key: value for key, value in zip(keys, values) if value is not None}
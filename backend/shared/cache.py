@@ -0,0 +1,158 @@
+# shared/cache.py
+"""Process-wide read-through cache for small, frequently read records
+(users, notification preferences, task titles).
+
+Each named cache is an LRU bounded by CACHE_MAX_ENTRIES whose entries expire
+after CACHE_TTL_SECONDS. The caches are filled by services that read the
+records but do not write them (task titles are read by the subtask, comment
+and notification services and written by the task service), so a change is
+picked up once the TTL expires, or immediately when CACHE_WATCH_CHANGES
+enables the watch_for_changes() listeners registered for each cache. Code
+that changes a cached record in the same process calls invalidate().
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, name, maxsize=None, ttl=None):
+        self.name = name
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("CACHE_TTL_SECONDS", "60"))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store value for key, evicting the least recently used entry if full"""
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and caching its result on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def reset(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.maxsize,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_caches = {}
+_watchers = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name, maxsize=None, ttl=None):
+    """Return the process-wide cache with the given name, creating it on first use"""
+    with _registry_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = TTLCache(name, maxsize, ttl)
+            _caches[name] = cache
+        return cache
+
+
+def invalidate(name, key=None):
+    """Invalidation hook: drop key (or everything) from the named cache"""
+    with _registry_lock:
+        cache = _caches.get(name)
+    if cache is not None:
+        cache.invalidate(key)
+
+
+def clear_caches():
+    """Drop every entry and reset counters in all caches"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.reset()
+
+
+def cache_stats():
+    """Return hit/miss metrics for every cache in this process"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def watch_for_changes(name, ref):
+    """Invalidation hook for records written by other processes: when
+    CACHE_WATCH_CHANGES is enabled, listen on ref and drop the keys of the
+    named cache whose records change. Registered at most once per cache."""
+    if os.getenv("CACHE_WATCH_CHANGES", "false").lower() != "true":
+        return None
+
+    cache = get_cache(name)
+
+    def on_change(event):
+        segments = [segment for segment in (event.path or "").split("/") if segment]
+        if segments:
+            cache.invalidate(segments[0])
+        elif event.event_type == "patch" and isinstance(event.data, dict):
+            for path in event.data:
+                cache.invalidate(path.strip("/").split("/")[0])
+        else:
+            cache.invalidate()
+
+    with _registry_lock:
+        if name not in _watchers:
+            _watchers[name] = ref.listen(on_change)
+        return _watchers[name]
@@ -0,0 +1,78 @@
+# shared/changes.py
+"""Delta reads for polling clients.
+
+A client keeps the ``watermark`` of its last poll and asks for the records
+whose ``updatedAt`` is at or after it, plus tombstones for records deleted
+since. Deletes write ``<tombstone tree>/<id>: {"deletedAt": ...}`` in the
+same multi-path update that removes the record; tombstones older than
+TOMBSTONE_RETENTION_SECONDS are pruned by later deletes, so a client whose
+watermark is older than that must reload the full list.
+"""
+
+import logging
+import os
+
+from .utils import current_timestamp
+
+logger = logging.getLogger(__name__)
+
+PRUNE_BATCH = 100
+
+
+def tombstone_retention():
+    return int(os.getenv("TOMBSTONE_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+
+
+def parse_since(args):
+    """Read the since query parameter. Returns (since, error)."""
+    raw_since = args.get("since")
+    if raw_since is None:
+        return None, "since is required"
+    try:
+        since = int(raw_since)
+    except ValueError:
+        return None, "since must be a non-negative integer"
+    if since < 0:
+        return None, "since must be a non-negative integer"
+    return since, None
+
+
+def is_expired(since, now=None):
+    """True when tombstones from since onwards may already have been pruned"""
+    now = now if now is not None else current_timestamp()
+    return since < now - tombstone_retention()
+
+
+def fetch_changed(ref, field, since):
+    """Children of ref whose field is at or after since, read with an indexed range query"""
+    try:
+        return ref.order_by_child(field).start_at(since).get() or {}
+    except Exception as e:
+        # Engines without query support, or a database missing the .indexOn rule
+        logger.warning(f"Indexed {field} query failed, falling back to a full scan: {str(e)}")
+        records = ref.get() or {}
+        return {
+            key: record for key, record in records.items()
+            if isinstance(record, dict) and (record.get(field) or 0) >= since
+        }
+
+
+def tombstone_paths(tree, tombstones_ref, record_id, now=None):
+    """Multi-path update entries recording a delete in tree and pruning expired tombstones"""
+    now = now if now is not None else current_timestamp()
+    paths = {f"{tree}/{record_id}": {"deletedAt": now}}
+    try:
+        expired = dict(
+            tombstones_ref.order_by_child("deletedAt")
+            .end_at(now - tombstone_retention())
+            .limit_to_first(PRUNE_BATCH)
+            .get() or {}
+        )
+    except Exception as e:
+        logger.warning(f"Could not read expired tombstones in {tree}: {str(e)}")
+        expired = {}
+    for expired_id in expired:
+        if expired_id == record_id:
+            continue
+        paths[f"{tree}/{expired_id}"] = None
+    return paths
@@ -0,0 +1,238 @@
+# shared/db_tree.py
+"""Helpers shared by the local database engines (path handling, Firebase
+value normalisation, push IDs and query ordering)"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+
+
+def split_path(path):
+    """Split a database path into its non-empty segments"""
+    if not path:
+        return []
+    return [segment for segment in str(path).split("/") if segment]
+
+
+def join_path(segments):
+    """Join path segments back into a database path"""
+    return "/".join(segments)
+
+
+def normalize_value(value):
+    """Apply Realtime Database storage rules: null values and empty
+    containers are not stored"""
+    if isinstance(value, dict):
+        result = {}
+        for key, child in value.items():
+            child = normalize_value(child)
+            if child is not None:
+                result[str(key)] = child
+        return result or None
+    if isinstance(value, (list, tuple)):
+        result = [normalize_value(item) for item in value]
+        return result if any(item is not None for item in result) else None
+    return value
+
+
+def get_at(value, segments):
+    """Return the value found at a relative path inside a JSON value"""
+    for segment in segments:
+        if isinstance(value, dict):
+            value = value.get(segment)
+        elif isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+            value = value[int(segment)]
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def set_at(value, segments, new_value):
+    """Return a copy of a JSON value with new_value written at a relative path"""
+    if not segments:
+        return normalize_value(new_value)
+    if isinstance(value, list):
+        value = {str(i): item for i, item in enumerate(value) if item is not None}
+    container = dict(value) if isinstance(value, dict) else {}
+    head, rest = segments[0], segments[1:]
+    child = set_at(container.get(head), rest, new_value)
+    if child is None:
+        container.pop(head, None)
+    else:
+        container[head] = child
+    return container or None
+
+
+def generate_push_id():
+    """Generate a chronologically ordered 20 character push ID, matching the
+    format produced by the Firebase SDKs"""
+    global _last_push_time
+
+    with _push_lock:
+        now = int(time.time() * 1000)
+        duplicate_time = now == _last_push_time
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        push_id = "".join(reversed(time_chars))
+
+        if not duplicate_time:
+            for i in range(12):
+                _last_rand_chars[i] = random.randrange(64)
+        else:
+            i = 11
+            while i >= 0 and _last_rand_chars[i] == 63:
+                _last_rand_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand_chars[i] += 1
+
+        return push_id + "".join(PUSH_CHARS[i] for i in _last_rand_chars)
+
+
+def _type_rank(value):
+    """Realtime Database ordering: null, false, true, numbers, strings, objects"""
+    if value is None:
+        return 0
+    if value is False:
+        return 1
+    if value is True:
+        return 2
+    if isinstance(value, (int, float)):
+        return 3
+    if isinstance(value, str):
+        return 4
+    return 5
+
+
+def value_sort_key(value):
+    """Sort key for a value following Realtime Database ordering"""
+    rank = _type_rank(value)
+    if rank in (3, 4):
+        return (rank, value)
+    return (rank, 0)
+
+
+def key_sort_key(key):
+    """Sort key for child keys: integer-like keys first, then strings"""
+    key = str(key)
+    if key.lstrip("-").isdigit() and len(key) < 11:
+        return (0, int(key), "")
+    return (1, 0, key)
+
+
+def children_of(value):
+    """Return the (key, child) pairs of a JSON value"""
+    if isinstance(value, dict):
+        return list(value.items())
+    if isinstance(value, list):
+        return [(str(i), item) for i, item in enumerate(value) if item is not None]
+    return []
+
+
+class QuerySpec:
+    """Ordering and filter parameters of a query"""
+
+    def __init__(self, order_by, order_path=None):
+        self.order_by = order_by  # "child", "key" or "value"
+        self.order_path = order_path
+        self.start = None
+        self.end = None
+        self.limit_first = None
+        self.limit_last = None
+
+    def sort_key_for(self, key, child):
+        """Return the comparison key for one child"""
+        if self.order_by == "key":
+            return key_sort_key(key)
+        if self.order_by == "value":
+            order_value = child
+        else:
+            order_value = get_at(child, split_path(self.order_path))
+        return (value_sort_key(order_value), key_sort_key(key))
+
+    def _bound_key(self, bound):
+        if self.order_by == "key":
+            return key_sort_key(bound)
+        return value_sort_key(bound)
+
+    def apply(self, children):
+        """Filter, order and limit (key, child) pairs in Python"""
+        entries = [(self.sort_key_for(key, child), key, child) for key, child in children]
+        if self.start is not None or self.end is not None:
+            start = self._bound_key(self.start) if self.start is not None else None
+            end = self._bound_key(self.end) if self.end is not None else None
+            filtered = []
+            for sort_key, key, child in entries:
+                primary = sort_key if self.order_by == "key" else sort_key[0]
+                if start is not None and primary < start:
+                    continue
+                if end is not None and primary > end:
+                    continue
+                filtered.append((sort_key, key, child))
+            entries = filtered
+        entries.sort(key=lambda entry: entry[0])
+        if self.limit_first is not None:
+            entries = entries[:self.limit_first]
+        if self.limit_last is not None:
+            entries = entries[-self.limit_last:] if self.limit_last else []
+        return OrderedDict((key, child) for _, key, child in entries)
+
+
+class Query:
+    """Query builder mirroring firebase_admin.db.Query"""
+
+    def __init__(self, ref, order_by, order_path=None):
+        self._ref = ref
+        self._spec = QuerySpec(order_by, order_path)
+
+    def limit_to_first(self, limit):
+        if not isinstance(limit, int) or limit < 0:
+            raise ValueError("Limit must be a non-negative integer.")
+        if self._spec.limit_last is not None:
+            raise ValueError("Cannot set both first and last limits.")
+        self._spec.limit_first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        if not isinstance(limit, int) or limit < 0:
+            raise ValueError("Limit must be a non-negative integer.")
+        if self._spec.limit_first is not None:
+            raise ValueError("Cannot set both first and last limits.")
+        self._spec.limit_last = limit
+        return self
+
+    def start_at(self, start):
+        if start is None:
+            raise ValueError("Start value must not be None.")
+        self._spec.start = start
+        return self
+
+    def end_at(self, end):
+        if end is None:
+            raise ValueError("End value must not be None.")
+        self._spec.end = end
+        return self
+
+    def equal_to(self, value):
+        if value is None:
+            raise ValueError("Equal to value must not be None.")
+        self._spec.start = value
+        self._spec.end = value
+        return self
+
+    def get(self):
+        """Execute the query and return an ordered dict of matching children"""
+        return self._ref._run_query(self._spec)
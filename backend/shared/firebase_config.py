@@ -5,24 +5,56 @@ import firebase_admin
 from firebase_admin import credentials, db
 
 _firebase_initialized = False
+_local_db = None
+
+def get_db_backend():
+    """Return the configured storage backend ("firebase", "sqlite" or "memory")"""
+    return os.getenv("DB_BACKEND", "firebase").strip().lower()
+
+def _get_local_db():
+    """Create the local storage engine for non-Firebase backends (only once per app)"""
+    global _local_db
+
+    if _local_db is None:
+        backend = get_db_backend()
+        if backend == "sqlite":
+            from .sqlite_db import SQLiteDatabase
+            _local_db = SQLiteDatabase(os.getenv("SQLITE_PATH", "spm.sqlite3"))
+        elif backend == "memory":
+            from .memory_db import MemoryDatabase
+            _local_db = MemoryDatabase(latency=float(os.getenv("MEMORY_DB_LATENCY_MS", "0")) / 1000)
+        else:
+            raise ValueError(f"Unsupported DB_BACKEND: {backend}")
+
+    return _local_db
+
+def use_database(database):
+    """Route get_db_reference to a local engine instance (None restores the configured backend)"""
+    global _local_db
+    _local_db = database
 
 def init_firebase():
     """Initialize Firebase Admin SDK (only once per app)"""
     global _firebase_initialized
-    
+
+    if _local_db is not None or get_db_backend() != "firebase":
+        return _get_local_db()
+
     if not _firebase_initialized:
         json_path = os.getenv("JSON_PATH")
         database_url = os.getenv("DATABASE_URL")
-        
+
         if not json_path or not database_url:
             raise ValueError("JSON_PATH and DATABASE_URL must be set")
-        
+
         cred = credentials.Certificate(json_path)
         firebase_admin.initialize_app(cred, {"databaseURL": database_url})
         _firebase_initialized = True
-    
+
     return db
 
 def get_db_reference(path=""):
-    """Get a Firebase database reference"""
-    return db.reference(path)
\ No newline at end of file
+    """Get a database reference from the configured backend"""
+    if _local_db is not None or get_db_backend() != "firebase":
+        return _get_local_db().reference(path)
+    return db.reference(path)
@@ -0,0 +1,48 @@
+# shared/gunicorn_conf.py
+"""gunicorn settings shared by the service containers.
+
+Run from a service directory with: gunicorn -c shared/gunicorn_conf.py app:app
+
+The app is not preloaded, so each worker imports app.py itself and
+initializes Firebase exactly once in its own process (the Admin SDK's HTTP
+sessions and listener threads are not fork-safe). Send SIGHUP to the master
+to reload workers gracefully, or SIGTERM to drain and stop.
+"""
+
+import multiprocessing
+import os
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+bind = f"0.0.0.0:{_int_env('PORT', 8000)}"
+
+# Workers default to 2 x cores + 1; threads > 1 switches to the threaded worker
+workers = _int_env("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = _int_env("WEB_THREADS", 4)
+worker_class = "gthread" if threads > 1 else "sync"
+
+timeout = _int_env("WEB_TIMEOUT", 60)
+graceful_timeout = _int_env("WEB_GRACEFUL_TIMEOUT", 30)
+keepalive = _int_env("WEB_KEEPALIVE", 5)
+
+# Recycle workers after this many requests (0 disables) to cap slow leaks
+max_requests = _int_env("WEB_MAX_REQUESTS", 0)
+max_requests_jitter = _int_env("WEB_MAX_REQUESTS_JITTER", max_requests // 10)
+
+preload_app = False
+accesslog = os.getenv("WEB_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    """Start the app's background jobs (e.g. the email senders) in every worker"""
+    from shared.serving import start_worker_jobs
+
+    started = start_worker_jobs(worker.wsgi)
+    if started:
+        worker.log.info("Started %d background job(s) in worker %s", started, worker.pid)
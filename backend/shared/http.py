@@ -0,0 +1,131 @@
+# shared/http.py
+"""Flask response helpers shared by the service apps."""
+
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import make_response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; responses are gzipped without it
+    brotli = None
+
+
+def with_etag(view):
+    """Tag successful GET responses with an ETag of their body.
+
+    Clients that send the tag back in If-None-Match get an empty 304 Not
+    Modified instead of the payload. Cache-Control: no-cache makes browsers
+    revalidate on every request rather than serve a stale copy.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if request.method in ("GET", "HEAD") and response.status_code == 200 and not response.direct_passthrough:
+            response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+            response.headers["Cache-Control"] = "no-cache"
+            response.make_conditional(request)
+        return response
+    return wrapper
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it is installed.
+
+    Output matches the default provider (sorted keys, Flask's handling of
+    dates, decimals and dataclasses); anything orjson rejects, such as
+    integers beyond 64 bits, goes through the stdlib encoder.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encode(self, obj, indent=False):
+        """Serialize obj to bytes, or return None if orjson is unavailable or refuses it"""
+        if orjson is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) <= {"indent", "separators"}:
+            body = self._encode(obj, kwargs.get("indent"))
+            if body is not None:
+                return body.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._encode(self._prepare_response_obj(args, kwargs), indent)
+        if body is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def _encodings():
+    """Content codings this process can produce, in order of preference"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress_response(response):
+    """Compress JSON and text bodies with the best coding the client accepts.
+
+    Bodies under COMPRESS_MIN_BYTES, streamed bodies and bodies that are
+    already encoded are left alone. A strong ETag becomes weak, since the
+    bytes on the wire no longer match the tagged body.
+    """
+    if (response.direct_passthrough or response.is_streamed or request.method == "HEAD"
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers):
+        return response
+    mimetype = response.mimetype or ""
+    if mimetype != "application/json" and not mimetype.startswith("text/"):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < int(os.getenv("COMPRESS_MIN_BYTES", "1024")):
+        return response
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=int(os.getenv("BROTLI_QUALITY", "4")))
+    else:
+        compressed = gzip.compress(data, compresslevel=int(os.getenv("GZIP_LEVEL", "6")), mtime=0)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_responses(app):
+    """Install the fast JSON provider and response compression on a Flask app"""
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
+    return app
@@ -0,0 +1,44 @@
+# shared/indexes.py
+"""Backfill state of the denormalized index trees.
+
+Writes keep tasksByProject, tasksByUser and subtasksByTask current, but
+records written before the trees existed are only listed once the service's
+rebuild_indexes migration has run. The migration records that under
+indexState/<tree>; until the marker exists readers use an indexed query on
+the source tree, which is slower but complete, instead of guessing from a
+short or empty index node.
+"""
+
+from .utils import current_timestamp
+
+
+class IndexState:
+    """Whether the index trees built from one source tree can be read on their own"""
+
+    def __init__(self, name, ref):
+        """
+        Args:
+            name: source tree the indexes are built from ("tasks", "subtasks")
+            ref: reference to indexState/<name>
+        """
+        self.name = name
+        self.ref = ref
+        self._ready = False
+
+    def ready(self):
+        """True once the backfill has been recorded (remembered for the life of the process)"""
+        if not self._ready:
+            self._ready = bool(self.ref.get())
+        return self._ready
+
+    def backfill(self, root_ref, paths, batch_paths=1000):
+        """Write index entries in multi-path updates of at most batch_paths, then record the backfill.
+
+        Entries are only added, so index writes made while this runs are kept;
+        stale entries are harmless because readers check every fetched record.
+        """
+        paths = list(paths.items())
+        for start in range(0, len(paths), batch_paths):
+            root_ref.update(dict(paths[start:start + batch_paths]))
+        root_ref.update({f"indexState/{self.name}": {"builtAt": current_timestamp()}})
+        self._ready = True
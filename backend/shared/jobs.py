@@ -0,0 +1,110 @@
+# shared/jobs.py
+"""Periodic jobs whose schedule and lock live in the database.
+
+Each job is one record under ``schedulerJobs/<job id>`` holding its next run
+time, the outcome of the last run and a lease. A process runs the job only
+after claiming it in a transaction, which succeeds when the run is due and no
+other process holds an unexpired lease, so any number of scheduler replicas
+run each slot exactly once and a restart picks up the persisted schedule
+instead of rescanning immediately. A process that dies mid-run stops blocking
+the others once its lease expires.
+"""
+
+import logging
+import os
+import socket
+
+from .utils import current_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class _NotClaimed(Exception):
+    """Raised inside the claim transaction to leave the record untouched"""
+
+
+def default_owner():
+    """Identify this process in lease records"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ScheduledJob:
+    """A job that runs every `interval` seconds in at most one process at a time"""
+
+    def __init__(self, job_ref, interval, lease_seconds=None, owner=None):
+        """
+        Args:
+            job_ref: reference to the job's record (e.g. schedulerJobs/task_deadline_checker)
+            interval: seconds between the start of one run and the next
+            lease_seconds: how long a claim blocks other processes (defaults to interval)
+            owner: lease owner name, unique per process
+        """
+        self.job_ref = job_ref
+        self.interval = interval
+        self.lease_seconds = lease_seconds if lease_seconds is not None else interval
+        self.owner = owner or default_owner()
+
+    def state(self):
+        """Return the persisted job record ({} before the first run)"""
+        return self.job_ref.get() or {}
+
+    def claim(self, force=False, now=None):
+        """Take the lease if the job is due (or force is set) and nobody else holds it.
+
+        Returns True when this process should run the job. The next run time
+        is advanced in the same transaction, so a slot is never claimed twice.
+        """
+        now = current_timestamp() if now is None else now
+
+        def take(current):
+            record = dict(current or {})
+            lease_holder = record.get("owner")
+            if lease_holder and lease_holder != self.owner and record.get("leaseExpiresAt", 0) > now:
+                raise _NotClaimed()
+            if not force and record.get("nextRunAt", 0) > now:
+                raise _NotClaimed()
+            record.update({
+                "owner": self.owner,
+                "leaseExpiresAt": now + self.lease_seconds,
+                "startedAt": now,
+                "nextRunAt": now + self.interval,
+                "interval": self.interval,
+            })
+            return record
+
+        try:
+            self.job_ref.transaction(take)
+        except _NotClaimed:
+            return False
+        return True
+
+    def complete(self, status="ok", now=None):
+        """Record the outcome of a claimed run and release the lease"""
+        now = current_timestamp() if now is None else now
+
+        def finish(current):
+            record = dict(current or {})
+            if record.get("owner") != self.owner:
+                # The lease expired and another process took over; keep its claim
+                raise _NotClaimed()
+            record.update({"owner": None, "leaseExpiresAt": None, "lastRunAt": now, "lastStatus": status})
+            return record
+
+        try:
+            self.job_ref.transaction(finish)
+        except _NotClaimed:
+            logger.warning("Lease on %s was taken over before the run finished", self.job_ref.path)
+
+    def run_if_due(self, func, force=False):
+        """Claim the job and call func if it is due. Returns True when func ran."""
+        if not self.claim(force=force):
+            return False
+        status = "ok"
+        try:
+            func()
+        except Exception as e:
+            status = f"error: {e}"
+            raise
+        finally:
+            self.complete(status)
+        return True
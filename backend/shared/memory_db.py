@@ -0,0 +1,303 @@
+# shared/memory_db.py
+"""In-memory stand-in for the Firebase Realtime Database.
+
+Every reference operation that would be a network round trip against
+Firebase is counted (per operation, with request/response payload sizes)
+and can be delayed by a configurable latency, so code paths can be
+benchmarked for wall-clock time and round-trip counts without a live
+project.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .db_tree import (
+    Query,
+    children_of,
+    generate_push_id,
+    get_at,
+    join_path,
+    normalize_value,
+    split_path,
+)
+
+
+class DatabaseStats:
+    """Round trip and payload counters for a MemoryDatabase"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = Counter()
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    def record(self, operation, sent=0, received=0):
+        with self._lock:
+            self.calls[operation] += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    @property
+    def round_trips(self):
+        return sum(self.calls.values())
+
+    def snapshot(self):
+        """Return the counters as a plain dict"""
+        with self._lock:
+            return {
+                "roundTrips": sum(self.calls.values()),
+                "calls": dict(self.calls),
+                "bytesSent": self.bytes_sent,
+                "bytesReceived": self.bytes_received,
+            }
+
+
+class Event:
+    """Change event delivered to listen() callbacks, mirroring firebase_admin.db.Event"""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class ListenerRegistration:
+    """Handle returned by listen(); close() stops delivery"""
+
+    def __init__(self, database, segments, callback):
+        self._database = database
+        self.segments = segments
+        self.callback = callback
+
+    def close(self):
+        self._database._remove_listener(self)
+
+
+class MemoryDatabase:
+    """A Realtime Database tree held in process memory"""
+
+    def __init__(self, latency=0.0, data=None):
+        self.latency = latency
+        self.stats = DatabaseStats()
+        self._lock = threading.RLock()
+        self._root = normalize_value(data)
+        self._listeners = []
+
+    def reference(self, path=""):
+        """Return a reference to the given path"""
+        return MemoryReference(self, split_path(path))
+
+    def load(self, data):
+        """Replace the whole tree without counting a round trip (for seeding fixtures)"""
+        with self._lock:
+            self._root = normalize_value(json.loads(json.dumps(data)))
+
+    def dump(self):
+        """Return a copy of the whole tree without counting a round trip"""
+        with self._lock:
+            return json.loads(json.dumps(self._root))
+
+    # Internal helpers -----------------------------------------------------
+
+    def _round_trip(self, operation, sent=None, received=None):
+        """Account for one simulated network call and return the decoded response"""
+        sent_bytes = len(json.dumps(sent)) if sent is not None else 0
+        payload = json.dumps(received) if received is not None else "null"
+        self.stats.record(operation, sent_bytes, len(payload))
+        return json.loads(payload)
+
+    def _delay(self, round_trips=1):
+        """Simulate network latency outside the lock so concurrent callers overlap"""
+        if self.latency:
+            time.sleep(self.latency * round_trips)
+
+    def _read(self, segments):
+        return get_at(self._root, segments)
+
+    def _write(self, segments, value):
+        value = normalize_value(json.loads(json.dumps(value)))
+        if not segments:
+            self._root = value
+            return
+        if not isinstance(self._root, dict):
+            self._root = {}
+        # Walk down in place (copying would make every write O(tree size))
+        parents = []
+        node = self._root
+        for segment in segments[:-1]:
+            child = node.get(segment)
+            if isinstance(child, list):
+                child = {str(i): item for i, item in enumerate(child) if item is not None}
+                node[segment] = child
+            elif not isinstance(child, dict):
+                child = {}
+                node[segment] = child
+            parents.append((node, segment))
+            node = child
+        if value is None:
+            node.pop(segments[-1], None)
+        else:
+            node[segments[-1]] = value
+        # Prune containers left empty, as the Realtime Database does
+        for parent, segment in reversed(parents):
+            if parent[segment]:
+                break
+            del parent[segment]
+        if not self._root:
+            self._root = None
+
+    def _add_listener(self, registration):
+        with self._lock:
+            self._listeners.append(registration)
+            initial = self._read(registration.segments)
+        registration.callback(Event("put", "/", json.loads(json.dumps(initial))))
+
+    def _remove_listener(self, registration):
+        with self._lock:
+            if registration in self._listeners:
+                self._listeners.remove(registration)
+
+    def _notify(self, segments, event_type, data):
+        """Deliver a change at segments to listeners at, above or below it"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for registration in listeners:
+            target = registration.segments
+            if segments[:len(target)] == target:
+                path = "/" + join_path(segments[len(target):])
+                registration.callback(Event(event_type, path, json.loads(json.dumps(data))))
+            elif target[:len(segments)] == segments:
+                with self._lock:
+                    value = json.loads(json.dumps(self._read(target)))
+                registration.callback(Event("put", "/", value))
+
+
+class MemoryReference:
+    """Reference to a location in a MemoryDatabase, mirroring firebase_admin.db.Reference"""
+
+    def __init__(self, database, segments):
+        self._database = database
+        self._segments = list(segments)
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return "/" + join_path(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return MemoryReference(self._database, self._segments[:-1])
+
+    def child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f"Invalid path argument: {path}")
+        return MemoryReference(self._database, self._segments + split_path(path))
+
+    def get(self, etag=False, shallow=False):
+        """Return the value at this location"""
+        with self._database._lock:
+            value = self._database._read(self._segments)
+            if shallow and isinstance(value, dict):
+                value = {key: True if isinstance(child, (dict, list)) else child for key, child in value.items()}
+            value = self._database._round_trip("get", received=value)
+        self._database._delay()
+        if etag:
+            return value, hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+        return value
+
+    def set(self, value):
+        """Replace the value at this location"""
+        if value is None:
+            raise ValueError("Value must not be None.")
+        with self._database._lock:
+            self._database._round_trip("set", sent=value)
+            self._database._write(self._segments, value)
+        self._database._delay()
+        self._database._notify(self._segments, "put", normalize_value(value))
+
+    def update(self, value):
+        """Write each key of value (which may be a slash separated path) under this location"""
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        if None in value.keys():
+            raise ValueError("Dictionary must not contain None keys.")
+        with self._database._lock:
+            self._database._round_trip("update", sent=value)
+            for path, child in value.items():
+                self._database._write(self._segments + split_path(path), child)
+        self._database._delay()
+        self._database._notify(self._segments, "patch", value)
+
+    def push(self, value=""):
+        """Create a child with a generated, chronologically ordered key"""
+        if value is None:
+            raise ValueError("Value must not be None.")
+        new_ref = self.child(generate_push_id())
+        with self._database._lock:
+            self._database._round_trip("push", sent=value)
+            if value != "":
+                self._database._write(new_ref._segments, value)
+        self._database._delay()
+        if value != "":
+            self._database._notify(new_ref._segments, "put", normalize_value(value))
+        return new_ref
+
+    def delete(self):
+        """Delete the value at this location"""
+        with self._database._lock:
+            self._database._round_trip("delete")
+            self._database._write(self._segments, None)
+        self._database._delay()
+        self._database._notify(self._segments, "put", None)
+
+    def transaction(self, transaction_update):
+        """Atomically read, modify and write the value at this location.
+
+        Costs two round trips, like the Admin SDK's read-then-conditional-write.
+        """
+        if not callable(transaction_update):
+            raise ValueError("transaction_update must be a function.")
+        with self._database._lock:
+            current = self._database._round_trip("transaction", received=self._database._read(self._segments))
+            new_value = transaction_update(current)
+            self._database._round_trip("transaction", sent=new_value)
+            self._database._write(self._segments, new_value)
+        self._database._delay(2)
+        self._database._notify(self._segments, "put", normalize_value(new_value))
+        return normalize_value(new_value)
+
+    def listen(self, callback):
+        """Register a callback for changes at or below this location"""
+        registration = ListenerRegistration(self._database, self._segments, callback)
+        self._database._add_listener(registration)
+        return registration
+
+    def order_by_child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f"Illegal child path: {path}")
+        return Query(self, "child", path)
+
+    def order_by_key(self):
+        return Query(self, "key")
+
+    def order_by_value(self):
+        return Query(self, "value")
+
+    def _run_query(self, spec):
+        with self._database._lock:
+            result = spec.apply(children_of(self._database._read(self._segments)))
+            result = self._database._round_trip("query", received=result)
+        self._database._delay()
+        return OrderedDict(result)
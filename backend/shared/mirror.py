@@ -0,0 +1,74 @@
+# shared/mirror.py
+"""Local copies of database trees kept current by listeners.
+
+A TreeMirror registers one listener on a tree and applies its events to a
+dict of records, so a long-running process can read the tree from memory
+and react to the records that changed instead of downloading it again.
+"""
+
+import threading
+
+from .db_tree import set_at, split_path
+
+
+class TreeMirror:
+    """Mirror the children of ref in `records` and report which ones change"""
+
+    def __init__(self, ref, on_change=None, lock=None):
+        """
+        Args:
+            ref: reference to the tree to mirror ("tasks", "users", ...)
+            on_change: callable(changed ids, or None after a full reload), called after each event
+            lock: lock held while an event is applied and on_change runs (shared between mirrors)
+        """
+        self.ref = ref
+        self.on_change = on_change
+        self.lock = lock or threading.RLock()
+        self.records = {}
+        self.loaded = threading.Event()
+        self._registration = None
+
+    def start(self):
+        """Start listening; the initial event loads the whole tree"""
+        self._registration = self.ref.listen(self.apply)
+        return self
+
+    def stop(self):
+        if self._registration is not None:
+            self._registration.close()
+            self._registration = None
+
+    def apply(self, event):
+        """Apply a listener event (put or patch at a path relative to the tree)"""
+        segments = split_path(event.path or "/")
+        with self.lock:
+            if event.event_type == "put" and not segments:
+                records = dict(event.data) if isinstance(event.data, dict) else {}
+                # After the initial load, a whole-tree event is narrowed to the records that differ
+                changed = None if not self.loaded.is_set() else {
+                    record_id for record_id in self.records.keys() | records.keys()
+                    if self.records.get(record_id) != records.get(record_id)
+                }
+                self.records = records
+            elif event.event_type == "put":
+                self._set(segments, event.data)
+                changed = {segments[0]}
+            else:
+                changed = set()
+                for path, value in (event.data or {}).items():
+                    child = segments + split_path(path)
+                    if not child:
+                        continue
+                    self._set(child, value)
+                    changed.add(child[0])
+            self.loaded.set()
+            if self.on_change is not None:
+                self.on_change(changed)
+
+    def _set(self, segments, value):
+        record_id, rest = segments[0], segments[1:]
+        record = set_at(self.records.get(record_id), rest, value)
+        if record is None:
+            self.records.pop(record_id, None)
+        else:
+            self.records[record_id] = record
@@ -0,0 +1,94 @@
+# shared/pagination.py
+"""Cursor pagination over database children in key order.
+
+Cursors are opaque to clients: a cursor encodes the key of the first record
+of the next page, which the next request passes to ``start_at``. Push keys
+are chronological, so key order is creation order.
+"""
+
+import base64
+import os
+from collections import OrderedDict
+
+
+def encode_cursor(key):
+    """Encode the key a page should start at as an opaque cursor"""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor (raises ValueError if malformed)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+    except (UnicodeError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not key or encode_cursor(key) != cursor:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def parse_page_args(args):
+    """Read limit and cursor query parameters.
+
+    Returns (limit, start_key, error). limit is None when the client asked for
+    neither, meaning the endpoint should return everything.
+    """
+    raw_limit = args.get("limit")
+    cursor = args.get("cursor")
+    if raw_limit is None and cursor is None:
+        return None, None, None
+
+    max_limit = int(os.getenv("PAGE_SIZE_MAX", "500"))
+    if raw_limit is None:
+        limit = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            return None, None, "limit must be a positive integer"
+        if limit <= 0:
+            return None, None, "limit must be a positive integer"
+
+    start_key = None
+    if cursor is not None:
+        try:
+            start_key = decode_cursor(cursor)
+        except ValueError as e:
+            return None, None, str(e)
+
+    return min(limit, max_limit), start_key, None
+
+
+def fetch_page(ref, limit, start_key=None, resolve=None, include=None):
+    """Read up to limit children of ref in key order, starting at start_key.
+
+    resolve(batch) may map a batch of children to the records they stand for
+    (e.g. index tree keys to task records); include(record) filters records
+    out of the page. Further batches are read until the page is full or the
+    children run out. Returns (OrderedDict of records, key the next page
+    starts at or None).
+    """
+    page = OrderedDict()
+    while True:
+        need = limit - len(page)
+        query = ref.order_by_key()
+        if start_key is not None:
+            query = query.start_at(start_key)
+        batch = query.limit_to_first(need + 1).get() or {}
+
+        keys = list(batch)
+        consumed = OrderedDict((key, batch[key]) for key in keys[:need])
+        records = resolve(consumed) if resolve else consumed
+        for key in consumed:
+            record = records.get(key)
+            if record is not None and (include is None or include(record)):
+                page[key] = record
+
+        if len(keys) <= need:
+            return page, None
+        start_key = keys[need]
+        if len(page) >= limit:
+            return page, start_key
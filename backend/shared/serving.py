@@ -0,0 +1,30 @@
+# shared/serving.py
+"""Background jobs that run alongside request handling in each worker.
+
+Threads started at import time would be started in the gunicorn master and
+lost on fork, so apps register them here instead: ``python app.py`` starts
+them before the dev server and the gunicorn config starts them once in every
+worker after it has loaded the app.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def on_worker_start(app, job):
+    """Register a callable that starts a background job in each serving process"""
+    app.extensions.setdefault("worker_jobs", []).append(job)
+    return job
+
+
+def start_worker_jobs(app):
+    """Start the jobs registered on app (once per process) and return how many were started"""
+    if app.extensions.get("worker_jobs_started"):
+        return 0
+    app.extensions["worker_jobs_started"] = True
+    jobs = app.extensions.get("worker_jobs", [])
+    for job in jobs:
+        logger.info("Starting worker job %s", getattr(job, "__name__", job))
+        job()
+    return len(jobs)
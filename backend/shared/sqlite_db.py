@@ -0,0 +1,335 @@
+# shared/sqlite_db.py
+"""SQLite storage engine exposing the firebase_admin.db reference API.
+
+The database tree is stored one record per row: ``tasks/<taskId>`` is a row,
+``notifications/<userId>/<notificationId>`` is a row, and so on. Record depth
+per top-level tree is configured in RECORD_DEPTH. Fields that services query
+on are covered by expression indexes so ``order_by_child(...).equal_to(...)``
+is answered from an index instead of a scan.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .db_tree import (
+    Query,
+    children_of,
+    generate_push_id,
+    get_at,
+    join_path,
+    normalize_value,
+    set_at,
+    split_path,
+)
+
+# Number of path segments below the tree name that make up one record
+RECORD_DEPTH = {
+    "notifications": 2,
+    "tasksByProject": 2,
+    "tasksByUser": 2,
+    "subtasksByTask": 2,
+}
+
+# Record fields covered by an index, per tree
+INDEXED_FIELDS = {
+    "tasks": ("projectId", "ownerId", "updatedAt", "start_date"),
+    "subtasks": ("taskId", "ownerId", "updatedAt", "start_date"),
+    "project": ("ownerId", "department"),
+    "notifications": ("read", "createdAt"),
+    "notificationsSent": ("sentAt",),
+    "deadlineExtensionRequests": ("itemId", "requesterId", "status"),
+    "users": ("email",),
+    "notificationPreferences": ("updatedAt",),
+    "deletedTasks": ("deletedAt",),
+    "deletedSubtasks": ("deletedAt",),
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _json_path(segments):
+    """Build the SQLite JSON path for a child path"""
+    parts = []
+    for segment in segments:
+        if _IDENTIFIER.match(segment):
+            parts.append(segment)
+        else:
+            parts.append('"' + segment.replace('"', '') + '"')
+    return "$." + ".".join(parts)
+
+
+def _json_expr(segments):
+    return "json_extract(value, '" + _json_path(segments).replace("'", "''") + "')"
+
+
+class SQLiteDatabase:
+    """A Realtime Database tree persisted in a SQLite file"""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " path TEXT PRIMARY KEY,"
+            " parent TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_records_parent ON records(parent, key)")
+        fields = sorted({field for tree_fields in INDEXED_FIELDS.values() for field in tree_fields})
+        for field in fields:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_records_{field} ON records(parent, {_json_expr([field])})"
+            )
+
+    def reference(self, path=""):
+        """Return a reference to the given path"""
+        return SQLiteReference(self, split_path(path))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Internal helpers -----------------------------------------------------
+
+    def _record_length(self, segments):
+        """Number of segments in the path of a record within this tree"""
+        if not segments:
+            return 2
+        return 1 + RECORD_DEPTH.get(segments[0], 1)
+
+    def _write_transaction(self):
+        return _WriteTransaction(self)
+
+    def _read(self, segments):
+        ancestors = [join_path(segments[:i]) for i in range(1, len(segments) + 1)]
+        if ancestors:
+            placeholders = ",".join("?" * len(ancestors))
+            row = self._conn.execute(
+                f"SELECT path, value FROM records WHERE path IN ({placeholders})", ancestors
+            ).fetchone()
+            if row:
+                row_segments = split_path(row[0])
+                return get_at(json.loads(row[1]), segments[len(row_segments):])
+
+        prefix = join_path(segments)
+        if prefix:
+            rows = self._conn.execute(
+                "SELECT path, value FROM records WHERE path > ? AND path < ?",
+                (prefix + "/", prefix + "0"),
+            ).fetchall()
+        else:
+            rows = self._conn.execute("SELECT path, value FROM records").fetchall()
+
+        result = None
+        for path, value in rows:
+            relative = split_path(path)[len(segments):]
+            result = set_at(result, relative, json.loads(value))
+        return result
+
+    def _delete_ancestor_rows(self, segments):
+        ancestors = [join_path(segments[:i]) for i in range(1, len(segments))]
+        if ancestors:
+            placeholders = ",".join("?" * len(ancestors))
+            self._conn.execute(f"DELETE FROM records WHERE path IN ({placeholders})", ancestors)
+
+    def _insert(self, segments, value):
+        if value is None:
+            return
+        if len(segments) >= self._record_length(segments) or not isinstance(value, dict):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (path, parent, key, value) VALUES (?, ?, ?, ?)",
+                (join_path(segments), join_path(segments[:-1]), segments[-1] if segments else "",
+                 json.dumps(value)),
+            )
+            return
+        for key, child in value.items():
+            self._insert(segments + [str(key)], child)
+
+    def _set(self, segments, value):
+        value = normalize_value(value)
+        record_length = self._record_length(segments)
+
+        if len(segments) >= record_length:
+            record = segments[:record_length]
+            sub_path = segments[record_length:]
+            record_path = join_path(record)
+            self._delete_ancestor_rows(record)
+            current = None
+            if sub_path:
+                row = self._conn.execute("SELECT value FROM records WHERE path = ?", (record_path,)).fetchone()
+                current = json.loads(row[0]) if row else None
+            new_value = set_at(current, sub_path, value)
+            if new_value is None:
+                self._conn.execute("DELETE FROM records WHERE path = ?", (record_path,))
+            else:
+                self._insert(record, new_value)
+            return
+
+        prefix = join_path(segments)
+        self._delete_ancestor_rows(segments)
+        if prefix:
+            self._conn.execute(
+                "DELETE FROM records WHERE path = ? OR (path > ? AND path < ?)",
+                (prefix, prefix + "/", prefix + "0"),
+            )
+        else:
+            self._conn.execute("DELETE FROM records")
+        self._insert(segments, value)
+
+    def _children_are_records(self, segments):
+        return bool(segments) and len(segments) == self._record_length(segments) - 1
+
+    def _query(self, segments, spec):
+        if not self._children_are_records(segments) or spec.order_by == "value":
+            return spec.apply(children_of(self._read(segments)))
+
+        if spec.order_by == "key":
+            order_expr = "key"
+        else:
+            order_expr = _json_expr(split_path(spec.order_path))
+
+        sql = f"SELECT key, value FROM records WHERE parent = ?"
+        params = [join_path(segments)]
+        if spec.start is not None:
+            sql += f" AND {order_expr} >= ?"
+            params.append(spec.start)
+        if spec.end is not None:
+            sql += f" AND {order_expr} <= ?"
+            params.append(spec.end)
+
+        descending = spec.limit_last is not None
+        direction = "DESC" if descending else "ASC"
+        sql += f" ORDER BY {order_expr} {direction}, key {direction}"
+        limit = spec.limit_last if descending else spec.limit_first
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._conn.execute(sql, params).fetchall()
+        if descending:
+            rows.reverse()
+        return OrderedDict((key, json.loads(value)) for key, value in rows)
+
+
+class _WriteTransaction:
+    """Serialise a write against other threads and processes"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __enter__(self):
+        self._database._lock.acquire()
+        self._database._conn.execute("BEGIN IMMEDIATE")
+        return self._database
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._database._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._database._lock.release()
+        return False
+
+
+class SQLiteReference:
+    """Reference to a location in a SQLiteDatabase, mirroring firebase_admin.db.Reference"""
+
+    def __init__(self, database, segments):
+        self._database = database
+        self._segments = list(segments)
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return "/" + join_path(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return SQLiteReference(self._database, self._segments[:-1])
+
+    def child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f"Invalid path argument: {path}")
+        return SQLiteReference(self._database, self._segments + split_path(path))
+
+    def get(self, etag=False, shallow=False):
+        """Return the value at this location"""
+        with self._database._lock:
+            value = self._database._read(self._segments)
+        if shallow and isinstance(value, dict):
+            value = {key: True if isinstance(child, (dict, list)) else child for key, child in value.items()}
+        if etag:
+            return value, hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+        return value
+
+    def set(self, value):
+        """Replace the value at this location"""
+        if value is None:
+            raise ValueError("Value must not be None.")
+        with self._database._write_transaction() as database:
+            database._set(self._segments, value)
+
+    def update(self, value):
+        """Write each key of value (which may be a slash separated path) under this location"""
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        if None in value.keys():
+            raise ValueError("Dictionary must not contain None keys.")
+        with self._database._write_transaction() as database:
+            for path, child in value.items():
+                database._set(self._segments + split_path(path), child)
+
+    def push(self, value=""):
+        """Create a child with a generated, chronologically ordered key"""
+        if value is None:
+            raise ValueError("Value must not be None.")
+        new_ref = self.child(generate_push_id())
+        if value != "":
+            new_ref.set(value)
+        return new_ref
+
+    def delete(self):
+        """Delete the value at this location"""
+        with self._database._write_transaction() as database:
+            database._set(self._segments, None)
+
+    def transaction(self, transaction_update):
+        """Atomically read, modify and write the value at this location"""
+        if not callable(transaction_update):
+            raise ValueError("transaction_update must be a function.")
+        with self._database._write_transaction() as database:
+            current = database._read(self._segments)
+            new_value = transaction_update(current)
+            database._set(self._segments, new_value)
+        return normalize_value(new_value)
+
+    def order_by_child(self, path):
+        if not path or not isinstance(path, str):
+            raise ValueError(f"Illegal child path: {path}")
+        return Query(self, "child", path)
+
+    def order_by_key(self):
+        return Query(self, "key")
+
+    def order_by_value(self):
+        return Query(self, "value")
+
+    def _run_query(self, spec):
+        with self._database._lock:
+            return self._database._query(self._segments, spec)
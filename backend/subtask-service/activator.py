@@ -0,0 +1,36 @@
+# backend/subtask-service/activator.py
+"""Run the subtask start-date activation sweeper in its own process.
+
+The HTTP workers only queue future start dates; this process flips the
+active flags. Any number of replicas can run: the one holding the lease at
+schedulerJobs/subtasks_activation sweeps and the others stand by.
+Run with: python activator.py
+"""
+import sys
+import os
+import signal
+import logging
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared import init_firebase
+from subtask_service import SubtaskService
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    init_firebase()
+
+    sweeper = SubtaskService().activation_sweeper
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    sweeper.start()
+    stopped.wait()
+    sweeper.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,14 @@ import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from shared import init_firebase, validate_epoch_timestamp
+from shared import init_firebase, validate_epoch_timestamp, cache_stats, parse_page_args, encode_cursor, parse_since, is_expired, current_timestamp, with_etag, init_responses
 
 from subtask_service import SubtaskService
 from models import CreateSubtaskRequest, UpdateSubtaskRequest
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Watermark"])
+init_responses(app)
 
 # Initialize Firebase
 init_firebase()
@@ -50,10 +51,37 @@ def create_subtask():
     return jsonify(message="Subtask created successfully", subtask=subtask.to_dict()), 201
 
 @app.route("/subtasks", methods=["GET"])
+@with_etag
 def get_all_subtasks():
-    """Get all subtasks"""
-    subtasks = subtask_service.get_all_subtasks()
-    return jsonify(subtasks=[s.to_dict() for s in subtasks]), 200
+    """Get all subtasks, or one page of them when limit/cursor are given"""
+    limit, start_key, error = parse_page_args(request.args)
+    if error:
+        return jsonify(error=error), 400
+
+    if limit is None:
+        # Clients pass the watermark to /subtasks/changes to fetch only later changes. It is
+        # sent as a header so the body, and therefore the ETag, only changes with the subtasks.
+        watermark = current_timestamp()
+        subtasks = subtask_service.get_all_subtasks(wire=True)
+        return jsonify(subtasks=subtasks), 200, {"X-Watermark": str(watermark)}
+
+    subtasks, next_key = subtask_service.get_subtasks_page(limit, start_key)
+    return jsonify(subtasks=[s.to_dict() for s in subtasks], nextCursor=encode_cursor(next_key)), 200
+
+@app.route("/subtasks/changes", methods=["GET"])
+def get_subtask_changes():
+    """Get subtasks updated at or after since, plus the IDs deleted since"""
+    since, error = parse_since(request.args)
+    if error:
+        return jsonify(error=error), 400
+
+    # Taken before reading so writes that race with this request show up in the next poll
+    watermark = current_timestamp()
+    if is_expired(since, watermark):
+        return jsonify(error="since is older than the tombstone retention; reload the full list"), 410
+
+    subtasks, deleted = subtask_service.get_subtask_changes(since)
+    return jsonify(subtasks=[s.to_dict() for s in subtasks], deleted=deleted, watermark=watermark), 200
 
 @app.route("/subtasks/<subtask_id>", methods=["GET"])
 def get_subtask_by_id(subtask_id):
@@ -101,17 +129,25 @@ def delete_subtask_by_id(subtask_id):
     return jsonify(message="Subtask deleted successfully"), 200
 
 @app.route("/subtasks/task/<task_id>", methods=["GET"])
+@with_etag
 def get_subtasks_by_task(task_id):
     """Get all subtasks by task ID"""
-    subtasks = subtask_service.get_subtasks_by_task(task_id)
-    return jsonify(subtasks=[s.to_dict() for s in subtasks]), 200
+    subtasks = subtask_service.get_subtasks_by_task(task_id, wire=True)
+    return jsonify(subtasks=subtasks), 200
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(status="healthy", service="subtask-service"), 200
+    return jsonify(
+        status="healthy",
+        service="subtask-service",
+        cache=cache_stats()
+    ), 200
 
 if __name__ == '__main__':
+    # Served by gunicorn, the sweeper runs in its own process (python activator.py)
+    subtask_service.activation_sweeper.start()
+
     app.run(host='0.0.0.0', port=6003, debug=True)
 
 # ===================================================
@@ -2,7 +2,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class Subtask:
     """Subtask data model"""
     subtask_id: str
@@ -75,6 +75,32 @@ class Subtask:
             "startedAt": self.started_at
         }
 
+    @staticmethod
+    def project(data: dict):
+        """Convert a stored subtask straight to the dictionary to_dict returns, without building a Subtask"""
+        return {
+            "subTaskId": data.get("subTaskId", ""),
+            "title": data.get("title", ""),
+            "creatorId": data.get("creatorId", ""),
+            "deadline": data.get("deadline", 0),
+            "status": data.get("status", "ongoing"),
+            "notes": data.get("notes", ""),
+            "attachments": data.get("attachments", []),
+            "collaborators": data.get("collaborators", []),
+            "taskId": data.get("taskId", ""),
+            "ownerId": data.get("ownerId", ""),
+            "priority": data.get("priority", 0),
+            "createdAt": data.get("createdAt", 0),
+            "updatedAt": data.get("updatedAt", 0),
+            "start_date": data.get("start_date", 0),
+            "active": data.get("active", True),
+            "scheduled": data.get("scheduled", False),
+            "schedule": data.get("schedule", "daily"),
+            "custom_schedule": data.get("custom_schedule"),
+            "completedAt": data.get("completedAt"),
+            "startedAt": data.get("startedAt")
+        }
+
 @dataclass
 class CreateSubtaskRequest:
     """Request model for creating a subtask"""
@@ -0,0 +1,19 @@
+# backend/subtask-service/rebuild_indexes.py
+"""Rebuild the subtasksByTask index tree from the subtasks tree.
+
+Run once after deploying the index trees: until it has recorded
+indexState/subtasks, reads use the indexed query instead of the trees. Safe to
+run again if the trees are suspected to be missing entries:  python rebuild_indexes.py
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared import init_firebase
+
+from subtask_service import SubtaskService
+
+if __name__ == '__main__':
+    init_firebase()
+    count = SubtaskService().rebuild_indexes()
+    print(f"Backfilled subtasksByTask for {count} subtasks")
@@ -8,7 +8,7 @@ from datetime import datetime, timezone, timedelta
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import get_db_reference, current_timestamp, validate_epoch_timestamp
+from shared import get_db_reference, get_cache, get_many, IndexState, fetch_page, fetch_changed, tombstone_paths, ActivationSweeper, watch_for_changes, current_timestamp, validate_epoch_timestamp
 from models import Subtask, CreateSubtaskRequest, UpdateSubtaskRequest
 
 logger = logging.getLogger(__name__)
@@ -17,16 +17,74 @@ class SubtaskService:
     """Service for managing subtasks"""
 
     def __init__(self):
+        self.root_ref = get_db_reference("/")
         self.subtasks_ref = get_db_reference("subtasks")
+        self.subtasks_by_task_ref = get_db_reference("subtasksByTask")
+        self.index_state = IndexState("subtasks", get_db_reference("indexState/subtasks"))
+        self.deleted_subtasks_ref = get_db_reference("deletedSubtasks")
+        self.activations_flipped = 0
+        self.activation_sweeper = ActivationSweeper(
+            "subtasks", self.subtasks_ref, get_db_reference("pendingActivations/subtasks"),
+            self.activation_time, self.refresh_active_flags,
+            lease_ref=get_db_reference("schedulerJobs/subtasks_activation")
+        )
         self.tasks_ref = get_db_reference("tasks")
         self.users_ref = get_db_reference("users")
         self.notification_prefs_ref = get_db_reference("notificationPreferences")
+        self.user_cache = get_cache("users")
+        self.prefs_cache = get_cache("notificationPreferences")
+        self.task_title_cache = get_cache("taskTitles")
+        watch_for_changes("users", self.users_ref)
+        watch_for_changes("notificationPreferences", self.notification_prefs_ref)
+        watch_for_changes("taskTitles", self.tasks_ref)
         self.notification_service_url = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:6004")
     
     def validate_status(self, status):
         allowed_statuses = ["ongoing", "unassigned", "under_review", "completed"]
         return status.lower() in allowed_statuses
 
+    def index_paths(self, subtask_id, subtask_data, present=True):
+        """Multi-path update entries adding (or removing) a subtask in the subtasksByTask tree"""
+        if not subtask_data.get("taskId"):
+            return {}
+        return {f"subtasksByTask/{subtask_data['taskId']}/{subtask_id}": True if present else None}
+
+    def save_new_subtask(self, subtask_id, subtask_data):
+        """Write a new subtask, its index entry and its activation queue entry in one atomic multi-path update"""
+        self.root_ref.update({
+            f"subtasks/{subtask_id}": subtask_data,
+            **self.index_paths(subtask_id, subtask_data),
+            **self.activation_sweeper.queue_paths(subtask_id, subtask_data)
+        })
+
+    def rebuild_indexes(self):
+        """Backfill the subtasksByTask tree from the subtasks tree and mark it complete"""
+        all_subtasks = self.subtasks_ref.get() or {}
+        paths = {}
+        for subtask_id, subtask_data in all_subtasks.items():
+            paths.update(self.index_paths(subtask_id, subtask_data))
+
+        self.index_state.backfill(self.root_ref, paths)
+        return len(all_subtasks)
+
+    def get_user(self, user_id):
+        """Get a user record, served from the process-wide cache when fresh"""
+        return self.user_cache.get_or_load(user_id, lambda: self.users_ref.child(user_id).get())
+
+    def get_notification_preferences(self, user_id):
+        """Get a user's notification preferences, served from the process-wide cache when fresh"""
+        return self.prefs_cache.get_or_load(user_id, lambda: self.notification_prefs_ref.child(user_id).get())
+
+    def get_task_title(self, task_id):
+        """Get a task's title for notifications, served from the process-wide cache when fresh.
+
+        A task without a title gives 'Untitled Task'; a missing task gives None.
+        """
+        def load():
+            task_data = self.tasks_ref.child(task_id).get()
+            return task_data.get('title', 'Untitled Task') if task_data else None
+        return self.task_title_cache.get_or_load(task_id, load)
+
     def send_subtask_update_notification(self, subtask_id, subtask_title, old_status, new_status, owner_id, collaborators, parent_task_id):
         """Send subtask status update notifications to owner and collaborators"""
         try:
@@ -37,9 +95,7 @@ class SubtaskService:
             # Get parent task title
             parent_task_title = None
             try:
-                parent_task_data = self.tasks_ref.child(parent_task_id).get()
-                if parent_task_data:
-                    parent_task_title = parent_task_data.get('title', 'Untitled Task')
+                parent_task_title = self.get_task_title(parent_task_id)
             except Exception as e:
                 logger.error(f"Failed to fetch parent task {parent_task_id}: {str(e)}")
 
@@ -48,11 +104,11 @@ class SubtaskService:
             for user_id in user_ids:
                 try:
                     # Get user email
-                    user_data = self.users_ref.child(user_id).get()
+                    user_data = self.get_user(user_id)
                     user_email = user_data.get('email') if user_data else None
 
                     # Get user preferences
-                    prefs = self.notification_prefs_ref.child(user_id).get()
+                    prefs = self.get_notification_preferences(user_id)
                     if prefs:
                         # Check if task update reminders are enabled
                         if prefs.get('taskUpdateReminders', True):
@@ -69,7 +125,7 @@ class SubtaskService:
                 except Exception as e:
                     logger.error(f"Failed to fetch preferences for user {user_id}: {str(e)}")
                     # Default to sending notification
-                    user_data = self.users_ref.child(user_id).get()
+                    user_data = self.get_user(user_id)
                     user_email = user_data.get('email') if user_data else None
                     user_preferences[user_id] = {
                         'email': user_email,
@@ -111,6 +167,10 @@ class SubtaskService:
         except Exception as e:
             logger.error(f"Error sending subtask update notification: {str(e)}")
     
+    def activation_time(self, subtask_data):
+        """Epoch at which a subtask becomes active (its start date), or None"""
+        return subtask_data.get("start_date")
+
     def calculate_new_start_date(self, old_start_date, schedule, custom_schedule=None):
         now = current_timestamp()
         old_dt = datetime.fromtimestamp(old_start_date, tz=timezone.utc)
@@ -207,7 +267,7 @@ class SubtaskService:
             "startedAt": new_started_at
         }
         
-        new_subtask_ref.set(new_subtask_data)
+        self.save_new_subtask(new_subtask_ref.key, new_subtask_data)
         return Subtask.from_dict(new_subtask_data)
     
     def create_subtask(self, req: CreateSubtaskRequest):
@@ -233,6 +293,8 @@ class SubtaskService:
             initial_status = "unassigned"
             started_at = None
         
+        start_date = req.start_date if req.start_date else current_time
+
         subtask_data = {
             "subTaskId": new_subtask_ref.key,
             "title": req.title,
@@ -247,8 +309,8 @@ class SubtaskService:
             "priority": req.priority,
             "createdAt": current_time,
             "updatedAt": current_time,
-            "start_date": req.start_date if req.start_date else current_time,
-            "active": req.active,
+            "start_date": start_date,
+            "active": current_time >= start_date,
             "scheduled": req.scheduled,
             "schedule": req.schedule,
             "custom_schedule": req.custom_schedule,
@@ -256,28 +318,54 @@ class SubtaskService:
             "startedAt": started_at
         }
         
-        new_subtask_ref.set(subtask_data)
+        self.save_new_subtask(new_subtask_ref.key, subtask_data)
         return Subtask.from_dict(subtask_data), None
     
-    def get_all_subtasks(self):
-        """Get all subtasks"""
-        all_subtasks = self.subtasks_ref.get() or {}
-        now = current_timestamp()
-        
-        subtasks = []
-        for subtask_data in all_subtasks.values():
+    def refresh_active_flags(self, subtasks_data, now=None):
+        """Recompute the active flag of each subtask from its start date.
+
+        Every flag that changed is persisted in a single multi-path update on
+        the root reference, bumping updatedAt so delta polls pick it up.
+        Returns the number of flags flipped.
+        """
+        now = now if now is not None else current_timestamp()
+        flips = {}
+        flipped = 0
+        for subtask_data in subtasks_data.values():
             start_date = subtask_data.get("start_date")
-            if start_date is not None:
-                if now >= start_date:
-                    if not subtask_data.get("active", False):
-                        self.subtasks_ref.child(subtask_data['subTaskId']).update({"active": True})
-                    subtask_data["active"] = True
-                else:
-                    subtask_data["active"] = False
-            
-            subtasks.append(Subtask.from_dict(subtask_data))
-        
-        return subtasks
+            if start_date is None:
+                continue
+            should_be_active = now >= start_date
+            if should_be_active != subtask_data.get("active", False):
+                flips[f"subtasks/{subtask_data['subTaskId']}/active"] = should_be_active
+                flips[f"subtasks/{subtask_data['subTaskId']}/updatedAt"] = now
+                subtask_data["updatedAt"] = now
+                flipped += 1
+            subtask_data["active"] = should_be_active
+
+        if flips:
+            self.root_ref.update(flips)
+            self.activations_flipped += flipped
+            logger.info(f"Flipped the active flag of {flipped} subtasks")
+        return flipped
+
+    def get_all_subtasks(self, wire=False):
+        """Get all subtasks (as wire dicts, without building Subtask objects, when wire is set)"""
+        all_subtasks = self.subtasks_ref.get() or {}
+        convert = Subtask.project if wire else Subtask.from_dict
+        return [convert(subtask_data) for subtask_data in all_subtasks.values()]
+    
+    def get_subtasks_page(self, limit, start_key=None):
+        """Get up to limit subtasks in key order, starting at start_key. Returns (subtasks, next_key)"""
+        page, next_key = fetch_page(self.subtasks_ref, limit, start_key)
+        return [Subtask.from_dict(subtask_data) for subtask_data in page.values()], next_key
+    
+    def get_subtask_changes(self, since):
+        """Get subtasks changed at or after since. Returns (subtasks updated since, IDs deleted since)"""
+        changed = fetch_changed(self.subtasks_ref, "updatedAt", since)
+        deleted = [subtask_id for subtask_id in fetch_changed(self.deleted_subtasks_ref, "deletedAt", since)
+                   if subtask_id not in changed]
+        return [Subtask.from_dict(subtask_data) for subtask_data in changed.values()], deleted
     
     def get_subtask_by_id(self, subtask_id):
         """Get a subtask by ID"""
@@ -287,17 +375,6 @@ class SubtaskService:
         if not subtask_data:
             return None, "Subtask not found"
         
-        now = current_timestamp()
-        start_date = subtask_data.get("start_date")
-        
-        if start_date is not None:
-            if now >= start_date:
-                if not subtask_data.get("active", False):
-                    subtask_ref.update({"active": True})
-                    subtask_data["active"] = True
-            else:
-                subtask_data["active"] = False
-        
         return Subtask.from_dict(subtask_data), None
     
     def update_subtask(self, req: UpdateSubtaskRequest):
@@ -380,12 +457,25 @@ class SubtaskService:
         if req.start_date is not None:
             update_data["start_date"] = req.start_date
         
-        update_data["updatedAt"] = current_timestamp()
+        current_time = current_timestamp()
+        update_data["updatedAt"] = current_time
         
         if len(update_data) == 1:
             return None, "No valid fields provided for update"
+
+        # The active flag follows the start date; the activation sweeper flips it when a future date arrives
+        if "start_date" in update_data or "active" in update_data:
+            start_date = update_data.get("start_date", existing_subtask.get("start_date"))
+            if start_date is not None:
+                update_data["active"] = current_time >= start_date
         
-        subtask_ref.update(update_data)
+        if "active" in update_data:
+            # Start date changed: update the record and its activation queue entry atomically
+            fan_out = {f"subtasks/{req.subtask_id}/{field}": value for field, value in update_data.items()}
+            fan_out.update(self.activation_sweeper.queue_paths(req.subtask_id, {**existing_subtask, **update_data}))
+            self.root_ref.update(fan_out)
+        else:
+            subtask_ref.update(update_data)
 
         # Get updated subtask
         updated_subtask = subtask_ref.get()
@@ -418,25 +508,37 @@ class SubtaskService:
         if not existing_subtask:
             return False, "Subtask not found"
         
-        subtask_ref.delete()
+        self.root_ref.update({
+            f"subtasks/{subtask_id}": None,
+            **self.index_paths(subtask_id, existing_subtask, present=False),
+            **self.activation_sweeper.queue_paths(subtask_id, None),
+            **tombstone_paths("deletedSubtasks", self.deleted_subtasks_ref, subtask_id)
+        })
         return True, None
     
-    def get_subtasks_by_task(self, task_id):
-        all_subtasks = self.subtasks_ref.get() or {}
-        now = current_timestamp()
-        
-        filtered = []
-        for subtask_data in all_subtasks.values():
-            if subtask_data.get("taskId") == task_id:
-                start_date = subtask_data.get("start_date")
-                if start_date is not None:
-                    if now >= start_date:
-                        if not subtask_data.get("active", False):
-                            self.subtasks_ref.child(subtask_data['subTaskId']).update({"active": True})
-                        subtask_data["active"] = True
-                    else:
-                        subtask_data["active"] = False
-                
-                filtered.append(Subtask.from_dict(subtask_data))
-        
-        return filtered
\ No newline at end of file
+    def query_subtasks_by_task(self, task_id):
+        """Fetch the raw subtask records of one task with an indexed taskId query"""
+        try:
+            return self.subtasks_ref.order_by_child("taskId").equal_to(task_id).get() or {}
+        except Exception as e:
+            # Engines without query support, or a database missing the .indexOn rule
+            logger.warning(f"Indexed taskId query failed, falling back to a full scan: {str(e)}")
+            all_subtasks = self.subtasks_ref.get() or {}
+            return {
+                subtask_id: subtask_data for subtask_id, subtask_data in all_subtasks.items()
+                if subtask_data.get("taskId") == task_id
+            }
+
+    def get_subtasks_by_task(self, task_id, wire=False):
+        """Get all subtasks of a task (as wire dicts when wire is set)"""
+        if self.index_state.ready():
+            subtask_ids = self.subtasks_by_task_ref.child(task_id).get(shallow=True) or {}
+            task_subtasks = get_many(self.subtasks_ref, subtask_ids)
+        else:
+            task_subtasks = self.query_subtasks_by_task(task_id)
+        task_subtasks = {
+            subtask_id: subtask_data for subtask_id, subtask_data in task_subtasks.items()
+            if subtask_data.get("taskId") == task_id
+        }
+        convert = Subtask.project if wire else Subtask.from_dict
+        return [convert(subtask_data) for subtask_data in task_subtasks.values()]
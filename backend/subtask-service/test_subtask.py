@@ -1,4 +1,5 @@
 # backend/subtask-service/test_subtask.py
+import dataclasses
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import sys
@@ -23,6 +24,7 @@ firebase_admin_patcher.start()
 
 from subtask_service import SubtaskService
 from models import Subtask, CreateSubtaskRequest, UpdateSubtaskRequest
+from shared import clear_caches
 
 
 @pytest.fixture(autouse=True)
@@ -34,6 +36,13 @@ def mock_firebase():
                 yield
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty read-through caches."""
+    clear_caches()
+    yield
+
+
 @pytest.fixture
 def mock_db():
     """Mock database references"""
@@ -103,8 +112,10 @@ class TestSubtaskServiceStartedAt:
             assert subtask.status == "unassigned"
             assert subtask.started_at is None
             
-            # Verify the data sent to Firebase
-            call_args = mock_new_ref.set.call_args[0][0]
+            # Verify the data sent to Firebase (root multi-path update with the index entry)
+            written = mock_tasks.update.call_args[0][0]
+            assert written["subtasksByTask/t1/test-subtask-id"] is True
+            call_args = written["subtasks/test-subtask-id"]
             assert call_args["status"] == "unassigned"
             assert call_args["startedAt"] is None
     
@@ -173,8 +184,10 @@ class TestSubtaskServiceStartedAt:
             assert subtask.status == "ongoing"
             assert subtask.started_at == current_time
             
-            # Verify the data sent to Firebase
-            call_args = mock_new_ref.set.call_args[0][0]
+            # Verify the data sent to Firebase (root multi-path update with the index entry)
+            written = mock_tasks.update.call_args[0][0]
+            assert written["subtasksByTask/t1/test-subtask-id"] is True
+            call_args = written["subtasks/test-subtask-id"]
             assert call_args["status"] == "ongoing"
             assert call_args["startedAt"] == current_time
     
@@ -488,8 +501,10 @@ class TestSubtaskServiceCompletedAt:
             assert error is None
             assert subtask.completed_at is None
             
-            # Verify the data sent to Firebase
-            call_args = mock_new_ref.set.call_args[0][0]
+            # Verify the data sent to Firebase (root multi-path update with the index entry)
+            written = mock_tasks.update.call_args[0][0]
+            assert written["subtasksByTask/t1/test-subtask-id"] is True
+            call_args = written["subtasks/test-subtask-id"]
             assert call_args["completedAt"] is None
 
 
@@ -662,13 +677,39 @@ class TestSubtaskEndpoints:
     @patch('app.subtask_service.get_all_subtasks')
     def test_get_all_subtasks_endpoint(self, mock_get, client, sample_subtask):
         """Test GET /subtasks"""
-        mock_get.return_value = [sample_subtask]
+        mock_get.return_value = [sample_subtask.to_dict()]
 
         response = client.get('/subtasks')
         assert response.status_code == 200
         data = response.get_json()
         assert len(data['subtasks']) == 1
 
+    @patch('app.subtask_service.get_subtasks_by_task')
+    def test_get_subtasks_by_task_etag(self, mock_get, client, sample_subtask):
+        """Test GET /subtasks/task/<id> answers 304 while the subtasks are unchanged"""
+        mock_get.return_value = [sample_subtask.to_dict()]
+
+        etag = client.get('/subtasks/task/t1').headers['ETag']
+        response = client.get('/subtasks/task/t1', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+    @patch('app.subtask_service.get_subtask_changes')
+    def test_get_subtask_changes_endpoint(self, mock_changes, client, sample_subtask):
+        """Test GET /subtasks/changes"""
+        from shared import current_timestamp
+        mock_changes.return_value = ([sample_subtask], ["st9"])
+        since = current_timestamp() - 60
+
+        response = client.get(f'/subtasks/changes?since={since}')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert len(data['subtasks']) == 1
+        assert data['deleted'] == ["st9"]
+        assert data['watermark'] >= since + 60
+        assert client.get('/subtasks/changes').status_code == 400
+        assert client.get('/subtasks/changes?since=0').status_code == 410
+
     @patch('app.subtask_service.get_subtask_by_id')
     def test_get_subtask_by_id_endpoint(self, mock_get, client, sample_subtask):
         """Test GET /subtasks/<id>"""
@@ -692,7 +733,7 @@ class TestSubtaskEndpoints:
     def test_update_subtask_endpoint(self, mock_get, mock_update, client, sample_subtask):
         """Test PUT /subtasks/<id>"""
         from models import Subtask
-        updated_subtask = Subtask(**{**sample_subtask.__dict__, 'title': 'Updated Subtask'})
+        updated_subtask = dataclasses.replace(sample_subtask, title='Updated Subtask')
         mock_get.return_value = (sample_subtask, None)
         mock_update.return_value = (updated_subtask, None)
 
@@ -741,7 +782,7 @@ class TestSubtaskEndpoints:
     @patch('app.subtask_service.get_subtasks_by_task')
     def test_get_subtasks_by_task_endpoint(self, mock_get, client, sample_subtask):
         """Test GET /subtasks/task/<id>"""
-        mock_get.return_value = [sample_subtask]
+        mock_get.return_value = [sample_subtask.to_dict()]
 
         response = client.get('/subtasks/task/t1')
         assert response.status_code == 200
@@ -905,6 +946,34 @@ class TestSubtaskEndpoints:
 class TestSubtaskServiceAdditionalMethods:
     """Test additional SubtaskService methods for better coverage"""
 
+    def test_subtask_projection_matches_model(self):
+        """Test Subtask.project returns what to_dict returns, defaults included"""
+        full = {"subTaskId": "st1", "taskId": "t1", "title": "S", "creatorId": "u1", "deadline": 1800000000,
+                "collaborators": ["u2"], "start_date": 1700000000, "active": False, "completedAt": 5}
+        for record in (full, {"subTaskId": "st2"}):
+            assert Subtask.project(record) == Subtask.from_dict(record).to_dict()
+
+    def test_task_title_cache_follows_renames(self, mock_db):
+        """Test with CACHE_WATCH_CHANGES a renamed task is not served from the title cache"""
+        from shared.memory_db import MemoryDatabase
+        from shared.cache import _watchers
+        database = MemoryDatabase()
+        database.reference("tasks/t1").set({"title": "Old title"})
+        mock_db.side_effect = database.reference
+
+        with patch.dict(os.environ, {"CACHE_WATCH_CHANGES": "true"}):
+            service = SubtaskService()
+        try:
+            assert service.get_task_title("t1") == "Old title"
+            database.reference("tasks/t1/title").set("New title")
+            assert service.get_task_title("t1") == "New title"
+            database.reference("tasks/t2").set({"status": "ongoing"})
+            assert service.get_task_title("t2") == "Untitled Task"
+            assert service.get_task_title("missing") is None
+        finally:
+            for name in ("users", "notificationPreferences", "taskTitles"):
+                _watchers.pop(name).close()
+
     @patch('subtask_service.current_timestamp')
     def test_calculate_new_start_date_daily(self, mock_timestamp, mock_db):
         """Test calculate_new_start_date for daily schedule"""
@@ -1147,6 +1216,160 @@ class TestSubtaskServiceAdditionalMethods:
         assert service.validate_status("invalid") == False
         assert service.validate_status("") == False
 
+    def test_get_subtasks_by_task_uses_index_tree(self, mock_db):
+        """Test subtasks of a task are read via subtasksByTask, not a full read"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={
+            "subtasks": {
+                "st1": {"subTaskId": "st1", "taskId": "t1", "title": "A", "creatorId": "u1", "deadline": 1800000000},
+                "st2": {"subTaskId": "st2", "taskId": "t2", "title": "B", "creatorId": "u1", "deadline": 1800000000},
+            },
+            "subtasksByTask": {"t1": {"st1": True}, "t2": {"st2": True}},
+            "indexState": {"subtasks": {"builtAt": 1700000000}},
+        })
+        mock_db.side_effect = database.reference
+        service = SubtaskService()
+        service.get_subtasks_by_task("t2")
+        database.stats.reset()
+
+        subtasks = service.get_subtasks_by_task("t1")
+
+        assert [subtask.subtask_id for subtask in subtasks] == ["st1"]
+        assert database.stats.calls == {"get": 2}
+
+    def test_get_subtasks_by_task_queries_until_backfilled(self, mock_db):
+        """Test a partly built subtasksByTask is not trusted until rebuild_indexes has backfilled it"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={
+            "subtasks": {
+                "st1": {"subTaskId": "st1", "taskId": "t1", "title": "A", "creatorId": "u1", "deadline": 1800000000},
+                "st2": {"subTaskId": "st2", "taskId": "t2", "title": "B", "creatorId": "u1", "deadline": 1800000000},
+                "st3": {"subTaskId": "st3", "taskId": "t1", "title": "C", "creatorId": "u1", "deadline": 1800000000},
+            },
+            # st3 was written before the index existed
+            "subtasksByTask": {"t1": {"st1": True}, "t2": {"st2": True}},
+        })
+        mock_db.side_effect = database.reference
+        service = SubtaskService()
+
+        subtasks = service.get_subtasks_by_task("t1")
+        assert sorted(subtask.subtask_id for subtask in subtasks) == ["st1", "st3"]
+        assert database.stats.calls == {"get": 1, "query": 1}
+
+        assert service.rebuild_indexes() == 3
+        assert database.dump()["subtasksByTask"]["t1"] == {"st1": True, "st3": True}
+        database.stats.reset()
+        subtasks = SubtaskService().get_subtasks_by_task("t1")
+        assert sorted(subtask.subtask_id for subtask in subtasks) == ["st1", "st3"]
+        assert "query" not in database.stats.calls
+
+    def test_get_subtasks_by_task_falls_back_to_scan(self, mock_db):
+        """Test engines rejecting the indexed query fall back to a filtered scan"""
+        mock_subtasks_ref = Mock()
+        mock_subtasks_ref.order_by_child.side_effect = Exception("Index not defined")
+        mock_subtasks_ref.get.return_value = {
+            "st1": {"subTaskId": "st1", "taskId": "t1", "title": "A"},
+            "st2": {"subTaskId": "st2", "taskId": "t2", "title": "B"},
+        }
+        mock_index_ref = Mock()
+        mock_index_ref.child.return_value.get.return_value = None
+        mock_state_ref = Mock()
+        mock_state_ref.get.return_value = None
+        refs = {"subtasks": mock_subtasks_ref, "subtasksByTask": mock_index_ref, "indexState/subtasks": mock_state_ref}
+        mock_db.side_effect = lambda arg: refs.get(arg, Mock())
+
+        subtasks = SubtaskService().get_subtasks_by_task("t1")
+
+        assert [subtask.subtask_id for subtask in subtasks] == ["st1"]
+
+    def test_activation_sweeper_activates_subtasks_at_start_date(self, mock_db):
+        """Test reads are pure and the sweeper activates subtasks in batches when their start date passes"""
+        from shared.memory_db import MemoryDatabase
+
+        now = 1700000000
+        database = MemoryDatabase(data={"subtasks": {
+            f"st{i}": {"subTaskId": f"st{i}", "taskId": "t1", "title": f"S{i}", "creatorId": "u1",
+                       "deadline": now + 86400, "start_date": now - 60 if i < 3 else now + 60, "active": False}
+            for i in range(4)
+        }})
+        mock_db.side_effect = database.reference
+
+        service = SubtaskService()
+        assert [subtask.active for subtask in service.get_all_subtasks()] == [False] * 4
+        assert database.stats.calls == {"get": 1}
+
+        sweeper = service.activation_sweeper
+        with patch('subtask_service.current_timestamp', return_value=now), \
+             patch('shared.activation.current_timestamp', return_value=now):
+            assert sweeper.sync() == 3
+        assert database.dump()["pendingActivations"] == {"subtasks": {"st3": now + 60}}
+        assert sweeper.next_activation() == (now + 60, "st3")
+
+        with patch('subtask_service.current_timestamp', return_value=now + 60):
+            assert sweeper.activate_due(now + 60) == 1
+
+        assert [subtask.active for subtask in service.get_all_subtasks()] == [True] * 4
+        assert "pendingActivations" not in database.dump()
+        assert service.activations_flipped == 4
+
+    def test_get_subtasks_page(self, mock_db):
+        """Test subtasks are paged in key order with limit_to_first queries"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={"subtasks": {
+            f"st{i}": {"subTaskId": f"st{i}", "taskId": "t1", "title": f"S{i}", "creatorId": "u1",
+                       "deadline": 1800000000}
+            for i in range(5)
+        }})
+        mock_db.side_effect = database.reference
+
+        service = SubtaskService()
+        first, next_key = service.get_subtasks_page(3)
+        second, last_key = service.get_subtasks_page(3, next_key)
+
+        assert [subtask.subtask_id for subtask in first] == ["st0", "st1", "st2"]
+        assert [subtask.subtask_id for subtask in second] == ["st3", "st4"]
+        assert (next_key, last_key) == ("st3", None)
+        assert database.stats.calls == {"query": 2}
+
+    def test_get_subtask_changes(self, mock_db):
+        """Test deltas return subtasks updated since the watermark and tombstones of deleted ones"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={"subtasks": {
+            f"st{i}": {"subTaskId": f"st{i}", "taskId": "t1", "title": f"S{i}", "creatorId": "u1",
+                       "deadline": 1800000000, "updatedAt": 100 * (i + 1)}
+            for i in range(3)
+        }})
+        mock_db.side_effect = database.reference
+        service = SubtaskService()
+
+        with patch('shared.changes.current_timestamp', return_value=250):
+            service.delete_subtask("st0")
+
+        subtasks, deleted = service.get_subtask_changes(200)
+        assert sorted(subtask.subtask_id for subtask in subtasks) == ["st1", "st2"]
+        assert deleted == ["st0"]
+
+    def test_create_and_delete_maintain_index_tree(self, mock_db):
+        """Test subtasksByTask is written and cleared together with the subtask record"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={"tasks": {"t1": {"taskId": "t1", "title": "Parent"}}})
+        mock_db.side_effect = database.reference
+
+        service = SubtaskService()
+        subtask, error = service.create_subtask(CreateSubtaskRequest(
+            title="Child", creator_id="u1", deadline=1800000000, task_id="t1"
+        ))
+        assert error is None
+        assert database.dump()["subtasksByTask"] == {"t1": {subtask.subtask_id: True}}
+
+        success, error = service.delete_subtask(subtask.subtask_id)
+        assert success is True
+        assert set(database.dump()) == {"tasks", "deletedSubtasks"}
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
@@ -5,13 +5,14 @@ import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from shared import init_firebase, validate_epoch_timestamp
+from shared import init_firebase, validate_epoch_timestamp, cache_stats, parse_page_args, encode_cursor, parse_since, is_expired, current_timestamp, with_etag, init_responses
 
 from task_service import TaskService
 from models import CreateTaskRequest, UpdateTaskRequest
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Watermark"])
+init_responses(app)
 
 # Initialize Firebase
 init_firebase()
@@ -54,10 +55,37 @@ def create_task():
     return jsonify(message="Task created successfully", task=task.to_dict()), 201
 
 @app.route("/tasks", methods=["GET"])
+@with_etag
 def get_all_tasks():
-    """Get all active tasks"""
-    tasks = task_service.get_all_tasks()
-    return jsonify(tasks=[t.to_dict() for t in tasks]), 200
+    """Get all active tasks, or one page of them when limit/cursor are given"""
+    limit, start_key, error = parse_page_args(request.args)
+    if error:
+        return jsonify(error=error), 400
+
+    if limit is None:
+        # Clients pass the watermark to /tasks/changes to fetch only later changes. It is
+        # sent as a header so the body, and therefore the ETag, only changes with the tasks.
+        watermark = current_timestamp()
+        tasks = task_service.get_all_tasks(wire=True)
+        return jsonify(tasks=tasks), 200, {"X-Watermark": str(watermark)}
+
+    tasks, next_key = task_service.get_tasks_page(limit, start_key)
+    return jsonify(tasks=[t.to_dict() for t in tasks], nextCursor=encode_cursor(next_key)), 200
+
+@app.route("/tasks/changes", methods=["GET"])
+def get_task_changes():
+    """Get active tasks updated at or after since, plus the IDs deleted or deactivated since"""
+    since, error = parse_since(request.args)
+    if error:
+        return jsonify(error=error), 400
+
+    # Taken before reading so writes that race with this request show up in the next poll
+    watermark = current_timestamp()
+    if is_expired(since, watermark):
+        return jsonify(error="since is older than the tombstone retention; reload the full list"), 410
+
+    tasks, deleted = task_service.get_task_changes(since)
+    return jsonify(tasks=[t.to_dict() for t in tasks], deleted=deleted, watermark=watermark), 200
 
 @app.route("/tasks/<task_id>", methods=["GET"])
 def get_task_by_id(task_id):
@@ -119,14 +147,35 @@ def delete_task_by_id(task_id):
 
 @app.route("/tasks/project/<project_id>", methods=["GET"])
 def get_tasks_by_project(project_id):
-    """Get all active tasks by project ID"""
-    tasks = task_service.get_tasks_by_project(project_id)
+    """Get all active tasks by project ID, or one page of them when limit/cursor are given"""
+    limit, start_key, error = parse_page_args(request.args)
+    if error:
+        return jsonify(error=error), 400
+
+    if limit is None:
+        tasks = task_service.get_tasks_by_project(project_id, wire=True)
+        return jsonify(tasks=tasks), 200
+
+    tasks, next_key = task_service.get_tasks_by_project_page(project_id, limit, start_key)
+    return jsonify(tasks=[t.to_dict() for t in tasks], nextCursor=encode_cursor(next_key)), 200
+
+@app.route("/tasks/user/<user_id>", methods=["GET"])
+def get_tasks_by_user(user_id):
+    """Get all active tasks a user created, owns or collaborates on"""
+    tasks = task_service.get_tasks_by_user(user_id)
     return jsonify(tasks=[t.to_dict() for t in tasks]), 200
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(status="healthy", service="task-service"), 200
+    return jsonify(
+        status="healthy",
+        service="task-service",
+        cache=cache_stats()
+    ), 200
 
 if __name__ == '__main__':
+    # Served by gunicorn, the sweeper runs in its own process (python activator.py)
+    task_service.activation_sweeper.start()
+
     app.run(host='0.0.0.0', port=6002, debug=True)
\ No newline at end of file
@@ -0,0 +1,19 @@
+# backend/task-service/rebuild_indexes.py
+"""Rebuild the tasksByProject and tasksByUser index trees from the tasks tree.
+
+Run once after deploying the index trees: until it has recorded
+indexState/tasks, reads use the indexed query instead of the trees. Safe to
+run again if the trees are suspected to be missing entries:  python rebuild_indexes.py
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared import init_firebase
+
+from task_service import TaskService
+
+if __name__ == '__main__':
+    init_firebase()
+    count = TaskService().rebuild_indexes()
+    print(f"Backfilled tasksByProject and tasksByUser for {count} tasks")
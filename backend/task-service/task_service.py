@@ -8,7 +8,7 @@ from datetime import datetime, timezone, timedelta
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from shared import get_db_reference, current_timestamp, validate_epoch_timestamp
+from shared import get_db_reference, get_cache, get_many, IndexState, fetch_page, fetch_changed, tombstone_paths, ActivationSweeper, watch_for_changes, current_timestamp, validate_epoch_timestamp
 from models import Task, CreateTaskRequest, UpdateTaskRequest
 
 logger = logging.getLogger(__name__)
@@ -17,10 +17,25 @@ class TaskService:
     """Service for managing tasks"""
 
     def __init__(self):
+        self.root_ref = get_db_reference("/")
         self.tasks_ref = get_db_reference("tasks")
+        self.tasks_by_project_ref = get_db_reference("tasksByProject")
+        self.tasks_by_user_ref = get_db_reference("tasksByUser")
+        self.index_state = IndexState("tasks", get_db_reference("indexState/tasks"))
+        self.deleted_tasks_ref = get_db_reference("deletedTasks")
+        self.activations_flipped = 0
+        self.activation_sweeper = ActivationSweeper(
+            "tasks", self.tasks_ref, get_db_reference("pendingActivations/tasks"),
+            self.activation_time, self.refresh_active_flags,
+            lease_ref=get_db_reference("schedulerJobs/tasks_activation")
+        )
         self.subtasks_ref = get_db_reference("subtasks")
         self.users_ref = get_db_reference("users")
         self.notification_prefs_ref = get_db_reference("notificationPreferences")
+        self.user_cache = get_cache("users")
+        self.prefs_cache = get_cache("notificationPreferences")
+        watch_for_changes("users", self.users_ref)
+        watch_for_changes("notificationPreferences", self.notification_prefs_ref)
         self.notification_service_url = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:6004")
     
     def validate_status(self, status):
@@ -28,6 +43,61 @@ class TaskService:
         allowed_statuses = ["ongoing", "unassigned", "under review", "completed"]
         return status.lower() in [s.lower() for s in allowed_statuses]
 
+    def task_members(self, task_data):
+        """User IDs a task is listed under in tasksByUser (creator, owner and collaborators)"""
+        members = {task_data.get("creatorId"), task_data.get("ownerId")}
+        members.update(task_data.get("collaborators") or [])
+        return {user_id for user_id in members if user_id}
+
+    def index_paths(self, task_id, task_data, present=True):
+        """Multi-path update entries adding (or removing) a task in the tasksByProject and tasksByUser trees"""
+        value = True if present else None
+        paths = {}
+        if task_data.get("projectId"):
+            paths[f"tasksByProject/{task_data['projectId']}/{task_id}"] = value
+        for user_id in self.task_members(task_data):
+            paths[f"tasksByUser/{user_id}/{task_id}"] = value
+        return paths
+
+    def index_changes(self, task_id, old_task, new_task):
+        """Index entries to add and remove when a task changes from old_task to new_task"""
+        removed = self.index_paths(task_id, old_task, present=False)
+        added = self.index_paths(task_id, new_task)
+        changes = {path: value for path, value in removed.items() if path not in added}
+        changes.update({path: value for path, value in added.items() if path not in removed})
+        return changes
+
+    def save_new_task(self, task_id, task_data):
+        """Write a new task, its index entries and its activation queue entry in one atomic multi-path update"""
+        self.root_ref.update({
+            f"tasks/{task_id}": task_data,
+            **self.index_paths(task_id, task_data),
+            **self.activation_sweeper.queue_paths(task_id, task_data)
+        })
+
+    def fetch_indexed_tasks(self, index_ref):
+        """Fetch the task records listed under an index tree node"""
+        task_ids = index_ref.get(shallow=True) or {}
+        return get_many(self.tasks_ref, task_ids)
+
+    def rebuild_indexes(self):
+        """Backfill the tasksByProject and tasksByUser trees from the tasks tree and mark them complete"""
+        all_tasks = self.tasks_ref.get() or {}
+        paths = {}
+        for task_id, task_data in all_tasks.items():
+            paths.update(self.index_paths(task_id, task_data))
+
+        self.index_state.backfill(self.root_ref, paths)
+        return len(all_tasks)
+
+    def get_user(self, user_id):
+        """Get a user record, served from the process-wide cache when fresh"""
+        return self.user_cache.get_or_load(user_id, lambda: self.users_ref.child(user_id).get())
+
+    def get_notification_preferences(self, user_id):
+        """Get a user's notification preferences, served from the process-wide cache when fresh"""
+        return self.prefs_cache.get_or_load(user_id, lambda: self.notification_prefs_ref.child(user_id).get())
+
     def send_task_update_notification(self, task_id, task_title, old_status, new_status, owner_id, collaborators):
         """Send task status update notifications to owner and collaborators"""
         try:
@@ -40,11 +110,11 @@ class TaskService:
             for user_id in user_ids:
                 try:
                     # Get user email
-                    user_data = self.users_ref.child(user_id).get()
+                    user_data = self.get_user(user_id)
                     user_email = user_data.get('email') if user_data else None
 
                     # Get user preferences
-                    prefs = self.notification_prefs_ref.child(user_id).get()
+                    prefs = self.get_notification_preferences(user_id)
                     if prefs:
                         # Check if task update reminders are enabled
                         if prefs.get('taskUpdateReminders', True):
@@ -61,7 +131,7 @@ class TaskService:
                 except Exception as e:
                     logger.error(f"Failed to fetch preferences for user {user_id}: {str(e)}")
                     # Default to sending notification
-                    user_data = self.users_ref.child(user_id).get()
+                    user_data = self.get_user(user_id)
                     user_email = user_data.get('email') if user_data else None
                     user_preferences[user_id] = {
                         'email': user_email,
@@ -118,6 +188,14 @@ class TaskService:
         
         return start_dt <= current_dt
     
+    def activation_time(self, task_data):
+        """Epoch at which a task becomes active (midnight UTC of its start date), or None"""
+        start_date = task_data.get("start_date")
+        if start_date is None:
+            return None
+        start_day = datetime.fromtimestamp(start_date, tz=timezone.utc).date()
+        return calendar.timegm(start_day.timetuple())
+    
     def calculate_new_start_date(self, old_start_date, schedule, custom_schedule=None, completion_time=None):
         """Calculate the next start date based on schedule type"""
         now = current_timestamp()
@@ -224,7 +302,7 @@ class TaskService:
             "startedAt": new_started_at
         }
         
-        new_task_ref.set(new_task_data)
+        self.save_new_task(new_task_ref.key, new_task_data)
         return Task.from_dict(new_task_data)
     
     def create_task(self, req: CreateTaskRequest):
@@ -248,6 +326,8 @@ class TaskService:
             initial_status = "unassigned"
             started_at = None
         
+        start_date = req.start_date if req.start_date else current_time
+
         task_data = {
             "taskId": new_task_ref.key,
             "title": req.title,
@@ -262,8 +342,8 @@ class TaskService:
             "priority": req.priority,
             "createdAt": current_time,
             "updatedAt": current_time,
-            "start_date": req.start_date if req.start_date else current_time,
-            "active": req.active,
+            "start_date": start_date,
+            "active": self.should_task_be_active(start_date, current_time),
             "scheduled": req.scheduled,
             "schedule": req.schedule,
             "custom_schedule": req.custom_schedule,
@@ -271,31 +351,67 @@ class TaskService:
             "startedAt": started_at
         }
         
-        new_task_ref.set(task_data)
+        self.save_new_task(new_task_ref.key, task_data)
         return Task.from_dict(task_data), None
     
-    def get_all_tasks(self):
-        """Get all active tasks"""
-        all_tasks = self.tasks_ref.get() or {}
-        now = current_timestamp()
-        active_tasks = []
-        
-        for task_data in all_tasks.values():
+    def refresh_active_flags(self, tasks_data, now=None):
+        """Recompute the active flag of each task from its start date.
+
+        Every flag that changed is persisted in a single multi-path update on
+        the root reference, bumping updatedAt so delta polls pick it up.
+        Returns the number of flags flipped.
+        """
+        now = now if now is not None else current_timestamp()
+        flips = {}
+        flipped = 0
+        for task_data in tasks_data.values():
             start_date = task_data.get("start_date")
-            if start_date is not None:
-                should_be_active = self.should_task_be_active(start_date, now)
-                
-                if should_be_active != task_data.get("active", False):
-                    self.tasks_ref.child(task_data['taskId']).update({"active": should_be_active})
-                
-                task_data["active"] = should_be_active
-                
-                if should_be_active:
-                    active_tasks.append(Task.from_dict(task_data))
-            elif task_data.get("active", False):
-                active_tasks.append(Task.from_dict(task_data))
-        
-        return active_tasks
+            if start_date is None:
+                continue
+            should_be_active = self.should_task_be_active(start_date, now)
+            if should_be_active != task_data.get("active", False):
+                flips[f"tasks/{task_data['taskId']}/active"] = should_be_active
+                flips[f"tasks/{task_data['taskId']}/updatedAt"] = now
+                task_data["updatedAt"] = now
+                flipped += 1
+            task_data["active"] = should_be_active
+
+        if flips:
+            self.root_ref.update(flips)
+            self.activations_flipped += flipped
+            logger.info(f"Flipped the active flag of {flipped} tasks")
+        return flipped
+
+    def get_all_tasks(self, wire=False):
+        """Get all active tasks (as wire dicts, without building Task objects, when wire is set)"""
+        all_tasks = self.tasks_ref.get() or {}
+        convert = Task.project if wire else Task.from_dict
+        return [convert(task_data) for task_data in all_tasks.values() if task_data.get("active", False)]
+    
+    def get_tasks_page(self, limit, start_key=None):
+        """Get up to limit active tasks in key order, starting at start_key. Returns (tasks, next_key)"""
+        page, next_key = fetch_page(
+            self.tasks_ref, limit, start_key,
+            include=lambda task_data: task_data.get("active", False)
+        )
+        return [Task.from_dict(task_data) for task_data in page.values()], next_key
+    
+    def get_task_changes(self, since):
+        """Get tasks changed at or after since and the IDs to drop from a client's list.
+
+        Returns (active tasks updated since, IDs deleted or deactivated since).
+        """
+        changed = fetch_changed(self.tasks_ref, "updatedAt", since)
+        tasks = []
+        removed = []
+        for task_id, task_data in changed.items():
+            if task_data.get("active", False):
+                tasks.append(Task.from_dict(task_data))
+            else:
+                removed.append(task_id)
+        removed.extend(task_id for task_id in fetch_changed(self.deleted_tasks_ref, "deletedAt", since)
+                       if task_id not in changed)
+        return tasks, removed
     
     def get_task_by_id(self, task_id):
         """Get a task by ID"""
@@ -305,15 +421,6 @@ class TaskService:
         if not task_data:
             return None, "Task not found"
         
-        now = current_timestamp()
-        start_date = task_data.get("start_date")
-        
-        if start_date is not None:
-            should_be_active = self.should_task_be_active(start_date, now)
-            if should_be_active != task_data.get("active", False):
-                task_ref.update({"active": should_be_active})
-                task_data["active"] = should_be_active
-        
         return Task.from_dict(task_data), None
     
     def update_task(self, req: UpdateTaskRequest):
@@ -404,8 +511,24 @@ class TaskService:
         
         if len(update_data) == 1 and "updatedAt" in update_data:
             return None, "No valid fields provided for update"
-        
-        task_ref.update(update_data)
+
+        # The active flag follows the start date; the activation sweeper flips it when a future date arrives
+        if "start_date" in update_data or "active" in update_data:
+            start_date = update_data.get("start_date", existing_task.get("start_date"))
+            if start_date is not None:
+                update_data["active"] = self.should_task_be_active(start_date, current_time)
+        
+        merged_task = {**existing_task, **update_data}
+        index_updates = self.index_changes(req.task_id, existing_task, merged_task)
+        if "active" in update_data:
+            index_updates.update(self.activation_sweeper.queue_paths(req.task_id, merged_task))
+        if index_updates:
+            # Membership or start date changed: update the record, index trees and activation queue atomically
+            fan_out = {f"tasks/{req.task_id}/{field}": value for field, value in update_data.items()}
+            fan_out.update(index_updates)
+            self.root_ref.update(fan_out)
+        else:
+            task_ref.update(update_data)
 
         # Get updated task
         updated_task = task_ref.get()
@@ -437,29 +560,69 @@ class TaskService:
         if not existing_task:
             return False, "Task not found"
         
-        task_ref.delete()
+        self.root_ref.update({
+            f"tasks/{task_id}": None,
+            **self.index_paths(task_id, existing_task, present=False),
+            **self.activation_sweeper.queue_paths(task_id, None),
+            **tombstone_paths("deletedTasks", self.deleted_tasks_ref, task_id)
+        })
         return True, None
     
-    def get_tasks_by_project(self, project_id):
-        """Get all active tasks by project ID"""
-        all_tasks = self.tasks_ref.get() or {}
-        now = current_timestamp()
-        active_filtered_tasks = []
-        
-        for task_data in all_tasks.values():
-            if task_data.get("projectId") == project_id:
-                start_date = task_data.get("start_date")
-                if start_date is not None:
-                    should_be_active = self.should_task_be_active(start_date, now)
-                    
-                    if should_be_active != task_data.get("active", False):
-                        self.tasks_ref.child(task_data['taskId']).update({"active": should_be_active})
-                    
-                    task_data["active"] = should_be_active
-                    
-                    if should_be_active:
-                        active_filtered_tasks.append(Task.from_dict(task_data))
-                elif task_data.get("active", False):
-                    active_filtered_tasks.append(Task.from_dict(task_data))
-        
-        return active_filtered_tasks
+    def query_tasks_by_project(self, project_id):
+        """Fetch the raw task records of one project with an indexed projectId query"""
+        try:
+            return self.tasks_ref.order_by_child("projectId").equal_to(project_id).get() or {}
+        except Exception as e:
+            # Engines without query support, or a database missing the .indexOn rule
+            logger.warning(f"Indexed projectId query failed, falling back to a full scan: {str(e)}")
+            all_tasks = self.tasks_ref.get() or {}
+            return {
+                task_id: task_data for task_id, task_data in all_tasks.items()
+                if task_data.get("projectId") == project_id
+            }
+
+    def get_tasks_by_project(self, project_id, wire=False):
+        """Get all active tasks by project ID (as wire dicts when wire is set)"""
+        if self.index_state.ready():
+            project_tasks = self.fetch_indexed_tasks(self.tasks_by_project_ref.child(project_id))
+        else:
+            project_tasks = self.query_tasks_by_project(project_id)
+        project_tasks = {
+            task_id: task_data for task_id, task_data in project_tasks.items()
+            if task_data.get("projectId") == project_id
+        }
+        convert = Task.project if wire else Task.from_dict
+        return [convert(task_data) for task_data in project_tasks.values() if task_data.get("active", False)]
+
+    def get_tasks_by_user(self, user_id):
+        """Get all active tasks a user created, owns or collaborates on"""
+        if self.index_state.ready():
+            user_tasks = self.fetch_indexed_tasks(self.tasks_by_user_ref.child(user_id))
+        else:
+            user_tasks = self.tasks_ref.get() or {}
+        user_tasks = {
+            task_id: task_data for task_id, task_data in user_tasks.items()
+            if user_id in self.task_members(task_data)
+        }
+        return [Task.from_dict(task_data) for task_data in user_tasks.values() if task_data.get("active", False)]
+
+    def get_tasks_by_project_page(self, project_id, limit, start_key=None):
+        """Get up to limit active tasks of a project in key order, starting at start_key. Returns (tasks, next_key)"""
+        def is_active_in_project(task_data):
+            return task_data.get("projectId") == project_id and task_data.get("active", False)
+
+        if self.index_state.ready():
+            page, next_key = fetch_page(
+                self.tasks_by_project_ref.child(project_id), limit, start_key,
+                resolve=lambda batch: get_many(self.tasks_ref, batch),
+                include=is_active_in_project
+            )
+        else:
+            # Index not backfilled yet: page through the indexed query result instead
+            project_tasks = self.query_tasks_by_project(project_id)
+            task_ids = sorted(task_id for task_id, task_data in project_tasks.items()
+                              if is_active_in_project(task_data) and (start_key is None or task_id >= start_key))
+            next_key = task_ids[limit] if len(task_ids) > limit else None
+            page = {task_id: project_tasks[task_id] for task_id in task_ids[:limit]}
+
+        return [Task.from_dict(task_data) for task_data in page.values()], next_key
@@ -1,4 +1,5 @@
 # backend/task-service/test_task.py
+import dataclasses
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import sys
@@ -21,6 +22,7 @@ firebase_admin_patcher.start()
 
 from task_service import TaskService
 from models import Task, CreateTaskRequest, UpdateTaskRequest
+from shared import clear_caches
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -39,6 +41,13 @@ def mock_firebase():
                 yield
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty read-through caches."""
+    clear_caches()
+    yield
+
+
 @pytest.fixture
 def mock_db():
     """Mock database references."""
@@ -100,7 +109,9 @@ class TestTaskServiceStartedAt:
             assert err is None
             assert task.status == "unassigned"
             assert task.started_at is None
-            assert mock_new_ref.set.called
+            written = mock_subtasks.update.call_args[0][0]
+            assert written["tasks/test-task-id"]["status"] == "unassigned"
+            assert written["tasksByUser/u1/test-task-id"] is True
 
     def test_create_task_owner_differs(self, mock_db):
         """Test creating task where owner differs from creator - status should be ongoing, startedAt should be set."""
@@ -212,12 +223,32 @@ class TestTaskEndpoints:
     @patch('app.task_service.get_all_tasks')
     def test_get_all_tasks_endpoint(self, mock_get, client, sample_task):
         """Test GET /tasks"""
-        mock_get.return_value = [sample_task]
+        mock_get.return_value = [sample_task.to_dict()]
 
         response = client.get('/tasks')
         assert response.status_code == 200
         data = response.get_json()
         assert len(data['tasks']) == 1
+        assert int(response.headers['X-Watermark']) > 0
+        mock_get.assert_called_once_with(wire=True)
+
+    @patch('app.task_service.get_all_tasks')
+    def test_get_all_tasks_etag(self, mock_get, client, sample_task):
+        """Test GET /tasks answers 304 while the tasks are unchanged, whatever the watermark"""
+        mock_get.return_value = [sample_task.to_dict()]
+
+        response = client.get('/tasks')
+        etag = response.headers['ETag']
+
+        with patch('app.current_timestamp', return_value=2000000000):
+            response = client.get('/tasks', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['X-Watermark'] == "2000000000"
+
+        mock_get.return_value = [dict(sample_task.to_dict(), title="Renamed")]
+        response = client.get('/tasks', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert client.get('/tasks?limit=0', headers={'If-None-Match': etag}).status_code == 400
 
     @patch('app.task_service.get_task_by_id')
     def test_get_task_by_id_endpoint(self, mock_get, client, sample_task):
@@ -241,7 +272,7 @@ class TestTaskEndpoints:
     @patch('app.task_service.get_task_by_id')
     def test_update_task_endpoint(self, mock_get, mock_update, client, sample_task):
         """Test PUT /tasks/<id>"""
-        updated_task = Task(**{**sample_task.__dict__, 'title': 'Updated Task'})
+        updated_task = dataclasses.replace(sample_task, title='Updated Task')
         mock_get.return_value = (sample_task, None)
         mock_update.return_value = (updated_task, None)
 
@@ -303,7 +334,7 @@ class TestTaskEndpoints:
     @patch('app.task_service.get_tasks_by_project')
     def test_get_tasks_by_project_endpoint(self, mock_get, client, sample_task):
         """Test GET /tasks/project/<id>"""
-        mock_get.return_value = [sample_task]
+        mock_get.return_value = [sample_task.to_dict()]
 
         response = client.get('/tasks/project/p1')
         assert response.status_code == 200
@@ -311,6 +342,121 @@ class TestTaskEndpoints:
         assert len(data['tasks']) == 1
         assert data['tasks'][0]['projectId'] == "p1"
 
+    @patch('app.task_service.get_tasks_page')
+    def test_get_all_tasks_paginated_endpoint(self, mock_page, client, sample_task):
+        """Test GET /tasks?limit=&cursor= returns a page and an opaque nextCursor"""
+        from shared import encode_cursor
+        mock_page.return_value = ([sample_task], "t2")
+
+        response = client.get('/tasks?limit=1')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert len(data['tasks']) == 1
+        assert data['nextCursor'] == encode_cursor("t2")
+        mock_page.assert_called_with(1, None)
+
+        mock_page.return_value = ([sample_task], None)
+        response = client.get(f"/tasks?limit=1&cursor={data['nextCursor']}")
+        assert response.get_json()['nextCursor'] is None
+        mock_page.assert_called_with(1, "t2")
+
+    def test_get_all_tasks_invalid_page_args(self, client):
+        """Test GET /tasks rejects a bad limit or cursor"""
+        assert client.get('/tasks?limit=0').status_code == 400
+        assert client.get('/tasks?limit=abc').status_code == 400
+        response = client.get('/tasks?cursor=not-a-cursor!')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == "Invalid cursor"
+
+    @patch('app.task_service.get_all_tasks')
+    def test_get_all_tasks_gzip(self, mock_get, client, sample_task):
+        """Test large responses are gzipped for clients that accept it and keep a weak ETag"""
+        import gzip
+        mock_get.return_value = [sample_task.to_dict()] * 50
+
+        plain = client.get('/tasks')
+        response = client.get('/tasks', headers={'Accept-Encoding': 'gzip'})
+        assert plain.headers.get('Content-Encoding') is None
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert len(response.data) < len(plain.data)
+
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+        response = client.get('/tasks', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+
+    @patch('app.task_service.get_task_by_id')
+    def test_small_responses_not_compressed(self, mock_get, client, sample_task):
+        """Test bodies under COMPRESS_MIN_BYTES are sent as is"""
+        mock_get.return_value = (sample_task, None)
+
+        response = client.get('/tasks/t1', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding') is None
+        assert response.get_json()['task']['taskId'] == sample_task.task_id
+
+    def test_json_provider_matches_stdlib_output(self, client):
+        """Test the fast JSON provider emits the same document as the stdlib encoder"""
+        import json
+        from datetime import datetime, timezone
+        from app import app
+        payload = {"b": [1, 2.5, None, True], "a": {"é": "ü", 3: "x"}, "when": datetime(2025, 1, 2, tzinfo=timezone.utc)}
+
+        with app.app_context():
+            assert json.loads(app.json.dumps(payload)) == json.loads(json.dumps(payload, default=app.json.default))
+            assert list(json.loads(app.json.dumps(payload))) == ["a", "b", "when"]
+            assert app.json.dumps(2 ** 70) == str(2 ** 70)
+            assert app.json.loads(b'{"x": [1, 2]}') == {"x": [1, 2]}
+
+    def test_worker_jobs_start_once_per_process(self):
+        """Test serving processes leave the activation sweeper to activator.py and jobs start only once"""
+        from flask import Flask
+        from shared import on_worker_start, start_worker_jobs
+        from app import app, task_service
+
+        assert task_service.activation_sweeper.start not in app.extensions.get("worker_jobs", [])
+
+        worker_app = Flask(__name__)
+        job = Mock()
+        on_worker_start(worker_app, job)
+        assert start_worker_jobs(worker_app) == 1
+        assert start_worker_jobs(worker_app) == 0
+        job.assert_called_once_with()
+
+    @patch('app.task_service.get_task_changes')
+    def test_get_task_changes_endpoint(self, mock_changes, client, sample_task):
+        """Test GET /tasks/changes returns changed tasks, removed IDs and a new watermark"""
+        from shared import current_timestamp
+        mock_changes.return_value = ([sample_task], ["t9"])
+        since = current_timestamp() - 60
+
+        response = client.get(f'/tasks/changes?since={since}')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert len(data['tasks']) == 1
+        assert data['deleted'] == ["t9"]
+        assert data['watermark'] >= since + 60
+        mock_changes.assert_called_once_with(since)
+
+    def test_get_task_changes_invalid_since(self, client):
+        """Test GET /tasks/changes rejects a missing or bad since, and one past tombstone retention"""
+        assert client.get('/tasks/changes').status_code == 400
+        assert client.get('/tasks/changes?since=abc').status_code == 400
+        assert client.get('/tasks/changes?since=-1').status_code == 400
+        assert client.get('/tasks/changes?since=0').status_code == 410
+
+    @patch('app.task_service.get_tasks_by_user')
+    def test_get_tasks_by_user_endpoint(self, mock_get, client, sample_task):
+        """Test GET /tasks/user/<id>"""
+        mock_get.return_value = [sample_task]
+
+        response = client.get('/tasks/user/u1')
+        assert response.status_code == 200
+        assert len(response.get_json()['tasks']) == 1
+        mock_get.assert_called_once_with("u1")
+
     def test_health_check_endpoint(self, client):
         """Test GET /health"""
         response = client.get('/health')
@@ -507,6 +653,15 @@ class TestTaskEndpoints:
 class TestTaskServiceAdditionalMethods:
     """Test additional TaskService methods for better coverage"""
 
+    def test_task_projection_matches_model(self):
+        """Test Task.project returns what to_dict returns, defaults included"""
+        full = {"taskId": "t1", "title": "T", "creatorId": "u1", "deadline": 1800000000, "status": "completed",
+                "notes": "n", "attachments": ["a"], "collaborators": ["u2"], "projectId": "p1", "ownerId": "u2",
+                "priority": 5, "createdAt": 1, "updatedAt": 2, "start_date": 1700000000, "active": False,
+                "scheduled": True, "schedule": "custom", "custom_schedule": 3, "completedAt": 4, "startedAt": 3}
+        for record in (full, {"taskId": "t2"}):
+            assert Task.project(record) == Task.from_dict(record).to_dict()
+
     def test_is_same_date_true(self, mock_db):
         """Test is_same_date returns True for same date"""
         service = TaskService()
@@ -766,6 +921,392 @@ class TestTaskServiceAdditionalMethods:
 
         assert mock_post.called
 
+    @patch('task_service.requests.post')
+    def test_send_task_update_notification_uses_cache(self, mock_post, mock_db):
+        """Test repeated notifications read users and preferences from the cache"""
+        mock_users_ref = Mock()
+        mock_prefs_ref = Mock()
+        mock_users_ref.child.return_value.get.return_value = {"email": "user@test.com"}
+        mock_prefs_ref.child.return_value.get.return_value = {"taskUpdateReminders": True, "channel": "email"}
+
+        def db_side_effect(arg):
+            if arg == "users":
+                return mock_users_ref
+            elif arg == "notificationPreferences":
+                return mock_prefs_ref
+            return Mock()
+
+        mock_db.side_effect = db_side_effect
+        mock_post.return_value.status_code = 200
+
+        service = TaskService()
+        for _ in range(3):
+            service.send_task_update_notification("t1", "Test Task", "ongoing", "completed", "u1", ["u2"])
+
+        assert mock_users_ref.child.return_value.get.call_count == 2
+        assert mock_prefs_ref.child.return_value.get.call_count == 2
+        assert mock_post.call_count == 6
+        assert service.user_cache.stats()["hits"] == 4
+
+    def test_cache_expiry_and_invalidation(self, mock_db):
+        """Test cached records are reloaded after the TTL or an explicit invalidation"""
+        from shared import get_cache, invalidate
+
+        mock_users_ref = Mock()
+        mock_users_ref.child.return_value.get.return_value = {"email": "user@test.com"}
+        mock_db.side_effect = lambda arg: mock_users_ref if arg == "users" else Mock()
+
+        service = TaskService()
+        service.get_user("u1")
+        service.get_user("u1")
+        assert mock_users_ref.child.return_value.get.call_count == 1
+
+        invalidate("users", "u1")
+        service.get_user("u1")
+        assert mock_users_ref.child.return_value.get.call_count == 2
+
+        with patch('shared.cache.time.monotonic', return_value=10 ** 9):
+            service.get_user("u1")
+        assert mock_users_ref.child.return_value.get.call_count == 3
+        assert get_cache("users").stats()["hits"] == 1
+
+
+class TestTaskServiceSQLiteBackend:
+    """Tests running TaskService against the local SQLite storage engine"""
+
+    @pytest.fixture
+    def sqlite_db(self, mock_db):
+        from shared.sqlite_db import SQLiteDatabase
+        database = SQLiteDatabase(":memory:")
+        mock_db.side_effect = database.reference
+        yield database
+        database.close()
+
+    def test_create_and_get_task(self, sqlite_db):
+        """Test a created task round-trips through SQLite without null fields"""
+        service = TaskService()
+        req = CreateTaskRequest(title="Stored Task", creator_id="u1", deadline=1800000000, project_id="p1")
+        task, err = service.create_task(req)
+
+        assert err is None
+        stored = sqlite_db.reference(f"tasks/{task.task_id}").get()
+        assert stored["title"] == "Stored Task"
+        assert "completedAt" not in stored
+
+        fetched, err = service.get_task_by_id(task.task_id)
+        assert err is None
+        assert fetched.title == "Stored Task"
+
+    def test_update_and_delete_task(self, sqlite_db):
+        """Test partial updates and deletes are applied to the stored record"""
+        service = TaskService()
+        task, _ = service.create_task(CreateTaskRequest(title="T", creator_id="u1", deadline=1800000000))
+
+        updated, err = service.update_task(UpdateTaskRequest(task_id=task.task_id, notes="new notes"))
+        assert err is None
+        assert updated.notes == "new notes"
+        assert updated.title == "T"
+
+        success, err = service.delete_task(task.task_id)
+        assert success is True
+        assert sqlite_db.reference("tasks").get() is None
+
+    def test_indexed_child_query(self, sqlite_db):
+        """Test order_by_child/equal_to is served from the projectId index"""
+        tasks_ref = sqlite_db.reference("tasks")
+        tasks_ref.child("t1").set({"taskId": "t1", "projectId": "p1", "updatedAt": 3})
+        tasks_ref.child("t2").set({"taskId": "t2", "projectId": "p2", "updatedAt": 1})
+        tasks_ref.child("t3").set({"taskId": "t3", "projectId": "p1", "updatedAt": 2})
+
+        result = tasks_ref.order_by_child("projectId").equal_to("p1").get()
+        assert list(result.keys()) == ["t1", "t3"]
+
+        latest = tasks_ref.order_by_child("updatedAt").limit_to_last(2).get()
+        assert list(latest.keys()) == ["t3", "t1"]
+
+        plan = sqlite_db._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT key FROM records "
+            "WHERE parent = 'tasks' AND json_extract(value, '$.projectId') = 'p1'"
+        ).fetchall()
+        assert "idx_records_projectId" in str(plan)
+
+    def test_index_trees_follow_task_writes(self, sqlite_db):
+        """Test create, membership updates and delete keep the index trees in sync"""
+        service = TaskService()
+        task, _ = service.create_task(CreateTaskRequest(
+            title="T", creator_id="u1", deadline=1800000000, project_id="p1", collaborators=["u2"]
+        ))
+        task_id = task.task_id
+        assert sqlite_db.reference("tasksByProject").get() == {"p1": {task_id: True}}
+        assert sqlite_db.reference("tasksByUser").get() == {"u1": {task_id: True}, "u2": {task_id: True}}
+
+        service.update_task(UpdateTaskRequest(task_id=task_id, project_id="p2", collaborators=["u3"]))
+        assert sqlite_db.reference("tasksByProject").get() == {"p2": {task_id: True}}
+        assert sqlite_db.reference("tasksByUser").get() == {"u1": {task_id: True}, "u3": {task_id: True}}
+        assert sqlite_db.reference(f"tasks/{task_id}/projectId").get() == "p2"
+
+        service.delete_task(task_id)
+        assert set(sqlite_db.reference().get()) == {"deletedTasks"}
+
+    def test_get_tasks_by_project_and_user_read_index_trees(self, sqlite_db):
+        """Test project and user lookups only read the tasks listed in the index trees once backfilled"""
+        service = TaskService()
+        service.rebuild_indexes()
+        for i in range(4):
+            service.create_task(CreateTaskRequest(
+                title=f"T{i}", creator_id="u1", deadline=1800000000, project_id=f"p{i % 2}",
+                collaborators=["u2"] if i == 3 else []
+            ))
+
+        with patch.object(service, "tasks_ref", wraps=service.tasks_ref) as tasks_ref:
+            project_tasks = service.get_tasks_by_project("p1")
+            user_tasks = service.get_tasks_by_user("u2")
+
+        assert sorted(task.title for task in project_tasks) == ["T1", "T3"]
+        assert [task.title for task in user_tasks] == ["T3"]
+        tasks_ref.get.assert_not_called()
+        tasks_ref.order_by_child.assert_not_called()
+
+    def test_writes_keep_the_activation_queue_current(self, sqlite_db):
+        """Test created, rescheduled and deleted tasks update pendingActivations for the sweeper process"""
+        service = TaskService()
+        queue_ref = sqlite_db.reference("pendingActivations/tasks")
+        sweeper = TaskService().activation_sweeper
+        now = 1700000000  # 2023-11-14 22:13 UTC
+        with patch('task_service.current_timestamp', return_value=now):
+            task, _ = service.create_task(CreateTaskRequest(
+                title="Later", creator_id="u1", deadline=1800000000, start_date=now + 2 * 86400
+            ))
+            assert task.active is False
+            assert queue_ref.get() == {task.task_id: 1700092800}
+            assert sweeper.load() == 1
+            assert sweeper.next_activation() == (1700092800, task.task_id)
+
+            updated, _ = service.update_task(UpdateTaskRequest(task_id=task.task_id, start_date=now - 86400))
+            assert updated.active is True
+            assert queue_ref.get() is None
+
+            service.update_task(UpdateTaskRequest(task_id=task.task_id, start_date=now + 86400))
+            assert queue_ref.get() == {task.task_id: 1700006400}
+
+            service.delete_task(task.task_id)
+            assert queue_ref.get() is None
+            assert sweeper.load() == 0
+            assert sweeper.next_activation() is None
+
+    def test_activation_sweeper_runs_in_one_process(self, sqlite_db):
+        """Test only the process holding the activation lease sweeps, and the lease passes on when it stops"""
+        with patch('shared.jobs.default_owner', side_effect=["a", "b"]):
+            first, second = TaskService().activation_sweeper, TaskService().activation_sweeper
+
+        assert first._hold_lease() is True
+        assert second._hold_lease() is False
+        assert first._hold_lease() is True
+        assert sqlite_db.reference("schedulerJobs/tasks_activation/owner").get() == "a"
+
+        first.stop()
+        assert second._hold_lease() is True
+        assert second.leader is True
+
+    def test_get_all_tasks_wire_matches_models(self, sqlite_db):
+        """Test wire reads return the dicts to_dict would produce, without building Task objects"""
+        sqlite_db.reference("tasks").set({
+            "t1": {"taskId": "t1", "title": "A", "creatorId": "u1", "deadline": 1800000000,
+                   "collaborators": ["u2"], "active": True, "comment_thread": [{"active": True}]},
+            "t2": {"taskId": "t2", "title": "B", "active": False},
+            "t3": {"taskId": "t3", "active": True},
+        })
+        service = TaskService()
+
+        with patch.object(Task, 'from_dict', side_effect=AssertionError("model built")):
+            wire = service.get_all_tasks(wire=True)
+
+        assert wire == [task.to_dict() for task in service.get_all_tasks()]
+        assert [task["taskId"] for task in wire] == ["t1", "t3"]
+        assert "comment_thread" not in wire[0]
+        assert wire[1]["status"] == "ongoing" and wire[1]["attachments"] == []
+
+    def test_get_tasks_page_walks_all_active_tasks(self, sqlite_db):
+        """Test key-ordered pages skip inactive tasks and end with no next key"""
+        tasks_ref = sqlite_db.reference("tasks")
+        for i in range(7):
+            tasks_ref.child(f"t{i}").set({"taskId": f"t{i}", "title": f"T{i}", "creatorId": "u1",
+                                          "deadline": 1800000000, "projectId": "p1", "active": i != 2})
+
+        service = TaskService()
+        pages, start_key = [], None
+        while True:
+            tasks, start_key = service.get_tasks_page(2, start_key)
+            pages.append([task.task_id for task in tasks])
+            if start_key is None:
+                break
+
+        assert pages == [["t0", "t1"], ["t3", "t4"], ["t5", "t6"]]
+
+    def test_get_tasks_by_project_page_reads_index_tree(self, sqlite_db):
+        """Test project pages follow the tasksByProject keys"""
+        service = TaskService()
+        created = [service.create_task(CreateTaskRequest(
+            title=f"T{i}", creator_id="u1", deadline=1800000000, project_id="p1", start_date=1600000000
+        ))[0].task_id for i in range(3)]
+
+        first, next_key = service.get_tasks_by_project_page("p1", 2)
+        second, last_key = service.get_tasks_by_project_page("p1", 2, next_key)
+
+        assert [task.task_id for task in first + second] == sorted(created)
+        assert next_key == sorted(created)[2]
+        assert last_key is None
+
+    def test_get_task_changes(self, sqlite_db):
+        """Test deltas return tasks updated since the watermark and drop deleted or deactivated ones"""
+        tasks_ref = sqlite_db.reference("tasks")
+        for i, updated_at in enumerate([100, 200, 300]):
+            tasks_ref.child(f"t{i}").set({"taskId": f"t{i}", "title": f"T{i}", "creatorId": "u1",
+                                          "deadline": 1800000000, "updatedAt": updated_at, "active": i != 2})
+        service = TaskService()
+
+        tasks, removed = service.get_task_changes(200)
+        assert [task.task_id for task in tasks] == ["t1"]
+        assert removed == ["t2"]
+
+        with patch('shared.changes.current_timestamp', return_value=400):
+            service.delete_task("t1")
+        assert sqlite_db.reference("deletedTasks").get() == {"t1": {"deletedAt": 400}}
+
+        tasks, removed = service.get_task_changes(400)
+        assert tasks == []
+        assert removed == ["t1"]
+
+    def test_delete_prunes_expired_tombstones(self, sqlite_db):
+        """Test deletes drop tombstones older than the retention window"""
+        sqlite_db.reference("deletedTasks").set({"old": {"deletedAt": 100}, "recent": {"deletedAt": 1700000000}})
+        sqlite_db.reference("tasks/t1").set({"taskId": "t1", "creatorId": "u1"})
+
+        with patch('shared.changes.current_timestamp', return_value=1700000100):
+            TaskService().delete_task("t1")
+
+        assert set(sqlite_db.reference("deletedTasks").get()) == {"recent", "t1"}
+
+    def test_activation_flip_bumps_updated_at(self, sqlite_db):
+        """Test tasks activated by the sweeper show up in deltas"""
+        sqlite_db.reference("tasks/t1").set({"taskId": "t1", "title": "T", "creatorId": "u1", "deadline": 1800000000,
+                                             "start_date": 1700000000, "updatedAt": 100, "active": False})
+        service = TaskService()
+
+        assert service.refresh_active_flags(sqlite_db.reference("tasks").get(), now=1700000500) == 1
+        assert sqlite_db.reference("tasks/t1/updatedAt").get() == 1700000500
+        assert [task.task_id for task in service.get_task_changes(1700000500)[0]] == ["t1"]
+
+    def test_rebuild_indexes(self, sqlite_db):
+        """Test the index trees can be rebuilt from existing task records"""
+        sqlite_db.reference("tasks").set({
+            "t1": {"taskId": "t1", "creatorId": "u1", "projectId": "p1", "collaborators": ["u2"]},
+            "t2": {"taskId": "t2", "creatorId": "u1", "ownerId": "u3"},
+        })
+
+        # t1 is already indexed under p1, t3 was written before the index existed
+        sqlite_db.reference("tasks/t3").set({"taskId": "t3", "creatorId": "u1", "projectId": "p1",
+                                             "deadline": 1800000000, "active": True})
+        sqlite_db.reference("tasksByProject/p1/t1").set(True)
+        service = TaskService()
+        assert [task.task_id for task in service.get_tasks_by_project_page("p1", 10)[0]] == ["t3"]
+
+        assert service.rebuild_indexes() == 3
+        assert sqlite_db.reference("tasksByProject").get() == {"p1": {"t1": True, "t3": True}}
+        assert sqlite_db.reference("tasksByUser").get() == {
+            "u1": {"t1": True, "t2": True, "t3": True}, "u2": {"t1": True}, "u3": {"t2": True}
+        }
+        assert sqlite_db.reference("indexState/tasks/builtAt").get() > 0
+        assert [task.task_id for task in TaskService().get_tasks_by_project_page("p1", 10)[0]] == ["t3"]
+
+    def test_multi_path_update_and_transaction(self, sqlite_db):
+        """Test root multi-path updates and transactions"""
+        root = sqlite_db.reference()
+        root.update({"tasks/t1/title": "A", "tasks/t2/title": "B", "counters/tasks": 2})
+        assert sqlite_db.reference("tasks/t1").get() == {"title": "A"}
+
+        result = sqlite_db.reference("counters/tasks").transaction(lambda current: (current or 0) + 1)
+        assert result == 3
+        assert root.get(shallow=True) == {"tasks": True, "counters": True}
+
+
+class TestTaskServiceMemoryBackend:
+    """Tests counting the database calls TaskService makes, against the in-memory engine or mocks"""
+
+    def test_get_all_tasks_is_a_pure_read(self, mock_db):
+        """Test reads return the stored active flag without writing"""
+        from shared.memory_db import MemoryDatabase
+
+        database = MemoryDatabase(data={"tasks": {
+            "t1": {"taskId": "t1", "title": "A", "creatorId": "u1", "deadline": 1800000000,
+                   "start_date": 1600000000, "active": True},
+            "t2": {"taskId": "t2", "title": "B", "creatorId": "u1", "deadline": 1800000000,
+                   "start_date": 1600000000, "active": False},
+        }})
+        mock_db.side_effect = database.reference
+
+        tasks = TaskService().get_all_tasks()
+
+        assert [task.task_id for task in tasks] == ["t1"]
+        assert database.stats.calls == {"get": 1}
+
+    def test_activation_sweeper_flips_due_tasks_in_batches(self, mock_db):
+        """Test the sweeper catches up overdue tasks in one update and activates the rest when due"""
+        from shared.memory_db import MemoryDatabase
+
+        now = 1700000000  # 2023-11-14 22:13 UTC
+        database = MemoryDatabase(data={"tasks": {
+            f"t{i}": {"taskId": f"t{i}", "title": f"T{i}", "creatorId": "u1", "deadline": now + 10 * 86400,
+                      "start_date": now - 3600 if i < 3 else now + 3 * 86400, "active": i == 4}
+            for i in range(5)
+        }})
+        mock_db.side_effect = database.reference
+
+        service = TaskService()
+        sweeper = service.activation_sweeper
+        with patch('task_service.current_timestamp', return_value=now), \
+             patch('shared.activation.current_timestamp', return_value=now):
+            assert sweeper.sync() == 4
+
+        # One update for the flags, one queueing the future start dates, then the queue is read back
+        assert database.stats.calls == {"get": 2, "update": 2}
+        assert [database.dump()["tasks"][f"t{i}"]["active"] for i in range(5)] == [True, True, True, False, False]
+        # Tasks become active at midnight UTC of their start date
+        assert database.dump()["pendingActivations"]["tasks"] == {"t3": 1700179200, "t4": 1700179200}
+        assert sweeper.next_activation() == (1700179200, "t3")
+
+        later = 1700179200
+        database.stats.reset()
+        with patch('task_service.current_timestamp', return_value=later):
+            assert sweeper.activate_due(later - 1) == 0
+            assert sweeper.activate_due(later) == 2
+
+        assert database.stats.calls == {"get": 2, "update": 2}
+        assert database.dump()["tasks"]["t3"]["active"] is True
+        assert "pendingActivations" not in database.dump()
+        assert sweeper.next_activation() is None
+
+    def test_get_tasks_by_project_falls_back_to_scan(self, mock_db):
+        """Test projects without index entries fall back to the query, then to a filtered scan"""
+        mock_tasks_ref = Mock()
+        mock_tasks_ref.order_by_child.side_effect = Exception("Index not defined")
+        mock_tasks_ref.get.return_value = {
+            "t1": {"taskId": "t1", "title": "A", "creatorId": "u1", "deadline": 1800000000,
+                   "projectId": "p1", "active": True},
+            "t2": {"taskId": "t2", "title": "B", "creatorId": "u1", "deadline": 1800000000,
+                   "projectId": "p2", "active": True},
+        }
+        mock_index_ref = Mock()
+        mock_index_ref.child.return_value.get.return_value = None
+        mock_state_ref = Mock()
+        mock_state_ref.get.return_value = None
+        refs = {"tasks": mock_tasks_ref, "tasksByProject": mock_index_ref, "indexState/tasks": mock_state_ref}
+        mock_db.side_effect = lambda arg: refs.get(arg, Mock())
+
+        tasks = TaskService().get_tasks_by_project("p1")
+
+        assert [task.task_id for task in tasks] == ["t1"]
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -6,6 +6,9 @@ import { ref } from 'vue'
 // Create a reactive event emitter
 const notificationUpdateTrigger = ref(0)
 
+// Whether the navigation bar's notification stream is live (polling is only needed without it)
+const streamConnected = ref(false)
+
 export function useNotificationEvents() {
   // Trigger a notification update (increments counter to trigger reactivity)
   const triggerNotificationUpdate = () => {
@@ -19,6 +22,7 @@ export function useNotificationEvents() {
 
   return {
     triggerNotificationUpdate,
-    onNotificationUpdate
+    onNotificationUpdate,
+    streamConnected
   }
 }
@@ -4,6 +4,8 @@ import axios from 'axios'
 
 const API_BASE_URL = import.meta.env.VITE_BACKEND_API
 const NOTIFICATION_SERVICE_URL = `${API_BASE_URL}notification`
+// Streams are served by their own process (notification-service/stream_server.py)
+const NOTIFICATION_STREAM_URL = `${API_BASE_URL}notification-stream`
 
 /**
  * Get all notifications for a user
@@ -46,6 +48,25 @@ export const getUnreadNotifications = async (userId) => {
   }
 }
 
+/**
+ * Get the unread notification count for a user
+ * @param {string} userId - The user ID
+ * @returns {Promise<number>}
+ */
+export const getUnreadCount = async (userId) => {
+  if (!userId) {
+    throw new Error('User ID is required')
+  }
+
+  try {
+    const response = await axios.get(`${NOTIFICATION_SERVICE_URL}/notifications/${userId}/unread/count`)
+    return response.data.count || 0
+  } catch (error) {
+    console.error('Error fetching unread count:', error)
+    throw error
+  }
+}
+
 /**
  * Mark a notification as read
  * @param {string} userId - The user ID
@@ -108,12 +129,43 @@ export const deleteNotification = async (userId, notificationId) => {
   }
 }
 
+/**
+ * Subscribe to a user's notification stream (server-sent events)
+ * @param {string} userId - The user ID
+ * @param {Object} handlers - onNotification(notification), onUnreadCount(count), onResync(), onUnavailable()
+ * @returns {Function} - Closes the stream
+ */
+export const subscribeToNotifications = (userId, handlers = {}) => {
+  if (!userId) {
+    throw new Error('User ID is required')
+  }
+
+  if (typeof EventSource === 'undefined') {
+    handlers.onUnavailable?.()
+    return () => {}
+  }
+
+  const source = new EventSource(`${NOTIFICATION_STREAM_URL}/notifications/${userId}/stream`)
+  source.addEventListener('notification', (event) => handlers.onNotification?.(JSON.parse(event.data)))
+  source.addEventListener('unreadCount', (event) => handlers.onUnreadCount?.(JSON.parse(event.data).count))
+  source.addEventListener('resync', () => handlers.onResync?.())
+  source.onerror = () => {
+    // Dropped streams are retried by EventSource (with Last-Event-ID); an error response closes it for good
+    if (source.readyState === EventSource.CLOSED) {
+      handlers.onUnavailable?.()
+    }
+  }
+  return () => source.close()
+}
+
 /**
  * Service object for easier imports
  */
 export const notificationService = {
   getAllNotifications,
   getUnreadNotifications,
+  getUnreadCount,
+  subscribeToNotifications,
   markNotificationAsRead,
   markAllNotificationsAsRead,
   deleteNotification,